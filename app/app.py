@@ -1,41 +1,251 @@
-from fastapi import FastAPI
+import time
+APP_IMPORT_STARTED = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
-from interface import PlanRequest, PlanResponse, PlanStep, TransportInfo, TripPlan , YoutubeLinkRequest, YoutubeLinkResponse, ChatRequest
-from data_importer import DataImporter
-from utils.llm_caller import LLMCaller
+from interface import (
+    PlanRequest, PlanResponse, TripPlan, YoutubeLinkRequest, YoutubeLinkResponse, ChatRequest,
+    BatchIngestRequest, IngestJobStatus, ChatTurnRequest, ChatTurnResponse, ChatSessionState,
+    BatchPlanRequest, BatchPlanStatus,
+)
+from utils.embedding_engine import get_embedding_engine
+from utils.embedding_batcher import get_embedding_batcher
+from utils.reranker import get_reranker, RERANK_ENABLED
+from utils.ingest_pipeline import BatchIngestor, IngestJobManager
+from utils.chat_session import ChatService
+from utils.batch_planner import BatchPlanner, BatchPlanJobManager
+from utils.service_container import ServiceContainer, StartupProfile
+from utils.metrics import stage_timer, register_gauge, REQUESTS
 import os
 import json
 import asyncio
-import time
 from datetime import datetime
 
-app = FastAPI()
-data_importer = DataImporter()
-agent = LLMCaller()
+load_dotenv()
+EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "true").lower() == "true"
+
+# Nothing below connects anywhere or loads a model: LLMCaller and DataImporter (and with
+# them openai, qdrant_client and the YouTube client) are imported and built on first use,
+# and the lifespan warm-up does that in the background while health checks are answered.
+container = ServiceContainer(StartupProfile(APP_IMPORT_STARTED))
+
+
+def register_agent_gauges(agent) -> None:
+    register_gauge("sealion_llm_in_flight", "LLM calls holding a gateway concurrency slot",
+                   lambda: sum(agent.gateway.stats()["in_flight"].values()))
+    register_gauge("sealion_llm_coalesced", "LLM requests served by an identical in-flight call",
+                   lambda: agent.gateway.counters["coalesced"])
+    register_gauge("sealion_llm_retries", "LLM call retries after 429/5xx/connection errors",
+                   lambda: agent.gateway.counters["retries"])
+    if agent.response_cache:
+        register_gauge("sealion_response_cache_entries", "Entries in the trip-plan response cache",
+                       lambda: agent.response_cache.stats()["size"])
+        register_gauge("sealion_response_cache_exact_hits", "Exact-match cache hits since start",
+                       lambda: agent.response_cache.exact_hits)
+        register_gauge("sealion_response_cache_semantic_hits", "Semantic cache hits since start",
+                       lambda: agent.response_cache.semantic_hits)
+        register_gauge("sealion_response_cache_misses", "Cache misses since start",
+                       lambda: agent.response_cache.misses)
+
+
+@container.provider("agent")
+def build_agent():
+    from utils.llm_caller import LLMCaller
+
+    agent = LLMCaller()
+    register_agent_gauges(agent)
+    return agent
+
+
+@container.provider("data_importer")
+def build_data_importer():
+    from data_importer import DataImporter
+
+    # The collection is checked by the warm-up, with retries, so a Qdrant blip cannot fail the build
+    return DataImporter(create_collection=False)
+
+
+@container.provider("ingest_jobs", needs=("data_importer",))
+def build_ingest_jobs(data_importer):
+    return IngestJobManager(BatchIngestor(data_importer))
+
+
+@container.provider("chat_service", needs=("agent",))
+def build_chat_service(agent):
+    return ChatService(agent)
+
+
+@container.provider("plan_jobs", needs=("agent",))
+def build_plan_jobs(agent):
+    return BatchPlanJobManager(BatchPlanner(agent))
+
+
+def service(name: str):
+    """FastAPI dependency for a container component; 503 while it cannot be built."""
+    async def resolve():
+        try:
+            return await container.get(name)
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=f"Service starting: {name} unavailable - {e}")
+    return resolve
+
+
+register_gauge("sealion_embedding_batcher_pending", "Texts waiting in the embedding micro-batcher",
+               lambda: get_embedding_batcher().stats()["pending"])
+register_gauge("sealion_embedding_model_loaded", "1 once the embedding model is in memory",
+               lambda: get_embedding_engine().is_loaded)
+
+
+async def warm_up():
+    """
+    Background startup: build the clients, make sure the collection exists (retrying while
+    Qdrant is unreachable) and run the first model forward passes, all concurrently.
+    Readiness stays 503 until every phase has succeeded.
+    """
+    profile = container.profile
+
+    async def storage():
+        agent, data_importer = await asyncio.gather(container.get("agent"), container.get("data_importer"))
+        await container.run_phase("qdrant_collection", data_importer.ensure_collection, retry=True)
+        # The first refresh loads the snapshot; both components may share one index
+        indexes = {id(i): i for i in (data_importer.local_index, agent.local_index) if i}.values()
+        for index in indexes:
+            index.start_background_refresh()
+        await asyncio.gather(container.get("chat_service"), container.get("plan_jobs"), container.get("ingest_jobs"))
+
+    steps = [storage()]
+    if EMBEDDING_WARMUP:
+        steps.append(container.run_phase("embedding_model", get_embedding_engine().warmup))
+        if RERANK_ENABLED:
+            steps.append(container.run_phase("reranker", get_reranker().warmup))
+    for result in await asyncio.gather(*steps, return_exceptions=True):
+        if isinstance(result, Exception):
+            print(f"Startup warm-up step failed: {result}")
+    if not readiness_pending():
+        profile.mark_ready()
+    print(f"Startup profile (pid {os.getpid()}): {profile.summary()}")
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    profile = container.profile
+    names = ["build:agent", "build:data_importer", "qdrant_collection"]
+    if EMBEDDING_WARMUP:
+        names.append("embedding_model")
+        if RERANK_ENABLED:
+            names.append("reranker")
+    profile.expect(*names)
+    warmup = asyncio.create_task(warm_up())
+    yield
+    warmup.cancel()
+    agent = container.peek("agent")
+    if agent:
+        await agent.close()
+    get_embedding_engine().shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+async def check_qdrant(agent) -> dict:
+    if agent is None:
+        return {"status": "starting"}
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(agent.qdrant.get_collection(agent.collection_name), timeout=2.0)
+        return {"status": "ok", "latency_ms": round((time.perf_counter() - start) * 1000, 2)}
+    except Exception as e:
+        return {"status": "error", "error": str(e) or type(e).__name__}
+
+
+def readiness_pending() -> list:
+    pending = container.profile.pending()
+    agent = container.peek("agent")
+    if agent and agent.local_index and not agent.local_index.ready:
+        pending.append("local_index")
+    return pending
 
 
 @app.get("/v1")
-def greet_json():
+async def greet_json():
     start_time = time.time()
+    engine = get_embedding_engine()
+    agent = container.peek("agent")
+    pending = readiness_pending()
+    checks = {
+        "startup": {"status": "ok" if not pending else "starting", "pending": pending},
+        "qdrant": await check_qdrant(agent),
+        "embedding_model": {
+            "status": "ok" if engine.is_loaded else "loading",
+            "model": engine.model_name,
+            "backend": engine.backend,
+            "load_seconds": engine.load_seconds,
+        },
+        "llm": {
+            "status": "ok" if os.getenv("SEALION_BASE_URL") and os.getenv("SEALION_API") else "error",
+            "base_url": os.getenv("SEALION_BASE_URL"),
+        },
+    }
+    if agent and agent.local_index:
+        checks["local_index"] = {
+            "status": "ok" if agent.local_index.ready else "loading",
+            "points": len(agent.local_index),
+        }
+    healthy = all(check["status"] == "ok" for check in checks.values())
     health_status = {
-        "status": "healthy",
+        "status": "healthy" if healthy else "degraded",
         "timestamp": datetime.utcnow().isoformat(),
         "service": "SealionAI Travel Planning Service",
         "version": "1.0.0",
-        "checks": {}
+        "checks": checks,
+        "check_duration_ms": round((time.time() - start_time) * 1000, 2)
     }
     return health_status
 
+@app.get("/v1/live")
+def liveness():
+    """200 whenever the event loop is answering; never touches Qdrant, the LLM or the models."""
+    return {"status": "alive", "pid": os.getpid(), "uptime_seconds": round(time.perf_counter() - APP_IMPORT_STARTED, 1)}
+
+@app.get("/v1/ready")
+def readiness():
+    """503 until this worker has built its clients, found the collection and warmed its models, so probes keep traffic away."""
+    pending = readiness_pending()
+    if not pending:
+        container.profile.mark_ready()
+    body = {"status": "ready" if not pending else "warming_up", "pending": pending, "pid": os.getpid()}
+    return Response(json.dumps(body), status_code=200 if not pending else 503, media_type="application/json")
+
+@app.get("/v1/startupProfile")
+def startup_profile():
+    return container.profile.report()
+
+container.profile.record("app_import", APP_IMPORT_STARTED, time.perf_counter())
+
+
+@app.get("/metrics")
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.post("/v1/generateTripPlan", response_model=PlanResponse)
-def generate_trip_plan(request: PlanRequest):
+async def generate_trip_plan(request: PlanRequest, agent=Depends(service("agent"))):
     try:
-        trip_plan = asyncio.run(agent.query_with_rag(request))
-        return PlanResponse(tripOverview=trip_plan.tripOverview,
-                            query_params=request,
-                            retrieved_data=trip_plan.retrieved_data,
-                            trip_plan=trip_plan.trip_plan,
-                            meta={"status": "success", "timestamp": datetime.utcnow().isoformat()})
+        trip_plan = await agent.query_with_rag(request)
+        with stage_timer("response_build"):
+            response = PlanResponse(tripOverview=trip_plan.tripOverview,
+                                    query_params=request,
+                                    retrieved_data=trip_plan.retrieved_data,
+                                    trip_plan=trip_plan.trip_plan,
+                                    meta={**trip_plan.meta, "timestamp": datetime.utcnow().isoformat()})
+        REQUESTS.labels("generateTripPlan", response.meta.get("status", "unknown")).inc()
+        return response
     except Exception as e:
+        REQUESTS.labels("generateTripPlan", "error").inc()
         print(f"Error in generate_trip_plan: {e}")
         # Return error response
         return PlanResponse(
@@ -46,8 +256,41 @@ def generate_trip_plan(request: PlanRequest):
             meta={"status": "error", "error": str(e)}
         )
 
+@app.post("/v1/generateTripPlan/stream")
+async def generate_trip_plan_stream(request: PlanRequest, http_request: Request, agent=Depends(service("agent"))):
+    use_sse = "text/event-stream" in http_request.headers.get("accept", "")
+
+    async def event_stream():
+        async for event in agent.stream_trip_plan(request):
+            if use_sse:
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+            else:
+                yield json.dumps(event) + "\n"
+
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    return StreamingResponse(event_stream(), media_type=media_type)
+
+@app.post("/v1/generateTripPlan/batch", response_model=BatchPlanStatus)
+async def generate_trip_plan_batch(request: BatchPlanRequest, plan_jobs=Depends(service("plan_jobs"))):
+    job = plan_jobs.submit(request.requests, warm_cache=request.warm_cache, concurrency=request.concurrency)
+    return job.to_status()
+
+@app.get("/v1/generateTripPlan/batch/{job_id}", response_model=BatchPlanStatus)
+def generate_trip_plan_batch_status(job_id: str, plan_jobs=Depends(service("plan_jobs"))):
+    job = plan_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    return job.to_status()
+
+@app.get("/v1/generateTripPlan/batch/{job_id}/results")
+def generate_trip_plan_batch_results(job_id: str, plan_jobs=Depends(service("plan_jobs"))):
+    job = plan_jobs.get(job_id)
+    if job is None or not os.path.exists(job.output_path):
+        raise HTTPException(status_code=404, detail="Unknown job id or no results yet")
+    return FileResponse(job.output_path, media_type="application/x-ndjson")
+
 @app.post("/v1/addYoutubeLink", response_model=YoutubeLinkResponse)
-def add_youtube_link(request: YoutubeLinkRequest):
+def add_youtube_link(request: YoutubeLinkRequest, data_importer=Depends(service("data_importer"))):
     try:
         data_importer.insert_from_youtube(request.video_id)
     except Exception as e:
@@ -60,21 +303,81 @@ def add_youtube_link(request: YoutubeLinkRequest):
         video_url=f"https://www.youtube.com/watch?v={request.video_id}"
     )
 
+@app.post("/v1/ingest/batch", response_model=IngestJobStatus)
+def ingest_batch(request: BatchIngestRequest, ingest_jobs=Depends(service("ingest_jobs"))):
+    job = ingest_jobs.submit(request.video_ids, metadata=request.metadata, max_retries=request.max_retries or 0)
+    return job.to_status()
+
+@app.get("/v1/ingest/batch/{job_id}", response_model=IngestJobStatus)
+def ingest_batch_status(job_id: str, ingest_jobs=Depends(service("ingest_jobs"))):
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    return job.to_status()
+
 @app.post("/v1/searchSimilar", response_model=list[dict])
-def search_similar(request: YoutubeLinkRequest):
+async def search_similar(request: YoutubeLinkRequest, data_importer=Depends(service("data_importer"))):
     try:
-        results = data_importer.search_similar(query=request.video_id)
+        query_embedding, query_sparse = await get_embedding_batcher().encode_hybrid(request.video_id)
+        results = await run_in_threadpool(data_importer.search_by_vector, query_embedding, 5, query_sparse)
         return results
     except Exception as e:
         print(f"Error during search: {e}")
         return {"error": "Search failed"}
-    return []
 
 @app.post("/v1/basicChat", response_model=str)
-def basic_chat(request: ChatRequest):
+async def basic_chat(request: ChatRequest, agent=Depends(service("agent"))):
     user_message = request.message
-    llm_response = asyncio.run(agent.basic_query(
+    llm_response = await agent.basic_query(
         user_prompt=user_message
-    ))
+    )
     return llm_response
 
+@app.post("/v1/chat", response_model=ChatTurnResponse)
+async def chat(request: ChatTurnRequest, chat_service=Depends(service("chat_service"))):
+    try:
+        response = await chat_service.chat(request)
+        REQUESTS.labels("chat", "success").inc()
+        return response
+    except Exception as e:
+        REQUESTS.labels("chat", "error").inc()
+        print(f"Error in chat: {e}")
+        raise HTTPException(status_code=502, detail=f"Unable to get LLM response - {e}")
+
+@app.post("/v1/chat/stream")
+async def chat_stream(request: ChatTurnRequest, http_request: Request, chat_service=Depends(service("chat_service"))):
+    use_sse = "text/event-stream" in http_request.headers.get("accept", "")
+
+    async def event_stream():
+        async for event in chat_service.chat_stream(request):
+            if use_sse:
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+            else:
+                yield json.dumps(event) + "\n"
+
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    return StreamingResponse(event_stream(), media_type=media_type)
+
+@app.get("/v1/chat/{session_id}", response_model=ChatSessionState)
+def chat_session(session_id: str, chat_service=Depends(service("chat_service"))):
+    state = chat_service.store.get(session_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired session id")
+    return state
+
+@app.delete("/v1/chat/{session_id}")
+def delete_chat_session(session_id: str, chat_service=Depends(service("chat_service"))):
+    if not chat_service.store.delete(session_id):
+        raise HTTPException(status_code=404, detail="Unknown or expired session id")
+    return {"deleted": session_id}
+
+@app.get("/v1/embeddingStats")
+def embedding_stats():
+    stats = get_embedding_batcher().stats()
+    if RERANK_ENABLED:
+        stats["rerank"] = get_reranker().stats()
+    return stats
+
+@app.get("/v1/llmStats")
+def llm_stats(agent=Depends(service("agent")), chat_service=Depends(service("chat_service"))):
+    return {**agent.gateway.stats(), "routing": agent.router.stats(), "chat": chat_service.stats()}
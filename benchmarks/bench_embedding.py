@@ -0,0 +1,97 @@
+"""
+Encode throughput by batch size and text length, and ingestion docs/sec through
+DataImporter.insert_texts into an in-memory Qdrant.
+
+    uv run python -m benchmarks.bench_embedding                  # offline, hashing stand-in model
+    uv run python -m benchmarks.bench_embedding --real-model     # the configured EMBEDDING_MODEL
+"""
+import os
+import time
+import argparse
+import tempfile
+
+os.environ.setdefault("LOCAL_INDEX_MODE", "off")
+os.environ.setdefault("INGEST_STORE_PATH", "")
+
+from benchmarks.common import install_stub_encoder, synthetic_texts, write_results
+from utils.embedding_engine import get_embedding_engine
+
+
+def bench_encode(engine, batch_sizes, text_words, docs: int, repeats: int):
+    results = []
+    for words in text_words:
+        texts = synthetic_texts(docs, words, seed=words)
+        engine.encode(texts[:min(8, docs)])  # warm caches / lazy init outside the timing
+        for batch_size in batch_sizes:
+            best = None
+            for _ in range(repeats):
+                start = time.perf_counter()
+                engine.encode(texts, batch_size=batch_size)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results.append({
+                "text_words": words,
+                "batch_size": batch_size,
+                "docs": docs,
+                "seconds": round(best, 4),
+                "docs_per_second": round(docs / best, 1),
+            })
+            print(f"encode words={words:<4} batch={batch_size:<4} {docs / best:10.1f} docs/s")
+    return results
+
+
+def bench_ingest(docs: int, words: int, chunk_size: int, use_store: bool):
+    from data_importer import DataImporter
+    from utils.ingest_store import IngestStore
+
+    store = IngestStore(os.path.join(tempfile.mkdtemp(), "bench_store.sqlite3")) if use_store else None
+    importer = DataImporter(qdrant_url=":memory:", collection_name="bench_ingest", store=store)
+    texts = synthetic_texts(docs, words, seed=1)
+    start = time.perf_counter()
+    for i in range(0, docs, chunk_size):
+        importer.insert_texts(texts[i:i + chunk_size])
+    elapsed = time.perf_counter() - start
+    result = {
+        "docs": docs,
+        "text_words": words,
+        "chunk_size": chunk_size,
+        "embedding_store": use_store,
+        "seconds": round(elapsed, 4),
+        "docs_per_second": round(docs / elapsed, 1),
+    }
+    print(f"ingest chunk={chunk_size:<4} store={use_store!s:<5} {docs / elapsed:10.1f} docs/s")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Embedding and ingestion throughput benchmark")
+    parser.add_argument("--real-model", action="store_true", help="use the configured embedding model instead of the hashing stand-in")
+    parser.add_argument("--batch-sizes", default="1,8,32,64")
+    parser.add_argument("--text-words", default="16,64,256", help="words per synthetic text")
+    parser.add_argument("--docs", type=int, default=512)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--ingest-docs", type=int, default=2000)
+    parser.add_argument("--ingest-chunk-sizes", default="32,128")
+    parser.add_argument("--output", help="JSON path (default: benchmarks/results/embedding-<commit>-<time>.json)")
+    args = parser.parse_args()
+
+    engine = get_embedding_engine()
+    if not args.real_model:
+        install_stub_encoder(engine)
+
+    batch_sizes = [int(x) for x in args.batch_sizes.split(",")]
+    text_words = [int(x) for x in args.text_words.split(",")]
+    results = {
+        "encode": bench_encode(engine, batch_sizes, text_words, args.docs, args.repeats),
+        "ingest": [
+            bench_ingest(args.ingest_docs, 64, chunk_size, use_store)
+            for chunk_size in (int(x) for x in args.ingest_chunk_sizes.split(","))
+            for use_store in (False, True)
+        ],
+    }
+    config = {**vars(args), "model": engine.model_name if args.real_model else "hashing-stub", "backend": engine.backend}
+    write_results("embedding", config, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
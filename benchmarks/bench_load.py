@@ -0,0 +1,185 @@
+"""
+End-to-end load test of /v1/generateTripPlan (and optionally /v1/basicChat and the stream endpoint).
+
+Offline (default): the FastAPI app runs in-process over httpx's ASGI transport. It uses an
+in-memory Qdrant seeded with synthetic passages, the hashing stand-in embedding model and
+benchmarks/llm_stub_server.py as the LLM.
+
+    uv run python -m benchmarks.bench_load --concurrency 32 --requests 500 --llm-latency-ms 800
+
+Against a running service instead:
+
+    uv run python -m benchmarks.bench_load --url http://localhost:8000 --concurrency 16
+"""
+import os
+import time
+import random
+import asyncio
+import argparse
+from contextlib import nullcontext
+
+import httpx
+
+from benchmarks.common import install_stub_encoder, latency_summary, stub_llm_server, synthetic_texts, write_results
+
+DESTINATIONS = ["Chiang Mai", "Phuket", "Krabi", "Ayutthaya", "Pai", "Hua Hin", "Koh Samui", "Sukhothai"]
+
+
+def plan_request(i: int, unique: bool) -> dict:
+    rng = random.Random(i if unique else 0)
+    return {
+        "start_place": "Bangkok",
+        "destination_place": rng.choice(DESTINATIONS),
+        "trip_price": rng.choice([5000, 10000, 20000, 40000]),
+        "trip_context": rng.choice(["food", "temples", "beaches", "nightlife", "nature"]) + (f" #{i}" if unique else ""),
+        "trip_duration_days": rng.randint(1, 7),
+        "group_size": rng.randint(1, 4),
+    }
+
+
+async def seed_offline_service(service, points: int):
+    """Point the in-process app at stand-ins and fill its collection with synthetic passages."""
+    from qdrant_client import AsyncQdrantClient
+    from qdrant_client.models import PointStruct
+    from utils.embedding_engine import get_embedding_engine
+    from utils.hybrid import collection_vectors_config, point_vector
+    from utils.geo import place_fields, resolve_place
+
+    engine = get_embedding_engine()
+    install_stub_encoder(engine)
+    agent = await service.container.get("agent")
+    await agent.qdrant.close()
+    agent.qdrant = AsyncQdrantClient(location=":memory:")
+    vectors_config, sparse_vectors_config = collection_vectors_config(1024)
+    await agent.qdrant.create_collection(agent.collection_name, vectors_config=vectors_config, sparse_vectors_config=sparse_vectors_config)
+
+    texts = synthetic_texts(points, 80, seed=7)
+    for start in range(0, points, 256):
+        block = texts[start:start + 256]
+        vectors = engine.encode(block)
+        await agent.qdrant.upsert(agent.collection_name, points=[
+            PointStruct(id=start + i, vector=point_vector(vector.tolist()), payload={
+                "text": text,
+                "place_name": f"Place {start + i}",
+                "language": "en",
+                # Spread passages over the request destinations so the geo pre-filter has something to match
+                **place_fields(resolve_place(DESTINATIONS[(start + i) % len(DESTINATIONS)])),
+            })
+            for i, (text, vector) in enumerate(zip(block, vectors))
+        ])
+
+
+async def one_request(client: httpx.AsyncClient, endpoint: str, i: int, unique: bool):
+    """Returns (seconds, time to first byte or None, ok)."""
+    start = time.perf_counter()
+    if endpoint == "chat":
+        response = await client.post("/v1/basicChat", json={"message": f"What should I eat in {DESTINATIONS[i % len(DESTINATIONS)]}?"})
+        return time.perf_counter() - start, None, response.status_code == 200
+    if endpoint == "stream":
+        first_byte = None
+        async with client.stream("POST", "/v1/generateTripPlan/stream", json=plan_request(i, unique)) as response:
+            async for _ in response.aiter_bytes():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+            ok = response.status_code == 200
+        return time.perf_counter() - start, first_byte, ok
+    response = await client.post("/v1/generateTripPlan", json=plan_request(i, unique))
+    ok = response.status_code == 200 and response.json().get("meta", {}).get("status") in ("success", "cache_hit", "partial")
+    return time.perf_counter() - start, None, ok
+
+
+async def run_load(client: httpx.AsyncClient, endpoint: str, concurrency: int, total: int, unique: bool):
+    latencies, first_bytes, errors = [], [], 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            try:
+                seconds, first_byte, ok = await one_request(client, endpoint, i, unique)
+            except Exception as e:
+                print(f"request {i} failed: {e}")
+                errors += 1
+                continue
+            latencies.append(seconds)
+            if first_byte is not None:
+                first_bytes.append(first_byte)
+            errors += 0 if ok else 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    result = {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "requests_per_second": round(total / wall, 2),
+        "latency": latency_summary(latencies) if latencies else None,
+    }
+    if first_bytes:
+        result["time_to_first_byte"] = latency_summary(first_bytes)
+    return result
+
+
+async def main_async(args) -> None:
+    endpoints = args.endpoints.split(",")
+    offline = not args.url
+    llm = stub_llm_server(args.llm_latency_ms, args.llm_token_latency_ms, args.llm_error_rate) if offline else nullcontext(None)
+    with llm as llm_url:
+        if offline:
+            os.environ.update({
+                "SEALION_BASE_URL": llm_url,
+                "SEALION_API": "stub",
+                "QDRANT_HOST": "localhost",
+                "EMBEDDING_WARMUP": "false",
+            })
+            for name, value in (("INGEST_STORE_PATH", ""), ("LOCAL_INDEX_MODE", "off"), ("RESPONSE_CACHE_BACKEND", args.cache)):
+                os.environ.setdefault(name, value)
+            from app import app as service
+
+            await seed_offline_service(service, args.points)
+            transport = httpx.ASGITransport(app=service.app)
+            client = httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None)
+        else:
+            client = httpx.AsyncClient(base_url=args.url, timeout=None)
+
+        results = []
+        async with client:
+            for endpoint in endpoints:
+                for concurrency in (int(x) for x in args.concurrency.split(",")):
+                    result = await run_load(client, endpoint, concurrency, args.requests, not args.repeat_requests)
+                    results.append(result)
+                    latency = result["latency"] or {}
+                    print(f"{endpoint:<7} c={concurrency:<4} {result['requests_per_second']:8.2f} req/s  "
+                          f"p50 {latency.get('p50_ms')} ms  p99 {latency.get('p99_ms')} ms  errors {result['errors']}")
+            server = {}
+            for path in ("/v1/llmStats", "/v1/embeddingStats"):
+                try:
+                    server[path] = (await client.get(path)).json()
+                except Exception as e:
+                    server[path] = {"error": str(e)}
+
+    config = {**vars(args), "mode": "offline" if offline else "remote"}
+    write_results("load", config, {"runs": results, "server_stats": server}, args.output)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end RAG load test")
+    parser.add_argument("--url", help="base URL of a running service; omit for the offline in-process run")
+    parser.add_argument("--endpoints", default="plan", help="comma list of plan, stream, chat")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma list of concurrent clients")
+    parser.add_argument("--requests", type=int, default=200, help="requests per (endpoint, concurrency) run")
+    parser.add_argument("--repeat-requests", action="store_true", help="send the same request every time (exercises caches and coalescing)")
+    parser.add_argument("--points", type=int, default=5000, help="synthetic passages in the offline collection")
+    parser.add_argument("--cache", default="off", help="RESPONSE_CACHE_BACKEND for the offline run")
+    parser.add_argument("--llm-latency-ms", type=float, default=500)
+    parser.add_argument("--llm-token-latency-ms", type=float, default=0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="JSON path (default: benchmarks/results/load-<commit>-<time>.json)")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
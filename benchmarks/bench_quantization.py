@@ -0,0 +1,126 @@
+"""
+Recall-vs-memory report for truncated dimensions (EMBEDDING_DIM) and Qdrant quantization
+(VECTOR_QUANTIZATION), with and without rescoring.
+
+Ground truth is exact top-k on the full float32 vectors. Every other configuration
+searches the truncated and/or quantized representation the same way Qdrant does:
+int8 with 0.99-quantile clipping, or sign bits. With rescoring, the top
+``k * oversampling`` candidates are re-ranked with the original vectors.
+
+    uv run python -m benchmarks.bench_quantization                                 # synthetic clustered vectors
+    uv run python -m benchmarks.bench_quantization --qdrant-url http://localhost:6333 --collection demo_bge_m3
+"""
+import time
+import argparse
+import numpy as np
+
+from benchmarks.common import write_results
+from utils.hybrid import dense_part
+from utils.vector_storage import MODEL_DIM, bytes_per_vector, truncate_dim
+
+
+def clustered_vectors(n: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    """Points around random centres, closer to real embedding neighbourhoods than pure noise."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim), dtype=np.float32)
+    points = centres[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim), dtype=np.float32)
+    return points / np.linalg.norm(points, axis=1, keepdims=True)
+
+
+def collection_vectors(url: str, collection: str, limit: int) -> np.ndarray:
+    from qdrant_client import QdrantClient
+
+    client = QdrantClient(url=url)
+    vectors, offset = [], None
+    while len(vectors) < limit:
+        records, offset = client.scroll(collection, limit=min(1024, limit - len(vectors)), offset=offset, with_vectors=True, with_payload=False)
+        vectors += [dense_part(record.vector) for record in records]
+        if offset is None:
+            break
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(scores, idx, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(idx, order, axis=1)
+
+
+def scalar_quantize(vectors: np.ndarray, quantile: float = 0.99) -> np.ndarray:
+    low, high = np.quantile(vectors, [1 - quantile, quantile])
+    scale = (high - low) / 255
+    codes = np.clip(np.round((vectors - low) / scale), 0, 255)
+    return codes * scale + low  # dequantized view: same ranking as int8 scoring
+
+
+def search(corpus: np.ndarray, queries: np.ndarray, k: int, kind: str, rescore: bool, oversampling: float) -> np.ndarray:
+    if kind == "scalar":
+        scores = queries @ scalar_quantize(corpus).T
+    elif kind == "binary":
+        scores = np.sign(queries) @ np.sign(corpus).T
+    else:
+        scores = queries @ corpus.T
+    if kind == "none" or not rescore:
+        return top_k(scores, k)
+    candidates = top_k(scores, int(k * oversampling))
+    exact = np.einsum("qd,qcd->qc", queries, corpus[candidates])
+    return np.take_along_axis(candidates, top_k(exact, k), axis=1)
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recall vs memory for EMBEDDING_DIM and VECTOR_QUANTIZATION")
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dims", default=f"{MODEL_DIM},512,256,128")
+    parser.add_argument("--quantization", default="none,scalar,binary")
+    parser.add_argument("--oversampling", type=float, default=2.0)
+    parser.add_argument("--clusters", type=int, default=200, help="synthetic mode only")
+    parser.add_argument("--qdrant-url", help="read real vectors from this Qdrant instead of synthesising them")
+    parser.add_argument("--collection", default="demo_bge_m3")
+    parser.add_argument("--output", help="JSON path (default: benchmarks/results/quantization-<commit>-<time>.json)")
+    args = parser.parse_args()
+
+    if args.qdrant_url:
+        vectors = collection_vectors(args.qdrant_url, args.collection, args.points + args.queries)
+    else:
+        vectors = clustered_vectors(args.points + args.queries, MODEL_DIM, args.clusters)
+    rng = np.random.default_rng(1)
+    order = rng.permutation(len(vectors))
+    queries, corpus = vectors[order[:args.queries]], vectors[order[args.queries:]]
+    truth = top_k(queries @ corpus.T, args.k)
+
+    results = []
+    print(f"{'dim':>5} {'quant':>7} {'rescore':>8} {'recall@k':>9} {'search MB':>10} {'originals MB':>13} {'ms/query':>9}")
+    for dim in (int(x) for x in args.dims.split(",")):
+        corpus_dim, queries_dim = truncate_dim(corpus, dim), truncate_dim(queries, dim)
+        for kind in args.quantization.split(","):
+            for rescore in ((False,) if kind == "none" else (False, True)):
+                start = time.perf_counter()
+                found = search(corpus_dim, queries_dim, args.k, kind, rescore, args.oversampling)
+                elapsed = time.perf_counter() - start
+                memory = bytes_per_vector(dim, kind)
+                row = {
+                    "dim": dim,
+                    "quantization": kind,
+                    "rescore": rescore,
+                    "recall_at_k": round(recall(found, truth), 4),
+                    "search_mb": round(memory["search_bytes"] * len(corpus) / 2**20, 2),
+                    "originals_mb": round(memory["original_bytes"] * len(corpus) / 2**20, 2),
+                    "ms_per_query": round(elapsed * 1000 / len(queries), 3),
+                }
+                results.append(row)
+                print(f"{dim:>5} {kind:>7} {str(rescore):>8} {row['recall_at_k']:>9.4f} {row['search_mb']:>10.2f} "
+                      f"{row['originals_mb']:>13.2f} {row['ms_per_query']:>9.3f}")
+
+    config = {**vars(args), "source": "qdrant" if args.qdrant_url else "synthetic", "corpus_points": len(corpus)}
+    write_results("quantization", config, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
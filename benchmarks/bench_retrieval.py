@@ -0,0 +1,106 @@
+"""
+Retrieval latency against synthetic collections of 10k / 100k / 1M points.
+
+Backends:
+  local         LocalVectorIndex exact search (NumPy matrix-vector product)
+  local-hnsw    LocalVectorIndex with hnswlib (skipped when hnswlib is not installed)
+  memory        qdrant-client in-memory mode (brute force in Python, capped by --memory-max-points)
+  qdrant        a running Qdrant at --qdrant-url (creates and drops a scratch collection)
+
+    uv run python -m benchmarks.bench_retrieval --sizes 10000,100000,1000000 --dim 1024
+"""
+import time
+import argparse
+import importlib.util
+import numpy as np
+
+from benchmarks.common import latency_summary, synthetic_vectors, write_results
+
+
+def build_local(vectors: np.ndarray, algorithm: str, dtype: str):
+    from utils.local_index import LocalVectorIndex
+
+    # The Qdrant client is only used for snapshots/refresh, which are not exercised here
+    index = LocalVectorIndex("http://localhost:6333", "bench", algorithm=algorithm, dtype=dtype)
+    index.add(list(range(len(vectors))), vectors, [{"i": i} for i in range(len(vectors))])
+    index.loaded_at = time.time()
+    return lambda query, limit: index.search(query, limit)
+
+
+def build_qdrant(vectors: np.ndarray, location: str, batch_size: int = 1000):
+    from qdrant_client import QdrantClient
+    from qdrant_client.models import Distance, PointStruct, VectorParams
+
+    client = QdrantClient(location=location)
+    collection = "bench_retrieval"
+    client.recreate_collection(collection, vectors_config=VectorParams(size=vectors.shape[1], distance=Distance.COSINE))
+    for start in range(0, len(vectors), batch_size):
+        block = vectors[start:start + batch_size]
+        client.upsert(collection, points=[
+            PointStruct(id=start + i, vector=vector.tolist(), payload={"i": start + i})
+            for i, vector in enumerate(block)
+        ], wait=True)
+
+    def search(query, limit):
+        return client.search(collection_name=collection, query_vector=query.tolist(), limit=limit, with_payload=True)
+
+    search.cleanup = lambda: client.delete_collection(collection)
+    return search
+
+
+def run_queries(search, queries: np.ndarray, limit: int, warmup: int = 5):
+    for query in queries[:warmup]:
+        search(query, limit)
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query, limit)
+        latencies.append(time.perf_counter() - start)
+    return latency_summary(latencies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Retrieval latency benchmark")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--backends", default="local,local-hnsw,memory")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    parser.add_argument("--memory-max-points", type=int, default=100_000, help="skip in-memory Qdrant above this size")
+    parser.add_argument("--qdrant-url", default="http://localhost:6333")
+    parser.add_argument("--output", help="JSON path (default: benchmarks/results/retrieval-<commit>-<time>.json)")
+    args = parser.parse_args()
+
+    backends = args.backends.split(",")
+    queries = synthetic_vectors(args.queries, args.dim, seed=99)
+    results = []
+    for size in (int(x) for x in args.sizes.split(",")):
+        vectors = synthetic_vectors(size, args.dim, seed=size)
+        for backend in backends:
+            if backend == "local-hnsw" and importlib.util.find_spec("hnswlib") is None:
+                print("skip local-hnsw: hnswlib not installed")
+                continue
+            if backend == "memory" and size > args.memory_max_points:
+                print(f"skip memory at {size} points (> --memory-max-points)")
+                continue
+
+            start = time.perf_counter()
+            if backend in ("local", "local-hnsw"):
+                search = build_local(vectors, "hnsw" if backend == "local-hnsw" else "exact", args.dtype)
+            else:
+                search = build_qdrant(vectors, ":memory:" if backend == "memory" else args.qdrant_url)
+            build_seconds = time.perf_counter() - start
+
+            summary = run_queries(search, queries, args.limit)
+            if hasattr(search, "cleanup"):
+                search.cleanup()
+            results.append({"points": size, "backend": backend, "build_seconds": round(build_seconds, 3), **summary})
+            print(f"{backend:<11} {size:>9} points  p50 {summary['p50_ms']:9.3f} ms  p99 {summary['p99_ms']:9.3f} ms")
+        del vectors
+
+    write_results("retrieval", vars(args), results, args.output)
+
+
+if __name__ == "__main__":
+    main()
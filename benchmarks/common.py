@@ -0,0 +1,140 @@
+import os
+import sys
+import json
+import time
+import socket
+import hashlib
+import platform
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+WORDS = (
+    "temple market beach island street food night bus train ferry hotel hostel museum palace "
+    "river mountain waterfall cafe noodle curry mango sticky rice tuk tuk grab taxi old town "
+    "bangkok chiang mai phuket krabi pattaya ayutthaya sukhothai pai hua hin koh samui"
+).split()
+
+
+class HashingEncoder:
+    """Tiny stand-in for the SentenceTransformer: hashed bag of words, L2-normalised.
+
+    Same ``encode`` signature as SentenceTransformer, so it can be dropped into the
+    EmbeddingEngine without downloading weights. Similar texts get similar vectors,
+    which keeps retrieval results meaningful in offline runs.
+    """
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def encode(self, texts: List[str], batch_size: int = 32, normalize_embeddings: bool = True, convert_to_numpy: bool = True, **_):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                digest = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+                out[row, digest % self.dim] += 1.0 if (digest >> 32) & 1 else -1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(out, axis=1, keepdims=True)
+            out /= np.where(norms == 0, 1, norms)
+        return out
+
+
+def install_stub_encoder(engine, dim: int = 1024) -> None:
+    """Swap the engine's model for HashingEncoder (dense-only backend)."""
+    engine.backend = "torch"
+    engine._model = HashingEncoder(dim)
+    engine.load_seconds = 0.0
+
+
+def synthetic_texts(n: int, words: int, seed: int = 0) -> List[str]:
+    rng = np.random.default_rng(seed)
+    vocab = np.array(WORDS)
+    return [" ".join(rng.choice(vocab, size=words)) for _ in range(n)]
+
+
+def synthetic_vectors(n: int, dim: int, seed: int = 0, chunk: int = 100_000) -> np.ndarray:
+    """Unit-norm float32 vectors, generated in chunks to bound peak memory."""
+    rng = np.random.default_rng(seed)
+    out = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, chunk):
+        block = rng.standard_normal((min(chunk, n - start), dim), dtype=np.float32)
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        out[start:start + len(block)] = block
+    return out
+
+
+def latency_summary(seconds: List[float]) -> Dict[str, Any]:
+    values = np.asarray(seconds) * 1000
+    return {
+        "count": len(values),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def write_results(name: str, config: Dict[str, Any], results: Any, output: Optional[str] = None) -> str:
+    """Write one benchmark run as JSON; the default path is keyed by commit so runs can be diffed."""
+    commit = git_commit() or "unknown"
+    path = output or os.path.join(RESULTS_DIR, f"{name}-{commit}-{datetime.now().strftime('%Y%m%d%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    document = {
+        "benchmark": name,
+        "commit": commit,
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "config": config,
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+    print(f"Wrote {path}")
+    return path
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def stub_llm_server(latency_ms: float = 500, token_latency_ms: float = 0, error_rate: float = 0.0, port: Optional[int] = None):
+    """Run benchmarks/llm_stub_server.py in a subprocess and yield its /v1 base URL."""
+    port = port or free_port()
+    process = subprocess.Popen([
+        sys.executable, os.path.join(REPO_ROOT, "benchmarks", "llm_stub_server.py"),
+        "--port", str(port),
+        "--latency-ms", str(latency_ms),
+        "--token-latency-ms", str(token_latency_ms),
+        "--error-rate", str(error_rate),
+    ])
+    try:
+        deadline = time.time() + 15
+        while time.time() < deadline:
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                    break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("LLM stub server did not start")
+        yield f"http://127.0.0.1:{port}/v1"
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
@@ -0,0 +1,142 @@
+"""
+OpenAI-compatible stand-in for the SEA-LION API, for load-testing the LLM gateway offline.
+
+    uv run python benchmarks/llm_stub_server.py --port 8099 --latency-ms 800 --error-rate 0.05
+    SEALION_BASE_URL=http://localhost:8099/v1 SEALION_API=stub uv run uvicorn app.app:app
+
+Each completion waits ``latency_ms`` (plus jitter) plus ``token_latency_ms`` per generated
+token, then returns a canned trip plan that
+validates against TripPlanGeneration. A fraction of calls fail with 429 or 503 so that
+retries and backoff get exercised.
+"""
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI()
+settings = {"latency_ms": 500.0, "jitter_ms": 100.0, "token_latency_ms": 0.0, "error_rate": 0.0, "chunk_chars": 24, "chunk_delay_ms": 5.0}
+counters = {"requests": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0}
+
+
+def canned_plan(days: int = 3) -> str:
+    return json.dumps({
+        "tripOverview": "A relaxed trip with local food, temples and a day at the beach.",
+        "trip_plan": {
+            "overview": "Stub itinerary",
+            "total_estimated_cost": 12000,
+            "steps": [
+                {
+                    "day": day,
+                    "title": f"Day {day}",
+                    "description": "Morning market, afternoon temple visit, evening street food.",
+                    "transport": {"mode": "bus", "departure": "Hotel", "arrival": "Old town", "duration_minutes": 30, "price": 50, "details": "Local bus"},
+                    "map_coordinates": {"lat": 13.75, "lon": 100.5},
+                    "images": [],
+                    "tips": ["Carry cash", "Start early"],
+                }
+                for day in range(1, days + 1)
+            ],
+        },
+    })
+
+
+def completion_body(model: str, content: str, prompt_chars: int) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_chars // 4, "completion_tokens": len(content) // 4, "total_tokens": (prompt_chars + len(content)) // 4},
+    }
+
+
+def chunk_body(completion_id: str, model: str, delta: dict, finish_reason=None) -> str:
+    return json.dumps({
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    })
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "stub")
+    prompt_chars = sum(len(m.get("content") or "") for m in body.get("messages", []))
+    counters["requests"] += 1
+
+    if random.random() < settings["error_rate"]:
+        counters["errors"] += 1
+        status = random.choice([429, 503])
+        return JSONResponse({"error": {"message": "stub failure", "code": status}}, status_code=status,
+                            headers={"retry-after": "0.2"} if status == 429 else None)
+
+    content = canned_plan()
+    counters["in_flight"] += 1
+    counters["max_in_flight"] = max(counters["max_in_flight"], counters["in_flight"])
+    try:
+        delay = max(settings["latency_ms"] + random.uniform(-1, 1) * settings["jitter_ms"], 0) / 1000
+        if not body.get("stream"):
+            delay += len(content) / 4 * settings["token_latency_ms"] / 1000
+        await asyncio.sleep(delay)
+    finally:
+        counters["in_flight"] -= 1
+
+    if not body.get("stream"):
+        return completion_body(model, content, prompt_chars)
+
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    step = settings["chunk_chars"]
+    chunk_delay = (settings["chunk_delay_ms"] + step / 4 * settings["token_latency_ms"]) / 1000
+
+    async def events():
+        yield f"data: {chunk_body(completion_id, model, {'role': 'assistant', 'content': ''})}\n\n"
+        for i in range(0, len(content), step):
+            await asyncio.sleep(chunk_delay)
+            yield f"data: {chunk_body(completion_id, model, {'content': content[i:i + step]})}\n\n"
+        yield f"data: {chunk_body(completion_id, model, {}, 'stop')}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+def stats():
+    return {**counters, **settings}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible LLM stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=settings["latency_ms"])
+    parser.add_argument("--jitter-ms", type=float, default=settings["jitter_ms"])
+    parser.add_argument("--token-latency-ms", type=float, default=settings["token_latency_ms"], help="extra delay per generated token (~4 chars)")
+    parser.add_argument("--error-rate", type=float, default=settings["error_rate"], help="fraction of calls answered with 429/503")
+    parser.add_argument("--chunk-chars", type=int, default=settings["chunk_chars"])
+    parser.add_argument("--chunk-delay-ms", type=float, default=settings["chunk_delay_ms"])
+    args = parser.parse_args()
+
+    settings.update(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        token_latency_ms=args.token_latency_ms,
+        error_rate=args.error_rate,
+        chunk_chars=args.chunk_chars,
+        chunk_delay_ms=args.chunk_delay_ms,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,97 +1,412 @@
 from utils.youtube_extractor import YoutubeExtractor
-from sentence_transformers import SentenceTransformer
+from utils.embedding_engine import get_embedding_engine
+from utils.transcript_chunker import chunk_transcript
+from utils.ingest_store import IngestStore, INGEST_STORE_PATH, embedding_key, youtube_point_id
+from utils.local_index import get_local_index, LOCAL_INDEX_MODE
+from utils.hybrid import hybrid_enabled, point_vector, dense_query, collection_vectors_config, hybrid_search_requests, rrf_fuse, dense_part, sparse_part
+from utils.vector_storage import qdrant_url as default_qdrant_url, vector_size, truncate_dim, search_params, qdrant_client_kwargs, quantization_config, VECTOR_QUANTIZATION
+from utils.geo import RetrievalFilter, enrich_payload, ensure_payload_indexes, geo_payload, place_fields, place_mentions, resolve_place, PLACES
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+from qdrant_client.models import PointStruct
 from typing import List, Dict, Optional, Union
 import uuid
+import time
+import numpy as np
+
+UPLOAD_BATCH_SIZE = 256
+
 
 class DataImporter:
-    def __init__(self, qdrant_url: str = "http://localhost:6333", collection_name: str = "demo_bge_m3"):
-        self.model = SentenceTransformer("BAAI/bge-m3")
-        self.client = QdrantClient(url=qdrant_url)
+    def __init__(self, qdrant_url: Optional[str] = None, collection_name: str = "demo_bge_m3", store: Optional[IngestStore] = None, create_collection: bool = True):
+        qdrant_url = qdrant_url or default_qdrant_url()
+        self.embedding_engine = get_embedding_engine()
+        # Local transcript/embedding store; set INGEST_STORE_PATH="" to disable
+        self.store = store if store is not None else (IngestStore(INGEST_STORE_PATH) if INGEST_STORE_PATH else None)
+        # location also accepts ":memory:" for an in-process Qdrant (benchmarks, offline runs)
+        self.client = QdrantClient(location=qdrant_url, **qdrant_client_kwargs(qdrant_url))
         self.collection_name = collection_name
         self.youtube_extractor = YoutubeExtractor()
+        self.local_index = get_local_index(qdrant_url, collection_name)
         
-        # Create collection if it doesn't exist
-        self._create_collection()
+        # Create collection if it doesn't exist; the API defers this to its background warm-up
+        if create_collection:
+            self._create_collection()
     
-    def _create_collection(self):
-        try:
-            collections = self.client.get_collection(self.collection_name)
-            if collections:
-                print(f"Collection '{self.collection_name}' already exists.")
-                return
+    def ensure_collection(self, collection_name: Optional[str] = None):
+        """
+        Create the collection (and its payload indexes) if it is missing. Raises when Qdrant
+        cannot be reached, so callers can retry; an existing collection is never recreated.
+        """
+        collection_name = collection_name or self.collection_name
+        if self.client.collection_exists(collection_name):
+            print(f"Collection '{collection_name}' already exists.")
+            # Collections created before the geo/language fields get their indexes here
+            ensure_payload_indexes(self.client, collection_name)
+            return
+        vectors_config, sparse_vectors_config = collection_vectors_config(vector_size())
+        self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=vectors_config,
+            sparse_vectors_config=sparse_vectors_config
+        )
+        ensure_payload_indexes(self.client, collection_name)
+        print(f"Collection '{collection_name}' created successfully")
 
-            self.client.recreate_collection(
-                collection_name=self.collection_name,
-                vectors_config=VectorParams(size=1024, distance=Distance.COSINE)
-            )
-            print(f"Collection '{self.collection_name}' created successfully")
+    def _create_collection(self, collection_name: Optional[str] = None):
+        try:
+            self.ensure_collection(collection_name)
         except Exception as e:
             print(f"Error creating collection: {e}")
     
-    def encode_text(self, texts: Union[str, List[str]]) -> List[List[float]]:
+    def encode_text(self, texts: Union[str, List[str]], use_store: bool = False) -> List[List[float]]:
+        return self.encode_array(texts, use_store).tolist()
+    
+    def encode_array(self, texts: Union[str, List[str]], use_store: bool = False) -> np.ndarray:
+        """Same as encode_text, but keeps the (n, dim) float32 array for callers that pass it on as-is."""
         if isinstance(texts, str):
             texts = [texts]
         
-        embeddings = self.model.encode(texts, normalize_embeddings=True)
-        return embeddings.tolist()
+        if not (use_store and self.store):
+            return self.embedding_engine.encode(texts)
+        
+        # Only encode texts whose (model, text) hash is not in the store yet
+        keys = [embedding_key(self.embedding_engine.fingerprint, text) for text in texts]
+        cached = self.store.get_embeddings(keys)
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+        if missing:
+            new_embeddings = self.embedding_engine.encode([texts[i] for i in missing])
+            new_items = {keys[i]: vector for i, vector in zip(missing, new_embeddings)}
+            self.store.put_embeddings(new_items)
+            cached.update(new_items)
+        return np.stack([cached[key] for key in keys]).astype(np.float32, copy=False)
+    
+    def encode_for_upsert(self, texts: List[str]):
+        """
+        Dense vectors (plus sparse weights in hybrid mode) for new points; returns (dense array, sparse_list).
+        Dense vectors come from the store in both modes. In hybrid mode stored texts only get
+        their sparse weights computed, and new ones get both from a single forward pass.
+        """
+        if not hybrid_enabled():
+            return self.encode_array(texts, use_store=True), [None] * len(texts)
+        if not self.store:
+            return self.embedding_engine.encode_hybrid(texts)
+        
+        keys = [embedding_key(self.embedding_engine.fingerprint, text) for text in texts]
+        cached = self.store.get_embeddings(keys)
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+        stored = [i for i, key in enumerate(keys) if key in cached]
+        sparse_weights: List[Optional[Dict[int, float]]] = [None] * len(texts)
+        if missing:
+            new_embeddings, new_weights = self.embedding_engine.encode_hybrid([texts[i] for i in missing])
+            new_items = {keys[i]: vector for i, vector in zip(missing, new_embeddings)}
+            self.store.put_embeddings(new_items)
+            cached.update(new_items)
+            for i, weights in zip(missing, new_weights):
+                sparse_weights[i] = weights
+        if stored:
+            for i, weights in zip(stored, self.embedding_engine.encode_sparse([texts[i] for i in stored])):
+                sparse_weights[i] = weights
+        return np.stack([cached[key] for key in keys]).astype(np.float32, copy=False), sparse_weights
     
     def insert_text(self, text: str, metadata: Optional[Dict] = None, custom_id: Optional[str] = None) -> str:
         point_id = custom_id or str(uuid.uuid4())
-        embedding = self.encode_text(text)[0]
+        embeddings, sparse_weights = self.encode_for_upsert([text])
+        embedding = embeddings[0]
         
-        payload = {"text": text}
+        payload = {"text": text, "ingested_at": time.time()}
         if metadata:
             payload.update(metadata)
+        enrich_payload(payload)
         
         self.client.upsert(
             collection_name=self.collection_name,
-            points=[PointStruct(id=point_id, vector=embedding, payload=payload)]
+            points=[PointStruct(id=point_id, vector=point_vector(embedding.tolist(), sparse_weights[0]), payload=payload)]
         )
+        if self.local_index and self.local_index.ready:
+            self.local_index.add([point_id], [embedding], [payload])
         
         print(f"Inserted text with ID: {point_id}")
         return point_id
     
-    def insert_texts(self, texts: List[str], metadata_list: Optional[List[Dict]] = None) -> List[str]:
-        embeddings = self.encode_text(texts)
-        point_ids = [str(uuid.uuid4()) for _ in texts]
+    def insert_texts(self, texts: List[str], metadata_list: Optional[List[Dict]] = None, wait: bool = True, point_ids: Optional[List[str]] = None, replace_videos: bool = False) -> List[str]:
+        """With replace_videos, earlier points of the videos in metadata_list are deleted first (texts hold whole videos)."""
+        embeddings, sparse_weights = self.encode_for_upsert(texts)
+        point_ids = point_ids or [str(uuid.uuid4()) for _ in texts]
         
-        points = []
-        for i, (text, embedding, point_id) in enumerate(zip(texts, embeddings, point_ids)):
-            payload = {"text": text}
+        payloads = []
+        ingested_at = time.time()
+        for i, text in enumerate(texts):
+            payload = {"text": text, "ingested_at": ingested_at}
             if metadata_list and i < len(metadata_list):
                 payload.update(metadata_list[i])
-            
-            points.append(PointStruct(id=point_id, vector=embedding, payload=payload))
+            payloads.append(enrich_payload(payload))
         
-        self.client.upsert(collection_name=self.collection_name, points=points)
+        if replace_videos:
+            self.delete_video_points({payload["video_id"] for payload in payloads if payload.get("video_id")}, wait=wait)
+        self.upload_points(self.collection_name, point_ids, embeddings, sparse_weights, payloads, wait=wait)
+        if self.local_index and self.local_index.ready:
+            self.local_index.add(point_ids, embeddings, payloads)
         print(f"Inserted {len(texts)} texts")
         return point_ids
     
-    def insert_from_youtube(self, video_id: str, metadata: Optional[Dict] = None) -> Optional[str]:
+    def delete_video_points(self, video_ids, wait: bool = True) -> None:
+        """Delete every chunk of these videos, so a re-ingest that yields fewer chunks leaves none of the old ones behind."""
+        from qdrant_client.models import FieldCondition, Filter, FilterSelector, MatchAny
+        
+        if not video_ids:
+            return
+        self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=FilterSelector(filter=Filter(must=[FieldCondition(key="video_id", match=MatchAny(any=sorted(video_ids)))])),
+            wait=wait,
+        )
+    
+    def upload_points(self, collection_name: str, point_ids: List, embeddings: np.ndarray, sparse_weights: List[Optional[Dict[int, float]]], payloads: List[Dict], wait: bool = True) -> None:
+        if hybrid_enabled():
+            points = [
+                PointStruct(id=point_id, vector=point_vector(embedding.tolist(), weights), payload=payload)
+                for point_id, embedding, weights, payload in zip(point_ids, embeddings, sparse_weights, payloads)
+            ]
+            self.client.upsert(collection_name=collection_name, points=points, wait=wait)
+            return
+        # The array goes to the client as-is (packed floats with QDRANT_PREFER_GRPC) instead of per-point float lists
+        self.client.upload_collection(
+            collection_name=collection_name,
+            vectors=np.asarray(embeddings, dtype=np.float32),
+            payload=payloads,
+            ids=point_ids,
+            batch_size=UPLOAD_BATCH_SIZE,
+            wait=wait,
+        )
+    
+    def build_youtube_chunks(self, video_id: str, segments: List[Dict], metadata: Optional[Dict] = None):
+        """Split timed transcript segments into overlapping windows; returns (texts, metadata_list, point_ids)."""
+        chunks = chunk_transcript(segments)
+        # Chunks that name no place inherit the video's destination: the caller's, else the most mentioned one
+        given_place = video_place = resolve_place((metadata or {}).get("destination"))
+        if video_place is None:
+            mentions = place_mentions(" ".join(segment["text"] for segment in segments))
+            video_place = PLACES[mentions.most_common(1)[0][0]] if mentions else None
+        language = segments[0].get("language") if segments else None
+        texts = []
+        metadata_list = []
+        point_ids = []
+        for chunk in chunks:
+            chunk_metadata = {
+                "source": "youtube",
+                "video_id": video_id,
+                "chunk_index": chunk["chunk_index"],
+                "chunk_count": len(chunks),
+                "start": chunk["start"],
+                "duration": chunk["duration"],
+                **geo_payload(chunk["text"], video_place, language),
+            }
+            if metadata:
+                chunk_metadata.update(metadata)
+            if given_place is not None:
+                chunk_metadata.update(place_fields(given_place))
+            texts.append(chunk["text"])
+            metadata_list.append(chunk_metadata)
+            point_ids.append(youtube_point_id(video_id, chunk["chunk_index"]))
+        return texts, metadata_list, point_ids
+    
+    def fetch_youtube_segments(self, video_id: str, metadata: Optional[Dict] = None) -> List[Dict]:
+        """Timed transcript for a video, served from the local store when it was fetched before."""
+        if self.store:
+            segments = self.store.get_transcript(video_id)
+            if segments is not None:
+                return segments
+        segments = self.youtube_extractor.fetch_segments(video_id)
+        if self.store and segments:
+            self.store.put_transcript(video_id, segments, metadata)
+        return segments
+    
+    def insert_from_youtube(self, video_id: str, metadata: Optional[Dict] = None) -> Optional[List[str]]:
         try:
-            # Extract text from YouTube (assuming your YoutubeExtractor has this method)
-            text = self.youtube_extractor.get_full_text(video_id)
-            if text:
-                video_metadata = {"source": "youtube", "video_id": video_id}
-                if metadata:
-                    video_metadata.update(metadata)
-                
-                return self.insert_text(text, video_metadata)
+            # Split the timed transcript into overlapping windows so every part of the video is embedded
+            segments = self.fetch_youtube_segments(video_id, metadata)
+            if segments:
+                texts, metadata_list, point_ids = self.build_youtube_chunks(video_id, segments, metadata)
+                return self.insert_texts(texts, metadata_list, point_ids=point_ids, replace_videos=True)
             return None
         except Exception as e:
             print(f"Error extracting from YouTube: {e}")
             return None
     
+    def reindex_from_store(self, batch_size: int = 256) -> int:
+        """
+        Rebuild the collection from the local store. Transcripts and embeddings come from
+        disk, so a rebuild with the same model costs only the Qdrant upserts.
+        """
+        if not self.store:
+            raise RuntimeError("Ingest store is disabled")
+        
+        texts, metadata_list, point_ids = [], [], []
+        total = 0
+        for video_id, segments, metadata in self.store.iter_transcripts():
+            video_texts, video_metadata, video_ids = self.build_youtube_chunks(video_id, segments, metadata)
+            texts += video_texts
+            metadata_list += video_metadata
+            point_ids += video_ids
+            if len(texts) >= batch_size:
+                self.insert_texts(texts, metadata_list, wait=False, point_ids=point_ids, replace_videos=True)
+                total += len(texts)
+                texts, metadata_list, point_ids = [], [], []
+        if texts:
+            self.insert_texts(texts, metadata_list, wait=False, point_ids=point_ids, replace_videos=True)
+            total += len(texts)
+        print(f"Reindexed {total} chunks from {self.store.path}")
+        return total
+    
+    def apply_quantization(self) -> bool:
+        """Switch an existing collection to VECTOR_QUANTIZATION in place; Qdrant re-quantizes in the background."""
+        from qdrant_client.models import Disabled
+
+        quantization = quantization_config() or Disabled.DISABLED
+        print(f"Setting quantization '{VECTOR_QUANTIZATION}' on '{self.collection_name}'")
+        return self.client.update_collection(collection_name=self.collection_name, quantization_config=quantization)
+
+    def backfill_payload_fields(self, batch_size: int = UPLOAD_BATCH_SIZE) -> int:
+        """
+        Add destination/location/language fields to points ingested before they existed,
+        derived from each point's own text. Vectors are untouched.
+        """
+        from qdrant_client.models import Filter, IsEmptyCondition, PayloadField, SetPayload, SetPayloadOperation
+
+        missing = Filter(must=[IsEmptyCondition(is_empty=PayloadField(key="language"))])
+        total, offset = 0, None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=missing,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False,
+            )
+            operations = []
+            for record in records:
+                payload = dict(record.payload or {})
+                added = {k: v for k, v in enrich_payload(payload).items() if k not in (record.payload or {})}
+                if added:
+                    operations.append(SetPayloadOperation(set_payload=SetPayload(payload=added, points=[record.id])))
+            if operations:
+                self.client.batch_update_points(collection_name=self.collection_name, update_operations=operations)
+                total += len(operations)
+            if offset is None:
+                break
+        print(f"Backfilled payload fields on {total} points in '{self.collection_name}'")
+        return total
+
+    def migrate_collection(self, target_name: str, batch_size: int = UPLOAD_BATCH_SIZE, swap_alias: bool = False) -> int:
+        """
+        Copy every point into a new collection created with the current storage settings
+        (vector size, quantization, on-disk originals). Stored vectors are re-used, and
+        truncated when EMBEDDING_DIM is smaller than the source, so nothing is re-encoded.
+        With swap_alias the source collection is dropped and its name becomes an alias of
+        the target, so the service keeps using the old name.
+        """
+        source_name = self.collection_name
+        self._create_collection(target_name)
+        size = vector_size()
+        total = 0
+        missing_sparse = 0
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=source_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            if records:
+                embeddings = np.asarray([dense_part(record.vector) for record in records], dtype=np.float32)
+                if embeddings.shape[1] < size:
+                    raise ValueError(f"Source vectors have {embeddings.shape[1]} dimensions, target needs {size}")
+                sparse_weights = [sparse_part(record.vector) for record in records]
+                missing_sparse += sum(weights is None for weights in sparse_weights)
+                self.upload_points(
+                    target_name,
+                    [record.id for record in records],
+                    truncate_dim(embeddings, size),
+                    sparse_weights,
+                    [record.payload or {} for record in records],
+                )
+                total += len(records)
+                print(f"Migrated {total} points to '{target_name}'")
+            if offset is None:
+                break
+        
+        if hybrid_enabled() and missing_sparse:
+            print(f"Warning: {missing_sparse} points had no sparse vector; re-ingest them for hybrid retrieval")
+        if swap_alias:
+            self.swap_alias(source_name, target_name)
+        return total
+
+    def swap_alias(self, alias_name: str, target_name: str):
+        """
+        Make ``alias_name`` point at ``target_name`` and drop the collection it pointed at before.
+
+        When the name is already an alias, the switch is a single atomic alias update and
+        the old collection is dropped only afterwards, so readers never see the name missing.
+        A physical collection with that name has to be dropped before the alias can be
+        created (collections and aliases share one namespace), which leaves a short gap.
+        After that first swap the name is an alias, so later migrations are atomic.
+        """
+        from qdrant_client.models import CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation
+
+        aliases = {alias.alias_name: alias.collection_name for alias in self.client.get_aliases().aliases}
+        create = CreateAliasOperation(create_alias=CreateAlias(collection_name=target_name, alias_name=alias_name))
+        if alias_name in aliases:
+            self.client.update_collection_aliases(change_aliases_operations=[
+                DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias_name)),
+                create,
+            ])
+            if aliases[alias_name] != target_name:
+                self.client.delete_collection(aliases[alias_name])
+        else:
+            self.client.delete_collection(alias_name)
+            self.client.update_collection_aliases(change_aliases_operations=[create])
+        print(f"'{alias_name}' is now an alias of '{target_name}'")
+    
     def search_similar(self, query: str, limit: int = 5) -> List[Dict]:
+        if hybrid_enabled():
+            dense, sparse_weights = self.embedding_engine.encode_hybrid(query)
+            return self.search_by_vector(dense[0].tolist(), limit, sparse_weights[0])
         query_embedding = self.encode_text(query)[0]
-        
-        results = self.client.search(
-            collection_name=self.collection_name,
-            query_vector=query_embedding,
-            limit=limit
-        )
+        return self.search_by_vector(query_embedding, limit)
+    
+    def search_by_vector(self, query_embedding: List[float], limit: int = 5, query_sparse: Optional[Dict[int, float]] = None, query_filter: Optional[RetrievalFilter] = None) -> List[Dict]:
+        local_ready = self.local_index is not None and self.local_index.ready
+        where = query_filter.matches if query_filter else None
+        qdrant_filter = query_filter.to_qdrant() if query_filter else None
+        if local_ready and LOCAL_INDEX_MODE == "primary":
+            results = self.local_index.search(query_embedding, limit, where)
+        else:
+            try:
+                if hybrid_enabled() and query_sparse is not None:
+                    # Dense and sparse legs in one round trip, fused with RRF
+                    results = rrf_fuse(
+                        self.client.search_batch(
+                            collection_name=self.collection_name,
+                            requests=hybrid_search_requests(query_embedding, query_sparse, limit, qdrant_filter)
+                        ),
+                        limit
+                    )
+                else:
+                    results = self.client.search(
+                        collection_name=self.collection_name,
+                        query_vector=dense_query(query_embedding),
+                        query_filter=qdrant_filter,
+                        limit=limit,
+                        search_params=search_params()
+                    )
+            except Exception as e:
+                if not local_ready:
+                    raise
+                print(f"Qdrant search failed, answering from local index: {e}")
+                results = self.local_index.search(query_embedding, limit, where)
         
         return [
             {
@@ -0,0 +1,65 @@
+import argparse
+import json
+from data_importer import DataImporter
+from utils.vector_storage import qdrant_url
+from utils.ingest_pipeline import BatchIngestor, IngestJob, INGEST_FETCH_WORKERS, INGEST_ENCODE_BATCH_SIZE
+
+
+def read_video_ids(path: str) -> list[str]:
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-ingest YouTube transcripts into Qdrant")
+    parser.add_argument("video_ids", nargs="*", help="YouTube video ids")
+    parser.add_argument("--file", help="Text file with one video id per line")
+    parser.add_argument("--qdrant-url", default=qdrant_url(), help="default: QDRANT_URL or QDRANT_HOST")
+    parser.add_argument("--collection", default="demo_bge_m3")
+    parser.add_argument("--workers", type=int, default=INGEST_FETCH_WORKERS, help="Concurrent transcript fetches")
+    parser.add_argument("--encode-batch-size", type=int, default=INGEST_ENCODE_BATCH_SIZE)
+    parser.add_argument("--max-retries", type=int, default=2)
+    parser.add_argument("--reindex-from-store", action="store_true",
+                        help="Re-upsert every transcript in the local ingest store without refetching or re-encoding")
+    parser.add_argument("--apply-quantization", action="store_true",
+                        help="Set VECTOR_QUANTIZATION on the existing collection in place")
+    parser.add_argument("--migrate-to", metavar="COLLECTION",
+                        help="Copy the collection into a new one created with the current EMBEDDING_DIM / VECTOR_QUANTIZATION settings")
+    parser.add_argument("--swap-alias", action="store_true",
+                        help="With --migrate-to: drop the old collection and make its name an alias of the new one")
+    parser.add_argument("--backfill-payload", action="store_true",
+                        help="Add destination/location/language payload fields to points ingested before they existed")
+    args = parser.parse_args()
+
+    video_ids = list(args.video_ids)
+    if args.file:
+        video_ids += read_video_ids(args.file)
+    maintenance = args.reindex_from_store or args.apply_quantization or args.migrate_to or args.backfill_payload
+    if not video_ids and not maintenance:
+        parser.error("no video ids given")
+
+    importer = DataImporter(qdrant_url=args.qdrant_url, collection_name=args.collection)
+    if args.migrate_to:
+        importer.migrate_collection(args.migrate_to, swap_alias=args.swap_alias)
+    if args.apply_quantization:
+        importer.apply_quantization()
+    if args.reindex_from_store:
+        importer.reindex_from_store(batch_size=args.encode_batch_size)
+    if args.backfill_payload:
+        importer.backfill_payload_fields()
+    if not video_ids:
+        return
+    ingestor = BatchIngestor(importer, fetch_workers=args.workers, encode_batch_size=args.encode_batch_size)
+    job = IngestJob(video_ids)
+
+    def report(job: IngestJob):
+        done = job.completed + job.failed + job.skipped
+        print(f"[{done}/{len(job.video_ids)}] completed={job.completed} failed={job.failed} "
+              f"retried={job.retried} chunks={job.chunks_inserted}")
+
+    ingestor.run(job, max_retries=args.max_retries, on_progress=report)
+    print(json.dumps(job.to_status().model_dump(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,24 @@ class YoutubeLinkResponse(BaseModel):
     message: str
     video_url: str
 
+class BatchIngestRequest(BaseModel):
+    video_ids: List[str]
+    metadata: Optional[Dict[str, Any]] = None
+    max_retries: Optional[int] = Field(2, description="Retries per video when the transcript fetch fails")
+
+class IngestJobStatus(BaseModel):
+    job_id: str
+    status: str
+    total: int
+    completed: int = 0
+    failed: int = 0
+    retried: int = 0
+    skipped: int = 0
+    chunks_inserted: int = 0
+    errors: Dict[str, str] = {}
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
 
 class PlanRequest(BaseModel):
     start_place: str
@@ -28,6 +46,8 @@ class PlanRequest(BaseModel):
     group_size: Optional[int] = 1
     preferences: Optional[List[str]] = None
     top_k: Optional[int] = 3
+    language: Optional[str] = Field(None, description="Only retrieve transcripts in this language, e.g. en or th")
+    search_radius_km: Optional[float] = Field(None, description="Retrieve content within this distance of the destination")
 
 
 class RetrievedItem(BaseModel):
@@ -38,26 +58,44 @@ class RetrievedItem(BaseModel):
     metadata: Optional[Dict[str, Any]] = None
 
 class TransportInfo(BaseModel):
-    mode: Optional[str]
-    departure: Optional[str]
-    arrival: Optional[str]
-    duration_minutes: Optional[int]
-    price: Optional[float]
-    details: Optional[str]
+    mode: Optional[str] = None
+    departure: Optional[str] = None
+    arrival: Optional[str] = None
+    duration_minutes: Optional[int] = None
+    price: Optional[float] = None
+    details: Optional[str] = None
 
 class PlanStep(BaseModel):
-    day: Optional[int]
-    title: Optional[str]
-    description: Optional[str]
-    transport: Optional[TransportInfo]
-    map_coordinates: Optional[Dict[str, float]]
-    images: Optional[List[str]]
-    tips: Optional[List[str]]
+    day: Optional[int] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    transport: Optional[TransportInfo] = None
+    map_coordinates: Optional[Dict[str, float]] = None
+    images: Optional[List[str]] = None
+    tips: Optional[List[str]] = None
 
 class TripPlan(BaseModel):
-    overview: str
-    total_estimated_cost: Optional[float]
-    steps: List[PlanStep]
+    overview: str = ""
+    total_estimated_cost: Optional[float] = None
+    steps: List[PlanStep] = []
+
+class TripPlanGeneration(BaseModel):
+    """The part of PlanResponse the LLM generates; its JSON schema is sent for structured output."""
+    tripOverview: str = ""
+    trip_plan: TripPlan
+
+class DaySkeleton(BaseModel):
+    day: int
+    title: str = ""
+    focus: str = ""
+    location: Optional[str] = None
+
+class PlanSkeleton(BaseModel):
+    """First, short call of per-day planning: the overview plus one line per day."""
+    tripOverview: str = ""
+    overview: str = ""
+    total_estimated_cost: Optional[float] = None
+    days: List[DaySkeleton] = []
 
 class PlanResponse(BaseModel):
     tripOverview: str
@@ -68,3 +106,48 @@ class PlanResponse(BaseModel):
     
 class ChatRequest(BaseModel):
     message: str
+
+class ChatTurnRequest(BaseModel):
+    message: str
+    session_id: Optional[str] = Field(None, description="Omit to start a new conversation")
+    destination: Optional[str] = Field(None, description="Keeps retrieval on this destination for the whole session")
+    language: Optional[str] = Field(None, description="Only retrieve transcripts in this language, e.g. en or th")
+    top_k: Optional[int] = 3
+
+class ChatMessage(BaseModel):
+    role: str
+    content: str
+
+class ChatTurnResponse(BaseModel):
+    session_id: str
+    reply: str
+    retrieved_data: List[RetrievedItem] = []
+    meta: Dict[str, Any] = {}
+
+class ChatSessionState(BaseModel):
+    session_id: str
+    destination: Optional[str] = None
+    language: Optional[str] = None
+    summary: str = ""
+    summarized_messages: int = 0
+    messages: List[ChatMessage] = []
+    created_at: float
+    updated_at: float
+
+class BatchPlanRequest(BaseModel):
+    requests: List[PlanRequest]
+    concurrency: Optional[int] = Field(None, description="Concurrent LLM generations (default BATCH_PLAN_CONCURRENCY)")
+    warm_cache: bool = Field(True, description="Store successful plans in the response cache")
+
+class BatchPlanStatus(BaseModel):
+    job_id: str
+    status: str
+    total: int
+    completed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    output_path: Optional[str] = None
+    errors: Dict[str, str] = {}
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    elapsed_seconds: Optional[float] = None
@@ -0,0 +1,48 @@
+import argparse
+import asyncio
+import json
+from utils.llm_caller import LLMCaller
+from utils.batch_planner import BatchPlanner, BatchPlanJob, read_plan_requests, BATCH_PLAN_CONCURRENCY, BATCH_SEARCH_CONCURRENCY, BATCH_ENCODE_BATCH_SIZE
+
+
+async def run(args) -> BatchPlanJob:
+    requests = read_plan_requests(args.input)
+    agent = LLMCaller()
+    if args.collection:
+        agent.collection_name = args.collection
+    if args.no_warm_cache:
+        agent.response_cache = None
+    planner = BatchPlanner(agent, args.concurrency, args.search_concurrency, args.encode_batch_size)
+    job = BatchPlanJob(len(requests), output_path=args.output)
+
+    def report(job: BatchPlanJob):
+        done = job.completed + job.failed
+        print(f"[{done}/{job.total - job.skipped}] completed={job.completed} failed={job.failed} skipped={job.skipped}")
+
+    try:
+        await planner.run(job, requests, warm_cache=not args.no_warm_cache, resume=not args.no_resume, on_progress=report)
+    finally:
+        await agent.close()
+    return job
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute trip plans for a file of PlanRequests")
+    parser.add_argument("input", help="JSONL file with one PlanRequest per line (or a JSON array)")
+    parser.add_argument("--output", default="batch_plans/plans.jsonl",
+                        help="JSONL of PlanResponses; also the checkpoint a rerun resumes from")
+    parser.add_argument("--collection", help="Qdrant collection (default: the service's)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_PLAN_CONCURRENCY, help="Concurrent LLM generations")
+    parser.add_argument("--search-concurrency", type=int, default=BATCH_SEARCH_CONCURRENCY)
+    parser.add_argument("--encode-batch-size", type=int, default=BATCH_ENCODE_BATCH_SIZE)
+    parser.add_argument("--no-resume", action="store_true", help="Overwrite the output instead of skipping finished requests")
+    parser.add_argument("--no-warm-cache", action="store_true",
+                        help="Do not write plans to the response cache (warming needs RESPONSE_CACHE_BACKEND=sqlite to reach the server)")
+    args = parser.parse_args()
+
+    job = asyncio.run(run(args))
+    print(json.dumps(job.to_status().model_dump(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
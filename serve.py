@@ -0,0 +1,138 @@
+"""
+Pre-fork server: the master loads the embedding (and reranker) weights once, then forks
+uvicorn workers that share those pages copy-on-write instead of each loading its own copy.
+
+    uv run python serve.py --workers 4 --port 8000
+
+Each worker imports app.app after the fork, so Qdrant/LLM clients and their connections
+are per worker; only the model weights come from the master. Workers that die are
+re-forked from the same preloaded master.
+"""
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import argparse
+from typing import Dict
+
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", str(os.cpu_count() or 1)))
+# Intra-op threads per worker; 0 splits the cores evenly between workers
+SERVE_TORCH_THREADS = int(os.getenv("SERVE_TORCH_THREADS", "0"))
+
+
+def preload_models() -> None:
+    """Load weights in the master. No forward pass here: the first one runs in each worker after the fork."""
+    from utils.embedding_engine import get_embedding_engine
+    from utils.reranker import get_reranker, RERANK_ENABLED
+
+    get_embedding_engine().load()
+    if RERANK_ENABLED:
+        get_reranker().load()
+    # Client libraries too (openai, qdrant_client), so a worker's warm-up only constructs its clients
+    import data_importer, utils.llm_caller  # noqa: F401
+    # Keep the cyclic GC from writing to (and so un-sharing) every object loaded so far
+    gc.freeze()
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock: socket.socket, args) -> None:
+    """Child side of the fork: never returns."""
+    import uvicorn
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    threads = args.torch_threads or max(1, (os.cpu_count() or 1) // args.workers)
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    config = uvicorn.Config("app.app:app", log_level=args.log_level, timeout_keep_alive=args.keep_alive)
+    server = uvicorn.Server(config)
+    code = 0
+    try:
+        server.run(sockets=[sock])
+    except BaseException as e:
+        print(f"Worker {os.getpid()} crashed: {e}")
+        code = 1
+    finally:
+        os._exit(code)
+
+
+def spawn(sock: socket.socket, args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        run_worker(sock, args)
+    print(f"Started worker {pid}")
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API from preloaded, forked workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS)
+    parser.add_argument("--torch-threads", type=int, default=SERVE_TORCH_THREADS)
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--keep-alive", type=int, default=5)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--no-preload", action="store_true", help="let every worker load its own model (for comparison)")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py needs os.fork; use uvicorn directly on this platform")
+    if not args.no_preload:
+        start = time.perf_counter()
+        preload_models()
+        print(f"Preloaded models in {time.perf_counter() - start:.1f}s")
+
+    sock = bind_socket(args.host, args.port, args.backlog)
+    workers: Dict[int, float] = {}
+    stopping = False
+
+    def stop(signum, _frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for _ in range(args.workers):
+        workers[spawn(sock, args)] = time.monotonic()
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = workers.pop(pid, None)
+        if started is None or stopping:
+            continue
+        print(f"Worker {pid} exited with status {status}; restarting")
+        # Back off a little when workers die right after starting (e.g. Qdrant unreachable at import)
+        if time.monotonic() - started < 5:
+            time.sleep(1)
+        workers[spawn(sock, args)] = time.monotonic()
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import numpy as np
+import utils.batch_planner
+from interface import PlanRequest, PlanResponse, TripPlan
+from utils.batch_planner import BatchPlanJob, BatchPlanJobManager, BatchPlanner, completed_keys, read_plan_requests
+from utils.job_registry import JobRegistry
+from utils.response_cache import exact_key
+
+
+class FakeEngine:
+    supports_sparse = False
+
+    def __init__(self):
+        self.batches = []
+
+    async def encode_async(self, texts, batch_size):
+        self.batches.append(len(texts))
+        return np.ones((len(texts), 2), dtype=np.float32)
+
+
+class FakeAgent:
+    def __init__(self, failing=()):
+        self.embedding_model = FakeEngine()
+        self.failing = set(failing)
+        self.generated = []
+        self.active = 0
+        self.max_active = 0
+
+    def build_query_text(self, request):
+        return f"{request.start_place} to {request.destination_place}"
+
+    async def retrieve_context(self, request, query_text, query_embedding=None, query_sparse=None):
+        return [], "context", {}
+
+    async def generate_from_context(self, request, query_text, embedding, retrieved_data, context_text, context_stats, cache=True):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        if request.destination_place in self.failing:
+            raise RuntimeError("model unavailable")
+        self.generated.append(request.destination_place)
+        return PlanResponse(
+            tripOverview=request.destination_place, query_params=request, retrieved_data=[],
+            trip_plan=TripPlan(overview="", total_estimated_cost=0.0, steps=[]), meta={"status": "success"},
+        )
+
+    def error_response(self, request, error):
+        return PlanResponse(
+            tripOverview="", query_params=request, retrieved_data=[],
+            trip_plan=TripPlan(overview="", total_estimated_cost=0.0, steps=[]), meta={"status": "error", "error": str(error)},
+        )
+
+
+def requests(*destinations):
+    return [PlanRequest(start_place="Bangkok", destination_place=destination, trip_duration_days=2) for destination in destinations]
+
+
+def test_batch_run_dedupes_caps_generation_and_writes_the_checkpoint(tmp_path):
+    output = str(tmp_path / "plans.jsonl")
+    agent = FakeAgent(failing={"Krabi"})
+    planner = BatchPlanner(agent, concurrency=2, encode_batch_size=2)
+    batch = requests("Chiang Mai", "Pai", "Krabi", "Nan", "Chiang Mai")
+
+    job = asyncio.run(planner.run(BatchPlanJob(len(batch), output), batch))
+
+    status = job.to_status()
+    assert (status.status, status.completed, status.failed, status.skipped) == ("completed_with_errors", 3, 1, 1)
+    assert list(status.errors.values()) == ["model unavailable"]
+    assert agent.embedding_model.batches == [2, 2]
+    assert agent.max_active == 2
+    assert completed_keys(output) == {exact_key(r) for r in requests("Chiang Mai", "Pai", "Nan")}
+
+
+def test_resume_only_generates_missing_and_failed_plans(tmp_path):
+    output = str(tmp_path / "plans.jsonl")
+    batch = requests("Chiang Mai", "Pai", "Krabi")
+    asyncio.run(BatchPlanner(FakeAgent(failing={"Krabi"})).run(BatchPlanJob(3, output), batch))
+    # A crash mid-write leaves a partial last line behind
+    with open(output, "a") as f:
+        f.write('{"key": "cut')
+
+    agent = FakeAgent()
+    job = asyncio.run(BatchPlanner(agent).run(BatchPlanJob(3, output), batch))
+
+    assert agent.generated == ["Krabi"]
+    assert (job.status, job.completed, job.skipped) == ("completed", 1, 2)
+    assert len(completed_keys(output)) == 3
+
+
+def test_read_plan_requests_accepts_jsonl_and_json_arrays(tmp_path):
+    items = [r.model_dump() for r in requests("Pai", "Nan")]
+    jsonl = tmp_path / "requests.jsonl"
+    jsonl.write_text("# comment\n" + "\n".join(json.dumps(item) for item in items) + "\n\n")
+    array = tmp_path / "requests.json"
+    array.write_text(json.dumps(items))
+
+    assert [r.destination_place for r in read_plan_requests(str(jsonl))] == ["Pai", "Nan"]
+    assert read_plan_requests(str(array)) == read_plan_requests(str(jsonl))
+
+
+def test_job_manager_keeps_only_the_newest_finished_jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils.batch_planner, "BATCH_OUTPUT_DIR", str(tmp_path))
+    manager = BatchPlanJobManager(BatchPlanner(FakeAgent()), JobRegistry(max_retained=1))
+
+    async def scenario():
+        first = manager.submit(requests("Pai"))
+        await asyncio.gather(*manager._tasks.values())
+        second = manager.submit(requests("Nan"))
+        await asyncio.gather(*manager._tasks.values())
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert manager.get(first.job_id) is None
+    assert manager.get(second.job_id).to_status().status == "completed"
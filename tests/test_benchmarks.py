@@ -0,0 +1,46 @@
+import asyncio
+import json
+import httpx
+import numpy as np
+from openai import AsyncOpenAI
+from benchmarks import llm_stub_server
+from benchmarks.common import HashingEncoder, latency_summary, write_results
+from interface import TripPlanGeneration
+from utils.llm_gateway import LLMGateway
+
+
+def test_hashing_encoder_keeps_similar_texts_close():
+    vectors = HashingEncoder(dim=256).encode(["temple night market", "night market temple", "beach ferry island"])
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+    assert vectors[0] @ vectors[1] > 0.99 > vectors[0] @ vectors[2]
+
+
+def test_latency_summary_and_results_file(tmp_path):
+    summary = latency_summary([0.001 * i for i in range(1, 101)])
+    assert summary["count"] == 100 and summary["max_ms"] == 100.0
+    assert 94 < summary["p95_ms"] < 96
+
+    output = tmp_path / "out.json"
+    assert write_results("unit", {"n": 1}, summary, output=str(output)) == str(output)
+    document = json.loads(output.read_text())
+    assert document["benchmark"] == "unit" and document["results"] == summary
+
+
+def test_stub_server_answers_the_gateway_with_a_valid_plan(monkeypatch):
+    monkeypatch.setitem(llm_stub_server.settings, "latency_ms", 0)
+    monkeypatch.setitem(llm_stub_server.settings, "jitter_ms", 0)
+    monkeypatch.setitem(llm_stub_server.settings, "chunk_delay_ms", 0)
+
+    async def scenario():
+        http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=llm_stub_server.app))
+        client = AsyncOpenAI(api_key="stub", base_url="http://stub/v1", http_client=http_client)
+        gateway = LLMGateway(client, max_retries=0)
+        messages = [{"role": "user", "content": "plan"}]
+        completion = await gateway.complete("stub-model", messages)
+        streamed = "".join([chunk.choices[0].delta.content or "" async for chunk in gateway.stream("stub-model", messages)])
+        await client.close()
+        return completion.choices[0].message.content, streamed
+
+    content, streamed = asyncio.run(scenario())
+    assert content == streamed
+    assert len(TripPlanGeneration.model_validate_json(content).trip_plan.steps) == 3
@@ -0,0 +1,115 @@
+import asyncio
+from interface import ChatMessage, ChatTurnRequest
+from utils.chat_session import CHAT_SYSTEM_PROMPT, ChatService, InMemorySessionStore, SQLiteSessionStore
+
+
+class FakeAgent:
+    top_k = 3
+
+    def __init__(self):
+        self.prompts = []
+        self.summary_prompts = []
+
+    async def retrieve(self, query_text, top_k, query_filter=None, budget_tokens=None):
+        return [], f"context for {query_text}", {"passages": 0}
+
+    async def routed_query(self, prompt, task, messages=None, max_tokens=None):
+        if messages is None:
+            self.summary_prompts.append(prompt)
+            return f" summary {len(self.summary_prompts)} ", "small"
+        self.prompts.append(messages)
+        return f"reply {len(self.prompts)}", "small"
+
+
+def converse(service, turns, destination=None):
+    async def scenario():
+        session_id = None
+        for i in range(turns):
+            response = await service.chat(ChatTurnRequest(message=f"question {i}", session_id=session_id, destination=destination))
+            session_id = response.session_id
+        await asyncio.gather(*service._tasks)
+        return session_id
+
+    return asyncio.run(scenario())
+
+
+def test_prompt_keeps_system_prefix_history_and_only_current_context():
+    agent = FakeAgent()
+    service = ChatService(agent, InMemorySessionStore())
+    converse(service, 2, destination="Chiang Mai")
+
+    messages = agent.prompts[-1]
+    assert messages[0]["content"].startswith(CHAT_SYSTEM_PROMPT)
+    assert "trip to Chiang Mai" in messages[0]["content"]
+    assert [m["content"] for m in messages[1:3]] == ["question 0", "reply 1"]
+    # Follow-ups are retrieved together with the previous question; the context is not kept in history
+    assert messages[-1]["content"] == "Travel context:\ncontext for Chiang Mai question 0 question 1\n\nMessage: question 1"
+
+
+def test_old_turns_fold_into_a_summary_in_the_background():
+    agent = FakeAgent()
+    service = ChatService(agent, InMemorySessionStore())
+    session_id = converse(service, 5)
+
+    state = service.store.get(session_id)
+    assert len(agent.summary_prompts) == 1
+    assert "user: question 0" in agent.summary_prompts[0]
+    assert state.summary == "summary 1"
+    assert state.summarized_messages == 4
+    assert [m.content for m in state.messages][:2] == ["question 2", "reply 3"]
+    assert service.stats()["summaries_in_progress"] == 0
+
+    resumed = ChatService(agent, service.store)
+    asyncio.run(resumed.chat(ChatTurnRequest(message="next", session_id=session_id)))
+    assert "Summary of the earlier conversation:\nsummary 1" in agent.prompts[-1][0]["content"]
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    store = SQLiteSessionStore(path)
+    state = store.create(destination="Krabi", language="en")
+    store.append(state.session_id, [ChatMessage(role="user", content="hi"), ChatMessage(role="assistant", content="hello")])
+    store.apply_summary(state.session_id, "greetings", 2)
+
+    other = SQLiteSessionStore(path)
+    loaded = other.get(state.session_id)
+    assert loaded.destination == "Krabi"
+    assert loaded.summary == "greetings"
+    assert loaded.messages == [] and loaded.summarized_messages == 2
+    assert len(other) == 1
+
+    assert other.delete(state.session_id)
+    assert store.get(state.session_id) is None
+
+    expiring = SQLiteSessionStore(str(tmp_path / "expiring.sqlite3"), ttl_seconds=-1)
+    assert expiring.get(expiring.create().session_id) is None
+
+
+def test_memory_store_expires_and_evicts_sessions():
+    store = InMemorySessionStore(max_sessions=2)
+    first = store.create()
+    store.create()
+    store.create()
+    assert store.get(first.session_id) is None
+    assert len(store) == 2
+
+    expiring = InMemorySessionStore(ttl_seconds=-1)
+    assert expiring.get(expiring.create().session_id) is None
+
+
+def test_concurrent_turns_schedule_one_summary():
+    agent = FakeAgent()
+    service = ChatService(agent, InMemorySessionStore())
+    session_id = converse(service, 4)
+
+    async def scenario():
+        # Two turns finish before either summary task gets to run
+        for message in ("late 1", "late 2"):
+            service.record_turn(service.store.get(session_id), message, "ok")
+        scheduled = len(service._tasks)
+        await asyncio.gather(*service._tasks)
+        return scheduled
+
+    assert asyncio.run(scenario()) == 1
+    assert len(agent.summary_prompts) == 1
+    assert service.stats()["summaries_in_progress"] == 0
@@ -0,0 +1,38 @@
+from qdrant_client import QdrantClient
+from qdrant_client.models import CreateAlias, CreateAliasOperation, Distance, VectorParams
+from data_importer import DataImporter
+
+
+def importer_with(collections) -> DataImporter:
+    importer = DataImporter.__new__(DataImporter)
+    importer.client = QdrantClient(location=":memory:")
+    for name in collections:
+        importer.client.create_collection(name, vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+    return importer
+
+
+def aliases(importer) -> dict:
+    return {alias.alias_name: alias.collection_name for alias in importer.client.get_aliases().aliases}
+
+
+def test_first_swap_replaces_physical_collection():
+    importer = importer_with(["places", "places_v2"])
+    importer.swap_alias("places", "places_v2")
+    assert aliases(importer) == {"places": "places_v2"}
+    assert [c.name for c in importer.client.get_collections().collections] == ["places_v2"]
+
+
+def test_later_swap_moves_alias_before_dropping_old_collection():
+    importer = importer_with(["places_v2", "places_v3"])
+    importer.client.update_collection_aliases(change_aliases_operations=[
+        CreateAliasOperation(create_alias=CreateAlias(collection_name="places_v2", alias_name="places"))
+    ])
+    calls = []
+    update, delete = importer.client.update_collection_aliases, importer.client.delete_collection
+    importer.client.update_collection_aliases = lambda **kw: (calls.append("update"), update(**kw))[1]
+    importer.client.delete_collection = lambda name: (calls.append(f"delete {name}"), delete(name))[1]
+
+    importer.swap_alias("places", "places_v3")
+    assert calls == ["update", "delete places_v2"]
+    assert aliases(importer) == {"places": "places_v3"}
+    assert importer.client.collection_exists("places_v3") and not importer.client.collection_exists("places_v2")
@@ -0,0 +1,75 @@
+import asyncio
+import numpy as np
+from utils.context_budget import assemble_context, compact_prompt, dedupe_passages, split_sentences
+
+
+class RecordingEncoder:
+    """Stands in for the embedding batcher: deterministic unit vectors, records what was encoded."""
+
+    def __init__(self):
+        self.encoded = []
+
+    async def encode_many(self, texts):
+        self.encoded.extend(texts)
+        vectors = np.array([[1.0, float("temple" in text.lower())] for text in texts], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_compact_prompt_drops_indentation_and_blank_lines():
+    assert compact_prompt("""
+        Plan a trip.
+
+            Return JSON.
+    """) == "Plan a trip.\nReturn JSON."
+
+
+def test_unpunctuated_captions_are_split_into_word_windows():
+    sentences = split_sentences(" ".join(f"w{i}" for i in range(100)))
+    assert [len(s.split()) for s in sentences] == [30, 30, 30, 10]
+    assert split_sentences("First one. Second one!  Third?") == ["First one.", "Second one!", "Third?"]
+
+
+def test_dedupe_drops_near_duplicates():
+    keep, dropped = dedupe_passages(["Wat Phra Singh is a temple.", "wat phra singh is a temple.", "Night market."])
+    assert keep == [0, 2] and dropped == 1
+
+
+def test_lexical_scoring_keeps_relevant_sentences_in_original_order():
+    passages = [
+        "Buses leave hourly. The old city temple is lit at night. Parking is scarce.",
+        "Try khao soi near the temple gate. Shops close early.",
+    ]
+    context, stats = asyncio.run(assemble_context(passages, "temple at night", budget_tokens=20, scoring="lexical"))
+    assert context.splitlines() == ["The old city temple is lit at night.", "Try khao soi near the temple gate."]
+    assert stats["tokens_after"] <= 20 < stats["tokens_before"]
+
+
+def test_scoring_off_keeps_whole_passages_within_budget():
+    passages = ["a " * 40, "b " * 40, "c " * 40]
+    context, stats = asyncio.run(assemble_context(passages, "query", budget_tokens=90, scoring="off"))
+    assert context.split() == ["a"] * 40 + ["b"] * 40
+    assert stats["scoring"] == "off"
+
+
+def test_embedding_scoring_goes_through_encoder_and_is_capped():
+    passages = [" ".join(f"Sentence {p}-{s} about food." for s in range(20)) for p in range(5)]
+    passages[2] += " The temple opens at dawn."
+    encoder = RecordingEncoder()
+    context, stats = asyncio.run(assemble_context(
+        passages, "temple visit", query_embedding=[0.0, 1.0], encoder=encoder, budget_tokens=20,
+        scoring="embedding", max_embedded=16,
+    ))
+    assert len(encoder.encoded) == 16
+    assert stats["sentences_embedded"] == 16
+    # The one relevant sentence survives the lexical shortlist and wins the embedding score
+    assert "The temple opens at dawn." in context
+
+
+def test_default_scoring_does_not_embed_sentences():
+    encoder = RecordingEncoder()
+    context, stats = asyncio.run(assemble_context(
+        ["Food stalls open late. The temple opens at dawn."], "temple", query_embedding=[0.0, 1.0], encoder=encoder, budget_tokens=8,
+    ))
+    assert encoder.encoded == []
+    assert stats["scoring"] == "lexical" and stats["sentences_embedded"] == 0
+    assert context == "The temple opens at dawn."
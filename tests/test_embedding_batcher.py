@@ -0,0 +1,41 @@
+import asyncio
+import numpy as np
+from utils.embedding_batcher import EmbeddingBatcher
+
+
+class FakeEngine:
+    supports_sparse = False
+
+    def __init__(self, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+
+    async def encode_async(self, texts, batch_size=32):
+        self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return np.array([[float(len(text)), 1.0] for text in texts], dtype=np.float32)
+
+
+def test_concurrent_calls_share_batches_and_get_their_own_vectors():
+    engine = FakeEngine()
+    batcher = EmbeddingBatcher(engine, max_batch_size=4, max_wait_ms=50)
+    texts = ["a", "bb", "ccc", "dddd", "eeeee", "ffffff"]
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.encode(text) for text in texts))
+
+    vectors = asyncio.run(scenario())
+    assert vectors == [[float(len(text)), 1.0] for text in texts]
+    assert sorted(len(batch) for batch in engine.batches) == [2, 4]
+    assert batcher.stats()["total_batches"] == 2
+
+
+def test_encode_errors_reach_every_caller_in_the_batch():
+    batcher = EmbeddingBatcher(FakeEngine(fail=True), max_batch_size=8, max_wait_ms=20)
+
+    async def scenario():
+        return await asyncio.gather(batcher.encode("a"), batcher.encode("b"), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+import numpy as np
+from utils.embedding_engine import EmbeddingEngine, get_embedding_engine
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size, normalize_embeddings, **kwargs):
+        self.calls.append((list(texts), batch_size, normalize_embeddings))
+        return np.full((len(texts), 4), 0.5, dtype=np.float64)
+
+
+def loaded_engine():
+    engine = EmbeddingEngine()
+    engine._model = FakeModel()
+    return engine
+
+
+def test_engine_is_shared_and_loads_lazily():
+    assert get_embedding_engine() is get_embedding_engine()
+    assert not EmbeddingEngine().is_loaded
+
+
+def test_encode_wraps_a_single_text_and_returns_float32_rows():
+    engine = loaded_engine()
+    vectors = engine.encode("hello", batch_size=8)
+    assert vectors.shape == (1, 4)
+    assert vectors.dtype == np.float32
+    assert engine.model.calls == [(["hello"], 8, True)]
+
+
+def test_data_importer_encodes_through_the_shared_engine():
+    from data_importer import DataImporter
+
+    importer = DataImporter.__new__(DataImporter)
+    importer.embedding_engine = loaded_engine()
+    assert importer.encode_text(["a", "b"]) == [[0.5] * 4] * 2
+
+
+class SlowModel(FakeModel):
+    def encode(self, texts, batch_size, normalize_embeddings, **kwargs):
+        time.sleep(0.2)
+        self.calls.append(threading.current_thread().name)
+        return super().encode(texts, batch_size, normalize_embeddings)
+
+
+def test_encode_async_runs_on_the_embedding_pool_without_blocking_the_loop():
+    engine = EmbeddingEngine()
+    engine._model = SlowModel()
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.ensure_future(ticker())
+        vectors = await engine.encode_async(["a", "b"])
+        task.cancel()
+        return vectors, ticks
+
+    try:
+        vectors, ticks = asyncio.run(scenario())
+    finally:
+        engine.shutdown()
+    assert vectors.shape == (2, 4)
+    assert engine.model.calls[0].startswith("embedding")
+    assert ticks >= 5
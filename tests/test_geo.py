@@ -0,0 +1,51 @@
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+from utils.geo import RetrievalFilter, detect_language, enrich_payload, place_mentions, resolve_place
+
+
+def test_place_mentions_match_latin_and_thai_names():
+    assert place_mentions("Chiang Mai old city, then up to Chiang Dao") == {"chiang mai": 1, "chiang dao": 1}
+    assert place_mentions("เที่ยวเชียงใหม่สามวัน แล้วไปเชียงใหม่อีกครั้ง") == {"chiang mai": 2}
+    assert resolve_place("Koh Samui, Thailand").name == "koh samui"
+    assert resolve_place("Atlantis") is None
+
+
+def test_ambiguous_names_need_a_place_cue():
+    assert not place_mentions("My nan said we should pai together, then fly to Nha Trang")
+    assert place_mentions("Two nights in Pai, then a day trip around Nan province") == {"pai": 1, "nan": 1}
+    # An exact destination needs no cue
+    assert resolve_place("Pai").name == "pai"
+    assert resolve_place("Trang, Thailand").name == "trang"
+
+
+def test_detect_language():
+    assert detect_language("ร้านกาแฟบนดอย") == "th"
+    assert detect_language("coffee shop on the mountain") == "en"
+
+
+def test_enrich_payload_normalises_destination_and_keeps_given_fields():
+    payload = enrich_payload({"text": "Sunset at Phuket", "destination": "Chiang Mai", "language": "th"})
+
+    assert payload["destination"] == "chiang mai"
+    assert payload["region"] == "north"
+    assert payload["language"] == "th"
+    assert set(payload["location"]) == {"lat", "lon"}
+
+
+def test_retrieval_filter_matches_destination_or_radius_in_python_and_qdrant():
+    near = RetrievalFilter(resolve_place("chiang mai"), radius_km=50)
+    payloads = [
+        enrich_payload({"text": "Night market in Chiang Mai"}),
+        # Tagged elsewhere, but within the radius
+        {"text": "Doi Suthep", "destination": "doi suthep", "location": {"lat": 18.80, "lon": 98.92}, "language": "en"},
+        enrich_payload({"text": "Beaches of Krabi"}),
+    ]
+    assert [near.matches(payload) for payload in payloads] == [True, True, False]
+    assert not RetrievalFilter(resolve_place("chiang mai"), language="th").matches(payloads[0])
+    assert not RetrievalFilter()
+
+    client = QdrantClient(location=":memory:")
+    client.create_collection("places", vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    client.upsert("places", points=[PointStruct(id=i, vector=[1.0, 0.0], payload=p) for i, p in enumerate(payloads)])
+    records, _ = client.scroll("places", scroll_filter=near.to_qdrant(), limit=10)
+    assert sorted(record.id for record in records) == [0, 1]
@@ -0,0 +1,41 @@
+import pytest
+from qdrant_client.models import ScoredPoint
+from utils.hybrid import rrf_fuse
+
+
+def points(*ids):
+    return [ScoredPoint(id=point_id, version=0, score=1.0 - rank / 10, payload={"text": f"p{point_id}"}) for rank, point_id in enumerate(ids)]
+
+
+def test_points_in_both_lists_rank_first_with_summed_reciprocal_ranks():
+    fused = rrf_fuse([points(1, 2, 3), points(3, 4)], limit=10, k=60)
+    assert [p.id for p in fused] == [3, 1, 2, 4]
+    assert fused[0].score == pytest.approx(1 / 63 + 1 / 61)
+    assert fused[1].score == pytest.approx(1 / 61)
+    assert fused[0].payload == {"text": "p3"}
+
+
+def test_limit_and_empty_lists():
+    assert [p.id for p in rrf_fuse([points(1, 2, 3), []], limit=2)] == [1, 2]
+    assert rrf_fuse([[], []], limit=5) == []
+
+
+def test_hybrid_collection_round_trip(monkeypatch):
+    from qdrant_client import QdrantClient
+    from qdrant_client.models import PointStruct
+    from utils import hybrid
+
+    monkeypatch.setattr(hybrid, "RETRIEVAL_MODE", "hybrid")
+    client = QdrantClient(location=":memory:")
+    vectors_config, sparse_config = hybrid.collection_vectors_config(2)
+    client.create_collection("places", vectors_config=vectors_config, sparse_vectors_config=sparse_config)
+    client.upsert("places", points=[
+        PointStruct(id=1, vector=hybrid.point_vector([1.0, 0.0], {7: 1.0}), payload={"text": "doi suthep"}),
+        PointStruct(id=2, vector=hybrid.point_vector([0.0, 1.0], {9: 1.0}), payload={"text": "night bazaar"}),
+    ])
+
+    # Dense ranks 1 first, but 2 is also the only sparse match, so fusion puts it on top
+    legs = client.search_batch("places", requests=hybrid.hybrid_search_requests([0.9, 0.1], {9: 2.0}, limit=2))
+    fused = rrf_fuse(legs, limit=2)
+    assert [p.id for p in fused] == [2, 1]
+    assert fused[0].payload == {"text": "night bazaar"}
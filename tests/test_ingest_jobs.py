@@ -0,0 +1,91 @@
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from data_importer import DataImporter
+from utils.ingest_pipeline import BatchIngestor, IngestJob, IngestJobManager
+from utils.job_registry import JobRegistry
+
+
+def transcript(video_id, count=3):
+    return [{"text": f"{video_id} part {i}", "start": i * 5.0, "duration": 5.0} for i in range(count)]
+
+
+class FakeExtractor:
+    def __init__(self, flaky=(), broken=(), empty=()):
+        self.flaky, self.broken, self.empty = set(flaky), set(broken), set(empty)
+        self.calls = []
+
+    def fetch_segments(self, video_id):
+        self.calls.append(video_id)
+        if video_id in self.broken or (video_id in self.flaky and self.calls.count(video_id) == 1):
+            raise ConnectionError(f"transcript fetch failed for {video_id}")
+        return [] if video_id in self.empty else transcript(video_id)
+
+
+class FakeImporter(DataImporter):
+    """Real chunking, fake transcript source and vector store."""
+
+    def __init__(self, extractor):
+        self.youtube_extractor = extractor
+        self.store = None
+        self.inserted = []
+
+    def insert_texts(self, texts, metadata_list=None, wait=True, **kwargs):
+        self.inserted.append(([m["video_id"] for m in metadata_list], wait))
+        return []
+
+
+def finished_job(job_id, seconds_ago):
+    return SimpleNamespace(job_id=job_id, finished_at=(datetime.utcnow() - timedelta(seconds=seconds_ago)).isoformat())
+
+
+def test_batch_run_retries_flaky_fetches_and_reports_failures():
+    importer = FakeImporter(FakeExtractor(flaky=["b"], broken=["c"], empty=["d"]))
+    ingestor = BatchIngestor(importer, fetch_workers=2, encode_batch_size=2, retry_backoff_seconds=0)
+    status = ingestor.run(IngestJob(["a", "b", "c", "d"]), max_retries=1).to_status()
+
+    assert status.status == "completed_with_errors"
+    assert (status.completed, status.failed, status.skipped, status.retried) == (2, 1, 1, 2)
+    assert set(status.errors) == {"c"}
+    assert status.chunks_inserted == 2
+    assert sorted(video_id for ids, _ in importer.inserted for video_id in ids) == ["a", "b"]
+    # Upserts do not wait for the acknowledgement
+    assert all(wait is False for _, wait in importer.inserted)
+
+
+def test_job_manager_runs_jobs_in_the_background():
+    manager = IngestJobManager(BatchIngestor(FakeImporter(FakeExtractor()), retry_backoff_seconds=0))
+    job = manager.submit(["a", "b"])
+    deadline = time.time() + 5
+    while manager.get(job.job_id).finished_at is None and time.time() < deadline:
+        time.sleep(0.01)
+    assert manager.get(job.job_id).to_status().status == "completed"
+    assert manager.get("missing") is None
+
+
+def test_duplicate_video_ids_count_once_towards_total():
+    ingestor = BatchIngestor(FakeImporter(FakeExtractor()), fetch_workers=2, retry_backoff_seconds=0)
+    status = ingestor.run(IngestJob(["a", "b", "a"])).to_status()
+    assert status.total == 2
+    assert status.completed == status.total
+
+
+def test_registry_evicts_expired_and_oldest_finished_jobs_but_keeps_running_ones():
+    registry = JobRegistry(retention_seconds=60, max_retained=2)
+    registry.add(finished_job("expired", 120))
+    registry.add(SimpleNamespace(job_id="running", finished_at=None))
+    assert registry.get("expired") is None
+
+    registry.add(finished_job("older", 30))
+    registry.add(finished_job("newer", 10))
+    assert registry.get("older") is None
+    assert registry.get("newer") is not None
+    assert registry.get("running") is not None
+    assert len(registry) == 2
+
+
+def test_job_manager_uses_the_given_registry():
+    registry = JobRegistry(max_retained=1)
+    manager = IngestJobManager(BatchIngestor(FakeImporter(FakeExtractor()), retry_backoff_seconds=0), jobs=registry)
+    job = manager.submit(["a"])
+    assert registry.get(job.job_id) is job
@@ -0,0 +1,114 @@
+import numpy as np
+import data_importer
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, VectorParams
+from data_importer import DataImporter
+from utils.ingest_store import IngestStore, embedding_key, youtube_point_id
+
+
+class CountingEngine:
+    model_name = "fake-model"
+    fingerprint = "fake-model"
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, batch_size=32):
+        self.encoded.extend(texts)
+        return np.array([[float(len(text)), 1.0, 0.0, 0.0] for text in texts], dtype=np.float32)
+
+
+class HybridEngine(CountingEngine):
+    def __init__(self):
+        super().__init__()
+        self.sparse_only = []
+
+    def encode_hybrid(self, texts):
+        return self.encode(texts), [{len(text): 1.0} for text in texts]
+
+    def encode_sparse(self, texts):
+        self.sparse_only.extend(texts)
+        return [{len(text): 1.0} for text in texts]
+
+
+class FakeExtractor:
+    def __init__(self):
+        self.fetched = []
+
+    def fetch_segments(self, video_id):
+        self.fetched.append(video_id)
+        return [{"text": f"{video_id} segment {i}", "start": i * 5.0, "duration": 5.0} for i in range(3)]
+
+
+def importer_with_store(tmp_path):
+    importer = DataImporter.__new__(DataImporter)
+    importer.embedding_engine = CountingEngine()
+    importer.store = IngestStore(str(tmp_path / "store.sqlite3"))
+    importer.client = QdrantClient(location=":memory:")
+    importer.collection_name = "places"
+    importer.client.create_collection("places", vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+    importer.youtube_extractor = FakeExtractor()
+    importer.local_index = None
+    return importer
+
+
+def test_point_ids_and_embedding_keys_are_deterministic():
+    assert youtube_point_id("abc", 0) == youtube_point_id("abc", 0)
+    assert youtube_point_id("abc", 0) != youtube_point_id("abc", 1)
+    assert embedding_key("m", "text") != embedding_key("other", "text")
+
+
+def test_store_round_trips_transcripts_and_embeddings(tmp_path):
+    store = IngestStore(str(tmp_path / "store.sqlite3"))
+    segments = [{"text": "สวัสดี", "start": 0.0, "duration": 1.5}]
+    store.put_transcript("abc", segments, {"region": "north"})
+    store.put_embeddings({"k": np.array([0.5, 0.25], dtype=np.float32)})
+
+    assert store.get_transcript("abc") == segments
+    assert store.get_transcript("missing") is None
+    assert list(store.iter_transcripts()) == [("abc", segments, {"region": "north"})]
+    assert store.get_embeddings(["k", "missing"])["k"].tolist() == [0.5, 0.25]
+
+
+def test_reingest_and_reindex_reuse_stored_transcripts_and_embeddings(tmp_path):
+    importer = importer_with_store(tmp_path)
+    first = importer.insert_from_youtube("vid")
+    encoded = len(importer.embedding_engine.encoded)
+
+    assert importer.insert_from_youtube("vid") == first
+    assert importer.youtube_extractor.fetched == ["vid"]
+    assert len(importer.embedding_engine.encoded) == encoded
+    assert importer.client.count("places").count == len(first)
+
+    importer.client.delete_collection("places")
+    importer.client.create_collection("places", vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+    assert importer.reindex_from_store() == len(first)
+    assert importer.client.count("places").count == len(first)
+    assert len(importer.embedding_engine.encoded) == encoded
+
+
+def test_hybrid_upserts_take_dense_vectors_from_the_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_importer, "hybrid_enabled", lambda: True)
+    importer = importer_with_store(tmp_path)
+    importer.embedding_engine = HybridEngine()
+
+    dense, sparse = importer.encode_for_upsert(["old", "temple"])
+    assert importer.embedding_engine.encoded == ["old", "temple"]
+
+    again, sparse_again = importer.encode_for_upsert(["temple", "new text"])
+    assert importer.embedding_engine.encoded == ["old", "temple", "new text"]
+    assert importer.embedding_engine.sparse_only == ["temple"]
+    assert np.array_equal(again[0], dense[1])
+    assert sparse_again == [{6: 1.0}, {8: 1.0}]
+
+
+def test_reingesting_a_video_drops_its_stale_chunks(tmp_path):
+    importer = importer_with_store(tmp_path)
+    importer.insert_texts(["other"], [{"video_id": "keep"}], point_ids=[youtube_point_id("keep", 0)])
+    importer.insert_texts(["a", "b", "c"], [{"video_id": "vid"}] * 3, point_ids=[youtube_point_id("vid", i) for i in range(3)])
+
+    # Rechunked into fewer windows: chunks 1 and 2 would otherwise stay searchable
+    importer.insert_texts(["abc"], [{"video_id": "vid"}], point_ids=[youtube_point_id("vid", 0)], replace_videos=True)
+
+    records, _ = importer.client.scroll("places", limit=10, with_payload=True)
+    assert sorted(record.payload["text"] for record in records) == ["abc", "other"]
@@ -0,0 +1,38 @@
+import json
+from utils.json_repair import extract_json_text, repair_json
+
+
+def test_extract_strips_fences_and_leading_prose():
+    assert extract_json_text('Here you go:\n```json\n{"a": 1}\n```') == '{"a": 1}'
+    assert extract_json_text('```\n[1, 2]\n```') == "[1, 2]"
+
+
+def test_valid_json_and_trailing_commas():
+    assert json.loads(repair_json('{"a": [1, 2,], "b": {"c": 3,},}')) == {"a": [1, 2], "b": {"c": 3}}
+
+
+def test_truncated_string_is_closed_and_kept():
+    assert json.loads(repair_json('{"steps": [{"day": 1, "note": "walk to the old ci')) == {
+        "steps": [{"day": 1, "note": "walk to the old ci"}],
+    }
+
+
+def test_truncation_mid_value_cuts_back_to_last_complete_value():
+    assert json.loads(repair_json('{"steps": [{"day": 1}, {"day": 2, "cost": ')) == {"steps": [{"day": 1}, {"day": 2}]}
+    assert json.loads(repair_json('{"steps": [{"day": 1}, {"da')) == {"steps": [{"day": 1}]}
+
+
+def test_unrepairable_text_returns_none():
+    assert repair_json("no json here") is None
+
+
+def test_text_that_parses_is_returned_unchanged():
+    text = '{"note": "a, ]", "tags": ["x, }"]}'
+    assert repair_json(text) == text
+
+
+def test_trailing_commas_inside_strings_are_kept():
+    assert json.loads(repair_json('{"note": "a, ]", "days": [1, 2,],}')) == {"note": "a, ]", "days": [1, 2]}
+    assert json.loads(repair_json('{"steps": [{"note": "x, }"}, {"day": 2, "cost": ')) == {
+        "steps": [{"note": "x, }"}, {"day": 2}],
+    }
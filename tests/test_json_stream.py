@@ -0,0 +1,38 @@
+from utils.json_stream import IncrementalJSONParser
+
+STEPS = ("trip_plan", "steps", "*")
+DOCUMENT = '```json\n{"trip_plan": {"steps": [{"day": 1, "note": "a \\"}\\" brace"}, {"day": 2, "tags": ["x", "y"]}], "total": 3.5}}\n```'
+
+
+def feed_in_chunks(parser, text, size):
+    emitted = []
+    for i in range(0, len(text), size):
+        emitted.extend(parser.feed(text[i:i + size]))
+    return emitted
+
+
+def test_steps_are_emitted_as_they_close_regardless_of_chunking():
+    expected = [
+        (("trip_plan", "steps", 0), {"day": 1, "note": 'a "}" brace'}),
+        (("trip_plan", "steps", 1), {"day": 2, "tags": ["x", "y"]}),
+    ]
+    for size in (1, 3, 7, len(DOCUMENT)):
+        parser = IncrementalJSONParser([STEPS])
+        assert feed_in_chunks(parser, DOCUMENT, size) == expected
+        assert parser.done
+
+
+def test_first_step_is_emitted_before_the_document_ends():
+    parser = IncrementalJSONParser([STEPS])
+    head, tail = DOCUMENT.split(', {"day": 2', 1)
+    assert parser.feed(head) == [(("trip_plan", "steps", 0), {"day": 1, "note": 'a "}" brace'})]
+    assert [path for path, _ in parser.feed(', {"day": 2' + tail)] == [("trip_plan", "steps", 1)]
+
+
+def test_scalars_and_keys_match_watch_paths():
+    parser = IncrementalJSONParser([("trip_plan", "total"), ("trip_plan", "steps", 1, "tags", "*")])
+    assert feed_in_chunks(parser, DOCUMENT, 5) == [
+        (("trip_plan", "steps", 1, "tags", 0), "x"),
+        (("trip_plan", "steps", 1, "tags", 1), "y"),
+        (("trip_plan", "total"), 3.5),
+    ]
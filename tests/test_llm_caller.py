@@ -0,0 +1,93 @@
+import asyncio
+import httpx
+from types import SimpleNamespace
+from openai import BadRequestError
+from utils.llm_caller import LLMCaller, rejects_structured_output, without_structured_output
+from utils.model_router import ModelRouter
+
+SCHEMA_OPTIONS = {"response_format": {"type": "json_schema", "json_schema": {"name": "trip_plan", "schema": {}}}}
+GUIDED_OPTIONS = {"extra_body": {"guided_json": {}, "top_k": 20}}
+
+
+def bad_request(message: str) -> BadRequestError:
+    response = httpx.Response(400, request=httpx.Request("POST", "http://llm/v1/chat/completions"))
+    return BadRequestError(message, response=response, body=None)
+
+
+class FakeGateway:
+    """Fails the first call with ``error`` (if any), then records what each call sent."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    async def complete(self, model, messages, max_tokens=None, **options):
+        self.calls.append({**options, "max_tokens": max_tokens} if max_tokens is not None else options)
+        if self.error is not None and len(self.calls) == 1:
+            raise self.error
+        return SimpleNamespace(usage=None, choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))])
+
+    async def stream(self, model, messages, max_tokens=None, **options):
+        self.calls.append({**options, "max_tokens": max_tokens} if max_tokens is not None else options)
+        for text in ("a", "b"):
+            yield SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+def caller(error=None) -> LLMCaller:
+    agent = LLMCaller.__new__(LLMCaller)
+    agent.system_prompt = "system"
+    agent.gateway = FakeGateway(error)
+    agent.router = ModelRouter()
+    agent.structured_output_supported = True
+    return agent
+
+
+def test_without_structured_output_keeps_other_options():
+    assert without_structured_output({**SCHEMA_OPTIONS, "max_tokens": 800}) == {"max_tokens": 800}
+    assert without_structured_output(GUIDED_OPTIONS) == {"extra_body": {"top_k": 20}}
+    assert without_structured_output({"max_tokens": 800}) == {"max_tokens": 800}
+
+
+def test_only_schema_errors_count_as_rejections():
+    assert rejects_structured_output(bad_request("response_format json_schema is not supported"), SCHEMA_OPTIONS)
+    assert not rejects_structured_output(bad_request("maximum context length is 8192 tokens"), SCHEMA_OPTIONS)
+    assert not rejects_structured_output(bad_request("response_format is not supported"), {"max_tokens": 800})
+
+
+def test_unrelated_bad_request_keeps_structured_output_on():
+    agent = caller(bad_request("This model's maximum context length is 8192 tokens"))
+    try:
+        asyncio.run(agent._create_completion("hi", "m", max_tokens=800))
+    except BadRequestError:
+        pass
+    else:
+        raise AssertionError("context-length error should propagate")
+    assert agent.structured_output_supported
+    assert len(agent.gateway.calls) == 1
+
+
+def test_schema_rejection_retries_without_schema_only():
+    agent = caller(bad_request("Unsupported parameter: response_format"))
+    completion = asyncio.run(agent._create_completion("hi", "m", max_tokens=800, **SCHEMA_OPTIONS))
+    assert completion.choices[0].message.content == "ok"
+    assert not agent.structured_output_supported
+    assert agent.gateway.calls[1] == {"max_tokens": 800}
+
+
+def test_stream_forwards_max_tokens():
+    async def scenario():
+        agent = caller()
+        messages = [{"role": "user", "content": "hi"}]
+        deltas = [delta async for delta in agent.basic_query_stream("hi", model="m", messages=messages, max_tokens=800)]
+        return agent, deltas
+
+    agent, deltas = asyncio.run(scenario())
+    assert deltas == ["a", "b"]
+    assert agent.gateway.calls == [{"max_tokens": 800}]
+
+
+def test_basic_query_forwards_max_tokens_and_defaults_to_no_cap():
+    agent = caller()
+    assert asyncio.run(agent.basic_query("hi", max_tokens=64)) == "ok"
+    assert asyncio.run(agent.basic_query("hi")) == "ok"
+    assert agent.gateway.calls == [{"max_tokens": 64}, {}]
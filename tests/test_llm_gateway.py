@@ -0,0 +1,170 @@
+import asyncio
+import time
+from types import SimpleNamespace
+import httpx
+import openai
+import pytest
+from utils.llm_gateway import DeadlineExceeded, LLMGateway, TokenBucket
+from utils.model_router import ModelRouter, RouteDecision
+
+
+class FakeCompletions:
+    """Stands in for client.chat.completions; per-model latency, records started and cancelled calls."""
+
+    def __init__(self, latency, failures=0):
+        self.latency = latency
+        self.failures = failures
+        self.started = []
+        self.cancelled = []
+        self.active = 0
+        self.max_active = 0
+
+    async def create(self, model, messages, stream, timeout, **options):
+        self.started.append(model)
+        if self.failures:
+            self.failures -= 1
+            request = httpx.Request("POST", "http://llm/chat/completions")
+            raise openai.RateLimitError("slow down", response=httpx.Response(429, request=request), body=None)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.latency[model])
+        except asyncio.CancelledError:
+            self.cancelled.append(model)
+            raise
+        finally:
+            self.active -= 1
+        return f"{model}:{messages[-1]['content']}"
+
+
+def gateway(latency, coalesce=True, failures=0, **options):
+    completions = FakeCompletions(latency, failures)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return LLMGateway(client, coalesce=coalesce, **{"max_retries": 0, **options}), completions
+
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def test_identical_requests_share_one_upstream_call():
+    async def scenario():
+        gw, completions = gateway({"m": 0.05})
+        results = await asyncio.gather(*(gw.complete("m", MESSAGES) for _ in range(5)))
+        return gw, completions, results
+
+    gw, completions, results = asyncio.run(scenario())
+    assert results == ["m:hi"] * 5
+    assert completions.started == ["m"]
+    assert gw.counters["coalesced"] == 4
+    assert gw.stats()["coalescing_groups"] == 0
+
+
+def test_per_model_concurrency_is_capped():
+    async def scenario():
+        gw, completions = gateway({"m": 0.02}, coalesce=False, max_concurrency_per_model=2)
+        await asyncio.gather(*(gw.complete("m", [{"role": "user", "content": str(i)}]) for i in range(6)))
+        return completions
+
+    completions = asyncio.run(scenario())
+    assert len(completions.started) == 6
+    assert completions.max_active == 2
+
+
+def test_rate_limited_calls_are_retried_with_backoff():
+    async def scenario():
+        gw, completions = gateway({"m": 0.0}, failures=2, max_retries=3, retry_base_seconds=0.001)
+        return gw, await gw.complete("m", MESSAGES)
+
+    gw, result = asyncio.run(scenario())
+    assert result == "m:hi"
+    assert gw.counters["retries"] == 2 and gw.counters["upstream_calls"] == 3
+
+
+def test_retries_stop_at_the_limit_and_the_deadline():
+    async def scenario():
+        gw, _ = gateway({"m": 0.0}, failures=5, max_retries=1, retry_base_seconds=0.001)
+        with pytest.raises(openai.RateLimitError):
+            await gw.complete("m", MESSAGES)
+        expired, _ = gateway({"m": 0.0}, deadline_seconds=0)
+        with pytest.raises(DeadlineExceeded):
+            await expired.complete("m", MESSAGES)
+        return gw.counters
+
+    counters = asyncio.run(scenario())
+    assert counters["failures"] == 1 and counters["upstream_calls"] == 2
+
+
+def test_token_bucket_spaces_requests_after_the_burst():
+    async def scenario():
+        bucket = TokenBucket(rate=50, capacity=2)
+        start = time.monotonic()
+        waits = [await bucket.acquire() for _ in range(4)]
+        return waits, time.monotonic() - start
+
+    waits, elapsed = asyncio.run(scenario())
+    assert waits[:2] == [0.0, 0.0]
+    assert elapsed >= 0.03
+
+
+def test_one_waiter_leaving_keeps_the_shared_call():
+    async def scenario():
+        gw, completions = gateway({"m": 0.05})
+        first = asyncio.ensure_future(gw.complete("m", MESSAGES))
+        second = asyncio.ensure_future(gw.complete("m", MESSAGES))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second, list(completions.cancelled)
+
+    result, cancelled = asyncio.run(scenario())
+    assert result == "m:hi"
+    assert cancelled == []
+
+
+def test_last_waiter_leaving_cancels_upstream_call():
+    async def scenario():
+        gw, completions = gateway({"m": 1.0})
+        call = asyncio.ensure_future(gw.complete("m", MESSAGES))
+        await asyncio.sleep(0.01)
+        call.cancel()
+        await asyncio.sleep(0.01)
+        # Checked inside the loop: asyncio.run cancels leftover tasks on exit
+        return list(completions.cancelled), gw.stats()["in_flight"]
+
+    cancelled, in_flight = asyncio.run(scenario())
+    assert cancelled == ["m"]
+    assert in_flight == {"m": 0}
+
+
+def test_hedge_loser_is_cancelled_upstream_with_coalescing():
+    async def scenario(coalesce):
+        gw, completions = gateway({"slow": 1.0, "fast": 0.02}, coalesce=coalesce)
+        router = ModelRouter(hedge_model="fast")
+        decision = RouteDecision(model="slow", reason="test", hedge_model="fast", hedge_after_seconds=0.01)
+        result, model = await router.run(decision, lambda m: gw.complete(m, MESSAGES))
+        await asyncio.sleep(0.01)
+        return list(completions.cancelled), result, model
+
+    for coalesce in (False, True):
+        cancelled, result, model = asyncio.run(scenario(coalesce))
+        assert (result, model) == ("fast:hi", "fast")
+        assert cancelled == ["slow"]
+
+
+def test_max_tokens_is_sent_and_separates_coalescing_groups():
+    class Recording(FakeCompletions):
+        def __init__(self):
+            super().__init__({"m": 0.01})
+            self.options = []
+
+        async def create(self, model, messages, stream, timeout, **options):
+            self.options.append(options)
+            return await super().create(model, messages, stream, timeout, **options)
+
+    async def scenario():
+        completions = Recording()
+        gw = LLMGateway(SimpleNamespace(chat=SimpleNamespace(completions=completions)), max_retries=0)
+        await asyncio.gather(gw.complete("m", MESSAGES, max_tokens=10), gw.complete("m", MESSAGES))
+        return completions.options
+
+    options = asyncio.run(scenario())
+    assert sorted(options, key=len) == [{}, {"max_tokens": 10}]
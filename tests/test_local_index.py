@@ -0,0 +1,91 @@
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+from utils.local_index import LocalVectorIndex
+
+
+def index_over_memory_collection():
+    client = QdrantClient(location=":memory:")
+    client.create_collection("places", vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+    index = LocalVectorIndex("http://unused:6333", "places", algorithm="exact")
+    index.client = client
+    return index, client
+
+
+def upsert(client, ids, ingested_at):
+    client.upsert("places", points=[
+        PointStruct(id=i, vector=np.eye(4)[i % 4].tolist(), payload={"text": f"p{i}", "ingested_at": ingested_at})
+        for i in ids
+    ])
+
+
+def test_search_ranks_by_dot_product_in_either_dtype():
+    for dtype in ("float32", "float16"):
+        index = LocalVectorIndex("http://unused:6333", "places", algorithm="exact", dtype=dtype)
+        index.add([10, 11, 12], np.eye(4)[:3], [{"text": "a"}, {"text": "b"}, {"text": "c"}])
+        hits = index.search([0.1, 0.9, 0.3, 0.0], limit=2)
+        assert [hit.id for hit in hits] == [11, 12]
+        assert hits[0].payload == {"text": "b"}
+        assert abs(hits[0].score - 0.9) < 1e-2
+
+
+def test_add_overwrites_existing_points_in_place():
+    index = LocalVectorIndex("http://unused:6333", "places", algorithm="exact")
+    index.add([1, 2], np.eye(4)[:2], [{"v": 1}, {"v": 1}])
+    index.add([1], np.eye(4)[3:], [{"v": 2}])
+    assert len(index) == 2
+    assert index.search([0, 0, 0, 1], limit=1)[0].payload == {"v": 2}
+
+
+def test_refresh_loads_a_snapshot_then_only_newer_points():
+    index, client = index_over_memory_collection()
+    upsert(client, [0, 1], ingested_at=100.0)
+    assert index.refresh() == 2
+    assert index.ready and index.last_ingested_at == 100.0
+
+    upsert(client, [2], ingested_at=150.0)
+    assert index.refresh() == 1
+    assert sorted(index.ids) == [0, 1, 2]
+
+
+def test_importer_answers_from_local_index_when_qdrant_fails():
+    from data_importer import DataImporter
+
+    class DownClient:
+        def search(self, **kwargs):
+            raise ConnectionError("qdrant unreachable")
+
+    index, client = index_over_memory_collection()
+    upsert(client, [0, 1], ingested_at=100.0)
+    index.load_snapshot()
+
+    importer = DataImporter.__new__(DataImporter)
+    importer.client = DownClient()
+    importer.collection_name = "places"
+    importer.local_index = index
+    results = importer.search_by_vector([0.0, 1.0, 0.0, 0.0], limit=1)
+    assert [result["text"] for result in results] == ["p1"]
+
+
+def test_refresh_picks_up_points_with_the_last_synced_timestamp():
+    index, client = index_over_memory_collection()
+    upsert(client, [0, 1], ingested_at=100.0)
+    assert index.refresh() == 2  # first refresh loads the snapshot
+
+    # Same batch timestamp, written after the snapshot was taken
+    upsert(client, [2, 3], ingested_at=100.0)
+    assert index.refresh() == 2
+    assert sorted(index.ids) == [0, 1, 2, 3]
+
+    # Nothing new: points already held with that timestamp are not re-added
+    assert index.refresh() == 0
+    assert len(index) == 4
+
+
+def test_refresh_updates_points_reingested_later():
+    index, client = index_over_memory_collection()
+    upsert(client, [0], ingested_at=100.0)
+    index.refresh()
+    upsert(client, [0], ingested_at=200.0)
+    assert index.refresh() == 1
+    assert len(index) == 1 and index.payloads[0]["ingested_at"] == 200.0
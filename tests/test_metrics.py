@@ -0,0 +1,26 @@
+import pytest
+from prometheus_client import REGISTRY, generate_latest
+from utils.metrics import register_gauge, stage_timer
+
+
+def stage_count(stage: str) -> float:
+    return REGISTRY.get_sample_value("sealion_stage_seconds_count", {"stage": stage}) or 0.0
+
+
+def test_stage_timer_observes_even_when_the_stage_fails():
+    before = stage_count("test_stage")
+    with stage_timer("test_stage"):
+        pass
+    with pytest.raises(ValueError):
+        with stage_timer("test_stage"):
+            raise ValueError("boom")
+    assert stage_count("test_stage") == before + 2
+
+
+def test_registered_gauges_are_read_at_scrape_time():
+    state = {"value": 3}
+    register_gauge("sealion_test_lazy_gauge", "Gauge read from test state", lambda: state["value"])
+    assert REGISTRY.get_sample_value("sealion_test_lazy_gauge") == 3.0
+    state["value"] = None
+    assert REGISTRY.get_sample_value("sealion_test_lazy_gauge") == 0.0
+    assert b"sealion_test_lazy_gauge" in generate_latest()
@@ -0,0 +1,111 @@
+import asyncio
+from utils.model_router import ModelRouter, RouteDecision
+
+
+def router(**options):
+    return ModelRouter(fast_model="fast", large_model="large", **{"hedge_model": "", "hedge_min_samples": 3, **options})
+
+
+def test_small_requests_go_to_the_fast_model():
+    r = router()
+    assert r.choose("chat", prompt_chars=500).model == "fast"
+    assert r.choose("chat", prompt_chars=50_000).model == "large"
+    assert r.choose("plan", prompt_chars=500, duration_days=5).model == "large"
+
+
+def test_requests_move_off_a_model_that_breaks_the_slo():
+    r = router()
+    for _ in range(3):
+        r.record("fast", 30.0)
+        r.record("large", 1.0)
+    decision = r.choose("chat", prompt_chars=500)
+    assert (decision.model, decision.reason) == ("large", "slo_breach")
+
+
+def test_hedge_waits_for_the_primary_p95_once_it_has_samples():
+    r = router(hedge_model="replica", hedge_after_seconds=7)
+    assert r.choose("chat", prompt_chars=500).hedge_after_seconds == 7
+    for seconds in (1.0, 1.0, 2.0):
+        r.record("fast", seconds)
+    assert 1.0 < r.choose("chat", prompt_chars=500).hedge_after_seconds <= 2.0
+
+
+def fake_call(latency, started, cancelled, failing=()):
+    async def call(model):
+        started.append(model)
+        try:
+            await asyncio.sleep(latency[model])
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+        if model in failing:
+            raise RuntimeError(f"{model} failed")
+        return f"answer from {model}"
+    return call
+
+
+def run(r, decision, latency, failing=()):
+    started, cancelled = [], []
+
+    async def scenario():
+        result = await r.run(decision, fake_call(latency, started, cancelled, failing))
+        await asyncio.sleep(0.01)
+        # Snapshot inside the loop: asyncio.run cancels leftover tasks on exit
+        return result, list(started), list(cancelled)
+
+    return asyncio.run(scenario())
+
+
+def test_fast_primary_never_starts_the_hedge():
+    r = router(hedge_model="replica")
+    decision = RouteDecision("fast", "test", hedge_model="replica", hedge_after_seconds=0.2)
+    result, started, _ = run(r, decision, {"fast": 0.01, "replica": 0.01})
+    assert result == ("answer from fast", "fast")
+    assert started == ["fast"]
+
+
+def test_slow_primary_loses_to_the_hedge_and_is_cancelled():
+    r = router(hedge_model="replica")
+    decision = RouteDecision("fast", "test", hedge_model="replica", hedge_after_seconds=0.01)
+    result, started, cancelled = run(r, decision, {"fast": 1.0, "replica": 0.01})
+    assert result == ("answer from replica", "replica")
+    assert cancelled == ["fast"]
+    assert r.stats()["models"]["fast"]["hedges_fired"] == 1
+    assert r.stats()["models"]["replica"]["hedges_won"] == 1
+
+
+def test_failed_primary_falls_back_to_the_hedge():
+    r = router(hedge_model="replica")
+    decision = RouteDecision("fast", "test", hedge_model="replica", hedge_after_seconds=0.5)
+    result, _, _ = run(r, decision, {"fast": 0.0, "replica": 0.01}, failing={"fast"})
+    assert result == ("answer from replica", "replica")
+    assert r.stats()["models"]["fast"]["errors"] == 1
+
+
+def test_cancelling_the_caller_before_the_hedge_cancels_the_primary():
+    r = router(hedge_model="replica")
+    decision = RouteDecision("fast", "test", hedge_model="replica", hedge_after_seconds=0.5)
+    started, cancelled = [], []
+
+    async def scenario():
+        caller = asyncio.ensure_future(r.run(decision, fake_call({"fast": 1.0}, started, cancelled)))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0.01)
+        return list(cancelled)
+
+    assert asyncio.run(scenario()) == ["fast"]
+    assert started == ["fast"]
+
+
+def test_cancelled_primary_falls_back_to_the_hedge():
+    r = router(hedge_model="replica")
+    decision = RouteDecision("fast", "test", hedge_model="replica", hedge_after_seconds=0.5)
+
+    async def call(model):
+        if model == "fast":
+            # e.g. the shared upstream call was cancelled by another waiter
+            raise asyncio.CancelledError()
+        return f"answer from {model}"
+
+    assert asyncio.run(r.run(decision, call)) == ("answer from replica", "replica")
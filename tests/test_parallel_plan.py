@@ -0,0 +1,73 @@
+import asyncio
+import json
+from interface import PlanRequest
+from utils import llm_caller
+from utils.llm_caller import LLMCaller
+
+SKELETON = {
+    "tripOverview": "Five days in the north",
+    "overview": "Temples, mountains and food",
+    "total_estimated_cost": 15000,
+    "days": [{"day": d, "title": f"Day {d} outline", "focus": f"focus {d}"} for d in range(1, 6)],
+}
+
+
+def planning_agent(fail_day=None, fail_skeleton=False):
+    agent = LLMCaller.__new__(LLMCaller)
+    agent.structured_output_supported = False
+    agent.active = agent.max_active = 0
+
+    async def retrieve_context(plan_request, query_text, collection_name=None, *args, **kwargs):
+        return [], f"context for {query_text}", {}
+
+    async def routed_query(prompt, endpoint, duration_days, *args, **options):
+        if "Outline a" in prompt:
+            return ("not json" if fail_skeleton else json.dumps(SKELETON)), "m"
+        day = int(prompt.split("Write Day ")[1].split(":")[0])
+        agent.active += 1
+        agent.max_active = max(agent.max_active, agent.active)
+        await asyncio.sleep(0.02)
+        agent.active -= 1
+        if day == fail_day:
+            raise RuntimeError("upstream error")
+        return json.dumps({"day": day, "title": f"Written day {day}", "description": "..."}), "m"
+
+    agent.retrieve_context = retrieve_context
+    agent.routed_query = routed_query
+    return agent
+
+
+REQUEST = PlanRequest(start_place="Bangkok", destination_place="Chiang Mai", trip_duration_days=5)
+
+
+def plan(agent):
+    return asyncio.run(agent.generate_plan_parallel(REQUEST, "query", [], "context"))
+
+
+def test_days_are_generated_concurrently_and_merged_in_order():
+    agent = planning_agent()
+    response = plan(agent)
+    assert [step.title for step in response.trip_plan.steps] == [f"Written day {d}" for d in range(1, 6)]
+    assert response.tripOverview == "Five days in the north"
+    assert response.meta["status"] == "success" and response.meta["plan_mode"] == "parallel"
+    assert agent.max_active == 5
+
+
+def test_failed_day_keeps_its_outline_and_marks_the_plan_partial():
+    response = plan(planning_agent(fail_day=3))
+    assert response.trip_plan.steps[2].title == "Day 3 outline"
+    assert response.meta["status"] == "partial" and response.meta["failed_days"] == [3]
+
+
+def test_unusable_outline_falls_back_to_single_call():
+    assert plan(planning_agent(fail_skeleton=True)) is None
+
+
+def test_plan_mode_selects_per_day_generation(monkeypatch):
+    agent = planning_agent()
+    short = PlanRequest(start_place="Bangkok", destination_place="Pai", trip_duration_days=2)
+    assert agent.use_parallel_plan(REQUEST) and not agent.use_parallel_plan(short)
+    monkeypatch.setattr(llm_caller, "PLAN_MODE", "single")
+    assert not agent.use_parallel_plan(REQUEST)
+    monkeypatch.setattr(llm_caller, "PLAN_MODE", "parallel")
+    assert agent.use_parallel_plan(short)
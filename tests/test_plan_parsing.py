@@ -0,0 +1,60 @@
+import json
+from interface import PlanRequest
+from utils import llm_caller
+from utils.llm_caller import LLMCaller
+
+REQUEST = PlanRequest(start_place="Bangkok", destination_place="Chiang Mai", trip_price=10000, trip_duration_days=2)
+PLAN = {
+    "tripOverview": "Two days in the north",
+    "trip_plan": {
+        "overview": "Temples and food",
+        "total_estimated_cost": 8000,
+        "steps": [{"day": 1, "title": "Old city"}, {"day": 2, "title": "Doi Suthep", "tips": ["Go early"]}],
+    },
+}
+
+
+def caller(structured_output: bool = True) -> LLMCaller:
+    instance = LLMCaller.__new__(LLMCaller)
+    instance.structured_output_supported = structured_output
+    return instance
+
+
+def test_fenced_plan_is_validated_in_one_pass():
+    response = caller().parse_plan_response(f"```json\n{json.dumps(PLAN)}\n```", REQUEST, [], "query")
+    assert response.meta["status"] == "success" and response.meta["repaired"] is False
+    assert [step.title for step in response.trip_plan.steps] == ["Old city", "Doi Suthep"]
+    assert response.trip_plan.steps[0].tips is None
+
+
+def test_truncated_plan_is_repaired():
+    truncated = json.dumps(PLAN)[:-40]
+    response = caller().parse_plan_response(truncated, REQUEST, [], "query")
+    assert response.meta["status"] == "success" and response.meta["repaired"] is True
+    assert response.trip_plan.steps[0].title == "Old city"
+
+
+def test_unparseable_output_falls_back_to_text():
+    response = caller().parse_plan_response("Sorry, I cannot plan this trip.", REQUEST, [], "query")
+    assert response.meta["status"] == "json_parse_error"
+    assert response.tripOverview == "Sorry, I cannot plan this trip."
+
+
+def test_plan_output_options_follow_the_configured_mode(monkeypatch):
+    assert caller().plan_output_options()["response_format"]["json_schema"]["schema"] == llm_caller.TRIP_PLAN_SCHEMA
+    monkeypatch.setattr(llm_caller, "LLM_STRUCTURED_OUTPUT", "guided_json")
+    assert caller().plan_output_options() == {"extra_body": {"guided_json": llm_caller.TRIP_PLAN_SCHEMA}}
+    assert caller(structured_output=False).plan_output_options() == {}
+
+
+def test_parse_failure_log_leaves_out_the_raw_response(capsys):
+    raw = "Sorry, " + "x" * 5000
+    caller().parse_plan_response(raw, REQUEST, [], "query")
+    logged = capsys.readouterr().out
+    assert raw not in logged
+    assert len(logged) < 1000
+
+
+def test_brief_error_caps_long_messages():
+    assert llm_caller.brief_error(ValueError("short")) == "short"
+    assert llm_caller.brief_error(ValueError("y" * 50), limit=10) == "y" * 10 + "... (50 chars)"
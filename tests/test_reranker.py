@@ -0,0 +1,66 @@
+import asyncio
+import time
+import pytest
+from utils.reranker import Reranker, candidate_depth
+
+
+class KeywordCrossEncoder:
+    """Scores a passage by whether it contains the query; records batch sizes."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+
+    def predict(self, pairs, batch_size, convert_to_numpy, show_progress_bar):
+        self.batches.append(len(pairs))
+        time.sleep(self.delay)
+        return [0.9 if query in passage else 0.01 for query, passage in pairs]
+
+
+def reranker(delay=0.0, **options):
+    instance = Reranker(**options)
+    instance._model = KeywordCrossEncoder(delay)
+    return instance
+
+
+def hits(*texts):
+    # Best-first search hits with slowly decreasing first-stage scores
+    return [{"text": text, "score": 0.9 - i * 0.01} for i, text in enumerate(texts)]
+
+
+def run(instance, query, candidates, top_k):
+    return asyncio.run(instance.rerank(query, candidates, top_k, lambda c: c["text"], lambda c: c["score"]))
+
+
+def test_candidate_depth_follows_score_spread():
+    assert candidate_depth([], 3) == 0
+    # Close scores: all of them are worth reranking, up to the cap
+    assert candidate_depth([0.80, 0.79, 0.78, 0.77, 0.76, 0.75, 0.74, 0.73], 3, min_candidates=2, max_candidates=6) == 6
+    # A clear leader: only top_k / the minimum are reranked
+    assert candidate_depth([0.90, 0.30, 0.20, 0.10], 2, min_candidates=1) == 2
+    assert candidate_depth([0.90, 0.30], 5, min_candidates=6) == 2
+
+
+def test_rerank_reorders_and_drops_low_scores_except_the_best():
+    instance = reranker(batch_size=2)
+    kept, stats = run(instance, "temple", hits("beach", "old temple", "market", "temple fair"), top_k=3)
+
+    assert [candidate["text"] for candidate, _ in kept] == ["old temple", "temple fair"]
+    assert [score for _, score in kept] == pytest.approx([0.9, 0.9])
+    assert instance._model.batches == [2, 2]
+    assert stats["scored"] == 4 and stats["kept"] == 2 and not stats["over_budget"]
+
+    kept, _ = run(instance, "volcano", hits("beach", "market"), top_k=3)
+    assert [candidate["text"] for candidate, _ in kept] == ["beach"]
+
+
+def test_rerank_stops_at_the_time_budget_and_keeps_unscored_in_order():
+    instance = reranker(delay=0.05, batch_size=1, time_budget_ms=10)
+    kept, stats = run(instance, "temple", hits("beach", "temple", "market"), top_k=3)
+
+    assert stats["over_budget"] and stats["scored"] == 1
+    assert [candidate["text"] for candidate, _ in kept] == ["beach", "temple", "market"]
+    assert kept[0][1] == pytest.approx(0.01)
+    assert [score for _, score in kept[1:]] == [None, None]
+    assert instance.stats()["budget_exceeded"] == 1
+    instance.shutdown()
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from interface import PlanRequest, PlanResponse, TripPlan
+from utils.response_cache import InMemoryCacheBackend, ResponseCache, SQLiteCacheBackend, exact_key, semantic_bucket
+
+
+def plan_request(**overrides) -> PlanRequest:
+    fields = {"start_place": "Bangkok", "destination_place": "Chiang Mai", "trip_price": 10000, "trip_duration_days": 3}
+    return PlanRequest(**{**fields, **overrides})
+
+
+def plan_response(request: PlanRequest, overview: str) -> PlanResponse:
+    return PlanResponse(
+        tripOverview=overview,
+        query_params=request,
+        retrieved_data=[],
+        trip_plan=TripPlan(overview=overview, total_estimated_cost=0.0, steps=[]),
+        meta={"status": "success"},
+    )
+
+
+def test_exact_key_ignores_case_whitespace_and_preference_order():
+    a = plan_request(destination_place="Chiang  Mai", preferences=["Museums", "vegetarian"])
+    b = plan_request(destination_place="chiang mai", preferences=["vegetarian", "museums "])
+    assert exact_key(a) == exact_key(b)
+    assert exact_key(a) != exact_key(plan_request(preferences=["nightlife"]))
+
+
+def test_semantic_tier_matches_similar_queries_with_the_same_budget_only():
+    cache = ResponseCache(InMemoryCacheBackend())
+    stored = plan_request()
+    cache.put(stored, [1.0, 0.0], plan_response(stored, "north"))
+
+    hit, score = cache.get_semantic(plan_request(trip_context="slow travel"), [0.99, 0.141])
+    assert hit is not None and hit.tripOverview == "north"
+    assert score > 0.95
+
+    hit, score = cache.get_semantic(plan_request(trip_price=50000), [1.0, 0.0])
+    assert hit is None and score == 0.0
+    assert cache.stats()["semantic_hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_memory_backend_evicts_least_recently_used_and_expired_entries():
+    backend = InMemoryCacheBackend(max_entries=2, ttl_seconds=60)
+    backend.set("a", "bucket", None, "A")
+    backend.set("b", "bucket", None, "B")
+    backend.get("a")
+    backend.set("c", "bucket", None, "C")
+    assert backend.get("b") is None
+    assert backend.get("a") == "A" and backend.get("c") == "C"
+
+    expired = InMemoryCacheBackend(ttl_seconds=-1)
+    expired.set("a", "bucket", np.ones(2, dtype=np.float32), "A")
+    assert expired.get("a") is None
+    assert expired.candidates("bucket") == []
+
+
+def test_sqlite_backend_round_trips_responses_and_embeddings(tmp_path):
+    cache = ResponseCache(SQLiteCacheBackend(str(tmp_path / "cache.sqlite3")))
+    stored = plan_request()
+    cache.put(stored, [0.6, 0.8], plan_response(stored, "stored"))
+
+    assert cache.get_exact(plan_request(destination_place="chiang mai")).tripOverview == "stored"
+    hit, score = cache.get_semantic(plan_request(trip_context="temples"), [0.6, 0.8])
+    assert hit is not None and score == pytest.approx(1.0)
+    assert cache.stats()["size"] == 1
+
+
+def test_semantic_bucket_separates_preferences_and_top_k():
+    base = plan_request(preferences=["vegetarian", "museums"])
+    assert semantic_bucket(base) == semantic_bucket(plan_request(preferences=["Museums", "vegetarian"]))
+    assert semantic_bucket(base) != semantic_bucket(plan_request(preferences=["nightlife", "street food"]))
+    assert semantic_bucket(base) != semantic_bucket(plan_request(preferences=["vegetarian", "museums"], top_k=8))
+
+
+def test_preference_only_difference_misses_semantic_tier():
+    cache = ResponseCache(InMemoryCacheBackend())
+    embedding = np.ones(4, dtype=np.float32) / 2
+    stored = plan_request(preferences=["vegetarian", "museums"])
+    cache.put(stored, embedding.tolist(), plan_response(stored, "veggie"))
+
+    # Same embedded query text, so similarity is 1.0, but different preferences
+    hit, score = cache.get_semantic(plan_request(preferences=["nightlife", "street food"]), embedding.tolist())
+    assert hit is None and score == 0.0
+
+    hit, score = cache.get_semantic(plan_request(preferences=["museums", "Vegetarian"]), embedding.tolist())
+    assert hit is not None and hit.tripOverview == "veggie"
+    assert score > 0.99
@@ -0,0 +1,39 @@
+import gc
+import socket
+import numpy as np
+import serve
+import utils.embedding_engine
+from utils.embedding_engine import EmbeddingEngine
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+def test_preload_loads_weights_without_a_forward_pass(monkeypatch):
+    engine = EmbeddingEngine()
+    monkeypatch.setattr(engine, "_load", FakeModel)
+    monkeypatch.setattr(utils.embedding_engine, "get_embedding_engine", lambda: engine)
+
+    try:
+        serve.preload_models()
+    finally:
+        gc.unfreeze()
+
+    assert engine.is_loaded
+    assert engine.model.calls == []
+
+
+def test_bind_socket_listens_and_is_inherited_by_workers():
+    sock = serve.bind_socket("127.0.0.1", 0, backlog=8)
+    try:
+        assert sock.get_inheritable()
+        with socket.create_connection(sock.getsockname(), timeout=1):
+            pass
+    finally:
+        sock.close()
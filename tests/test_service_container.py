@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import httpx
+import pytest
+import utils.service_container
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+from data_importer import DataImporter
+from utils.service_container import ServiceContainer, StartupProfile
+
+
+def test_concurrent_callers_share_one_build_and_dependencies_build_first():
+    container = ServiceContainer()
+    builds = []
+    gate = threading.Event()
+
+    @container.provider("client")
+    def build_client():
+        gate.wait(1)
+        builds.append("client")
+        return "client"
+
+    @container.provider("service", needs=("client",))
+    def build_service(client):
+        builds.append("service")
+        return f"service({client})"
+
+    async def scenario():
+        waiting = [asyncio.ensure_future(container.get("service")) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        gate.set()
+        return await asyncio.gather(*waiting)
+
+    assert asyncio.run(scenario()) == ["service(client)"] * 3
+    assert builds == ["client", "service"]
+    assert container.peek("client") == "client"
+    assert container.profile.status("build:service") == "ok"
+
+
+def test_failed_build_is_reported_and_attempted_again():
+    container = ServiceContainer()
+    attempts = []
+
+    @container.provider("agent")
+    def build_agent():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("qdrant down")
+        return "agent"
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(container.get("agent"))
+    assert container.profile.phases["build:agent"]["error"] == "qdrant down"
+    assert container.peek("agent") is None
+
+    assert asyncio.run(container.get("agent")) == "agent"
+    assert container.profile.phases["build:agent"]["attempts"] == 2
+    assert "error" not in container.profile.phases["build:agent"]
+
+
+def test_run_phase_retries_with_backoff(monkeypatch):
+    monkeypatch.setattr(utils.service_container, "STARTUP_RETRY_SECONDS", 0.001)
+    container = ServiceContainer()
+    failures = iter([True, True, False])
+
+    def check():
+        if next(failures):
+            raise ConnectionError("unreachable")
+        return "ok"
+
+    assert asyncio.run(container.run_phase("qdrant_collection", check, retry=True)) == "ok"
+    assert container.profile.phases["qdrant_collection"]["attempts"] == 3
+
+    failures = iter([True])
+    with pytest.raises(ConnectionError):
+        asyncio.run(container.run_phase("once", check))
+
+
+def test_profile_lists_expected_phases_until_they_succeed():
+    profile = StartupProfile()
+    profile.expect("build:agent", "embedding_model")
+    with profile.phase("embedding_model"):
+        pass
+    report = profile.report()
+    assert report["pending"] == ["build:agent"]
+    assert not report["ready"]
+    assert report["slowest_phase"] == "embedding_model"
+
+
+def test_app_import_builds_nothing_and_probes_answer(monkeypatch):
+    import app.app as app_module
+
+    assert app_module.container.peek("agent") is None and app_module.container.peek("data_importer") is None
+    container = ServiceContainer()
+    container.profile.expect("build:agent")
+    monkeypatch.setattr(app_module, "container", container)
+
+    async def probe(path):
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path)
+
+    assert asyncio.run(probe("/v1/live")).status_code == 200
+    ready = asyncio.run(probe("/v1/ready"))
+    assert ready.status_code == 503
+    assert ready.json()["pending"] == ["build:agent"]
+
+
+def test_ensure_collection_never_recreates_an_existing_collection():
+    importer = DataImporter.__new__(DataImporter)
+    importer.client = QdrantClient(location=":memory:")
+    importer.collection_name = "places"
+    importer.client.create_collection("places", vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    importer.client.upsert("places", points=[PointStruct(id=1, vector=[1.0, 0.0], payload={"text": "kept"})])
+
+    importer.ensure_collection()
+
+    assert importer.client.count("places").count == 1
+
+
+def test_readiness_waits_for_the_model_warm_up_phase(monkeypatch):
+    import app.app as app_module
+
+    container = ServiceContainer()
+    container.profile.expect("embedding_model")
+    monkeypatch.setattr(app_module, "container", container)
+
+    assert app_module.readiness_pending() == ["embedding_model"]
+    asyncio.run(container.run_phase("embedding_model", lambda: None))
+    assert app_module.readiness_pending() == []
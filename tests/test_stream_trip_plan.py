@@ -0,0 +1,49 @@
+import asyncio
+import json
+from interface import PlanRequest
+from utils.llm_caller import LLMCaller
+from utils.model_router import ModelRouter
+
+GENERATION = {
+    "tripOverview": "Three days in Chiang Mai",
+    "trip_plan": {
+        "overview": "Temples and food",
+        "total_estimated_cost": 9000,
+        "steps": [
+            {"day": 1, "title": "Old City"},
+            {"day": "second", "title": "Broken day", "map_coordinates": {"lat": "north"}},
+            {"day": 3, "title": "Doi Suthep"},
+        ],
+    },
+}
+
+
+def streaming_agent(text: str) -> LLMCaller:
+    agent = LLMCaller.__new__(LLMCaller)
+    agent.router = ModelRouter()
+    agent.structured_output_supported = False
+
+    async def retrieve_context(plan_request, query_text, collection_name=None):
+        return [], "", {}
+
+    async def basic_query_stream(user_prompt, model=None, **options):
+        for start in range(0, len(text), 7):
+            yield text[start:start + 7]
+
+    agent.retrieve_context = retrieve_context
+    agent.basic_query_stream = basic_query_stream
+    return agent
+
+
+def test_malformed_step_is_skipped_and_stream_continues():
+    agent = streaming_agent(json.dumps(GENERATION))
+    request = PlanRequest(start_place="Bangkok", destination_place="Chiang Mai", trip_duration_days=3)
+
+    async def collect():
+        return [event async for event in agent.stream_trip_plan(request)]
+
+    events = asyncio.run(collect())
+    steps = [event["data"]["title"] for event in events if event["event"] == "step"]
+    assert steps == ["Old City", "Doi Suthep"]
+    assert events[-1]["event"] == "complete"
+    assert events[-1]["data"]["meta"]["skipped_stream_steps"] == 1
@@ -0,0 +1,34 @@
+from utils.transcript_chunker import chunk_transcript, estimate_tokens
+
+
+def segments(count: int, words: int = 10, seconds: float = 5.0):
+    return [
+        {"text": " ".join(f"w{i}_{j}" for j in range(words)), "start": i * seconds, "duration": seconds}
+        for i in range(count)
+    ]
+
+
+def test_windows_cover_every_segment_with_overlap_and_timing():
+    # Each segment is ~13 estimated tokens, so three fit a window and one is carried over
+    chunks = chunk_transcript(segments(10), max_tokens=40, overlap_tokens=15, max_seconds=0)
+    assert [c["chunk_index"] for c in chunks] == list(range(5))
+    assert all(c["token_estimate"] <= 40 for c in chunks)
+    assert chunks[0]["text"].split()[-10:] == chunks[1]["text"].split()[:10]
+    assert chunks[-1]["text"].endswith("w9_9")
+    assert (chunks[1]["start"], chunks[1]["duration"]) == (10.0, 15.0)
+
+
+def test_max_seconds_closes_windows_early():
+    chunks = chunk_transcript(segments(6, words=2), max_tokens=1000, overlap_tokens=0, max_seconds=10)
+    assert [c["duration"] for c in chunks] == [10.0, 10.0, 10.0]
+
+
+def test_oversized_segment_becomes_its_own_chunk_and_blank_segments_are_dropped():
+    data = segments(1, words=100) + [{"text": "  ", "start": 5.0, "duration": 1.0}] + segments(1, words=3)
+    chunks = chunk_transcript(data, max_tokens=20, overlap_tokens=5)
+    assert len(chunks) == 2
+    assert chunks[0]["token_estimate"] == estimate_tokens(data[0]["text"])
+
+
+def test_token_estimate_handles_unspaced_thai():
+    assert estimate_tokens("เชียงใหม่เป็นเมืองที่สวยงามมาก") > 1
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import BinaryQuantization, Distance, PointStruct, ScalarQuantization, VectorParams
+import data_importer
+from data_importer import DataImporter
+from utils.vector_storage import bytes_per_vector, quantization_config, truncate_dim
+
+
+def importer_over_memory_collection(points):
+    importer = DataImporter.__new__(DataImporter)
+    importer.client = QdrantClient(location=":memory:")
+    importer.collection_name = "places"
+    importer.local_index = None
+    importer.client.create_collection("places", vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+    importer.client.upsert("places", points=[
+        PointStruct(id=i, vector=vector, payload={"text": f"place {i}"}) for i, vector in enumerate(points)
+    ])
+    return importer
+
+
+def test_truncate_dim_keeps_leading_dimensions_and_renormalises():
+    vectors = np.array([[3.0, 4.0, 12.0], [0.0, 0.0, 1.0]], dtype=np.float32)
+
+    truncated = truncate_dim(vectors, 2)
+
+    assert truncated.shape == (2, 2)
+    assert np.allclose(truncated[0], [0.6, 0.8])
+    # An all-zero prefix stays zero instead of dividing by zero
+    assert np.allclose(truncated[1], [0.0, 0.0])
+    assert truncate_dim(vectors, 0) is vectors
+    assert truncate_dim(vectors, 3) is vectors
+
+
+def test_quantization_config_and_memory_estimate():
+    assert isinstance(quantization_config("scalar"), ScalarQuantization)
+    assert isinstance(quantization_config("binary"), BinaryQuantization)
+    assert quantization_config("none") is None
+    assert bytes_per_vector(1024, "none") == {"search_bytes": 4096, "original_bytes": 4096}
+    assert bytes_per_vector(1024, "scalar")["search_bytes"] == 1024
+    assert bytes_per_vector(1024, "binary")["search_bytes"] == 128
+
+
+def test_migrate_collection_truncates_stored_vectors_and_swaps_alias(monkeypatch):
+    monkeypatch.setattr(data_importer, "vector_size", lambda: 2)
+    importer = importer_over_memory_collection([[3.0, 4.0, 0.0, 1.0], [1.0, 0.0, 0.0, 0.0], [0.0, 2.0, 1.0, 0.0]])
+
+    assert importer.migrate_collection("places_v2", batch_size=2, swap_alias=True) == 3
+
+    assert importer.client.get_collection("places_v2").config.params.vectors.size == 2
+    records, _ = importer.client.scroll("places", limit=10, with_payload=True, with_vectors=True)
+    by_id = {record.id: record for record in records}
+    assert sorted(by_id) == [0, 1, 2]
+    assert np.allclose(by_id[0].vector, [0.6, 0.8])
+    assert by_id[2].payload == {"text": "place 2"}
+
+
+def test_migrate_collection_refuses_to_grow_vectors(monkeypatch):
+    monkeypatch.setattr(data_importer, "vector_size", lambda: 8)
+    importer = importer_over_memory_collection([[1.0, 0.0, 0.0, 0.0]])
+
+    with pytest.raises(ValueError):
+        importer.migrate_collection("places_v2")
@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from interface import BatchPlanStatus, PlanRequest, PlanResponse
+from utils.response_cache import exact_key
+from utils.metrics import stage_timer
+from utils.job_registry import JobRegistry
+
+BATCH_PLAN_CONCURRENCY = int(os.getenv("BATCH_PLAN_CONCURRENCY", "16"))
+BATCH_SEARCH_CONCURRENCY = int(os.getenv("BATCH_SEARCH_CONCURRENCY", "32"))
+BATCH_ENCODE_BATCH_SIZE = int(os.getenv("BATCH_ENCODE_BATCH_SIZE", "128"))
+BATCH_OUTPUT_DIR = os.getenv("BATCH_OUTPUT_DIR", "batch_plans")
+# Plans with these statuses count as done; anything else is generated again on resume
+DONE_STATUSES = {"success", "partial"}
+
+
+def read_plan_requests(path: str) -> List[PlanRequest]:
+    """PlanRequests from a JSONL file (one per line) or a JSON array."""
+    with open(path) as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        return [PlanRequest.model_validate(item) for item in json.loads(text)]
+    return [PlanRequest.model_validate_json(line) for line in text.splitlines() if line.strip() and not line.startswith("#")]
+
+
+def completed_keys(output_path: str) -> Set[str]:
+    """Request keys already written to the output with a usable plan (the output file is the checkpoint)."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Last line cut off by a crash
+                continue
+            if record.get("response", {}).get("meta", {}).get("status") in DONE_STATUSES:
+                done.add(record["key"])
+    return done
+
+
+def _ends_mid_line(path: str) -> bool:
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return False
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+class BatchPlanJob:
+    """Progress of one batch precompute run; updated on the event loop, read by the API and CLI."""
+
+    def __init__(self, total: int, output_path: Optional[str] = None, job_id: Optional[str] = None):
+        self.job_id = job_id or str(uuid.uuid4())
+        self.total = total
+        self.output_path = output_path or os.path.join(BATCH_OUTPUT_DIR, f"{self.job_id}.jsonl")
+        self.status = "queued"
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.errors: Dict[str, str] = {}
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self._start: Optional[float] = None
+        self._elapsed: Optional[float] = None
+
+    def to_status(self) -> BatchPlanStatus:
+        elapsed = self._elapsed if self._elapsed is not None else (time.perf_counter() - self._start if self._start else None)
+        return BatchPlanStatus(
+            job_id=self.job_id,
+            status=self.status,
+            total=self.total,
+            completed=self.completed,
+            failed=self.failed,
+            skipped=self.skipped,
+            output_path=self.output_path,
+            errors=dict(self.errors),
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            elapsed_seconds=round(elapsed, 2) if elapsed is not None else None,
+        )
+
+
+class BatchPlanner:
+    """
+    Precompute many trip plans in one run on top of LLMCaller.
+
+    All query texts are embedded in a few large batches up front. Retrieval then runs
+    concurrently, and generation is capped at ``concurrency`` in-flight plans (the LLM
+    gateway limits still apply underneath). Plans are appended to a JSONL file as they
+    finish, and that file doubles as the checkpoint, so a rerun only generates what is missing.
+    """
+
+    def __init__(
+        self,
+        agent,
+        concurrency: int = BATCH_PLAN_CONCURRENCY,
+        search_concurrency: int = BATCH_SEARCH_CONCURRENCY,
+        encode_batch_size: int = BATCH_ENCODE_BATCH_SIZE,
+    ):
+        self.agent = agent
+        self.concurrency = concurrency
+        self.search_concurrency = search_concurrency
+        self.encode_batch_size = encode_batch_size
+
+    async def encode_all(self, texts: List[str]) -> Tuple[List[List[float]], List[Optional[Dict[int, float]]]]:
+        engine = self.agent.embedding_model
+        dense, sparse = [], []
+        for start in range(0, len(texts), self.encode_batch_size):
+            block = texts[start:start + self.encode_batch_size]
+            if engine.supports_sparse:
+                vectors, weights = await engine.encode_hybrid_async(block, self.encode_batch_size)
+            else:
+                vectors, weights = await engine.encode_async(block, self.encode_batch_size), [None] * len(block)
+            dense += vectors.tolist()
+            sparse += weights
+        return dense, sparse
+
+    async def run(
+        self,
+        job: BatchPlanJob,
+        requests: List[PlanRequest],
+        warm_cache: bool = True,
+        resume: bool = True,
+        on_progress: Optional[Callable[[BatchPlanJob], None]] = None,
+    ) -> BatchPlanJob:
+        job.status = "running"
+        job.started_at = datetime.utcnow().isoformat()
+        job._start = time.perf_counter()
+        try:
+            done = completed_keys(job.output_path) if resume else set()
+            pending: Dict[str, PlanRequest] = {}
+            for plan_request in requests:
+                key = exact_key(plan_request)
+                if key not in done and key not in pending:
+                    pending[key] = plan_request
+            # Duplicates and requests finished by an earlier run
+            job.skipped = len(requests) - len(pending)
+            todo = list(pending.items())
+
+            query_texts = [self.agent.build_query_text(plan_request) for _, plan_request in todo]
+            with stage_timer("batch_encode"):
+                dense, sparse = await self.encode_all(query_texts)
+
+            search_slots = asyncio.Semaphore(self.search_concurrency)
+            generate_slots = asyncio.Semaphore(self.concurrency)
+
+            async def plan(i: int) -> Tuple[str, PlanResponse]:
+                key, plan_request = todo[i]
+                try:
+                    async with search_slots:
+                        retrieved_data, context_text, context_stats = await self.agent.retrieve_context(
+                            plan_request, query_texts[i], query_embedding=dense[i], query_sparse=sparse[i]
+                        )
+                    async with generate_slots:
+                        response = await self.agent.generate_from_context(
+                            plan_request, query_texts[i], dense[i], retrieved_data, context_text, context_stats, cache=warm_cache
+                        )
+                except Exception as e:
+                    response = self.agent.error_response(plan_request, e)
+                return key, response
+
+            if os.path.dirname(job.output_path):
+                os.makedirs(os.path.dirname(job.output_path), exist_ok=True)
+            tasks = [asyncio.ensure_future(plan(i)) for i in range(len(todo))]
+            try:
+                cut_off = resume and _ends_mid_line(job.output_path)
+                with open(job.output_path, "a" if resume else "w") as out:
+                    if cut_off:
+                        # Keep the first new record off the line a crash cut short
+                        out.write("\n")
+                    for next_done in asyncio.as_completed(tasks):
+                        key, response = await next_done
+                        out.write(json.dumps({"key": key, "response": response.model_dump()}) + "\n")
+                        out.flush()
+                        status = response.meta.get("status")
+                        if status in DONE_STATUSES:
+                            job.completed += 1
+                        else:
+                            job.failed += 1
+                            job.errors[key] = str(response.meta.get("error", status))
+                        if on_progress:
+                            on_progress(job)
+            finally:
+                for task in tasks:
+                    task.cancel()
+            job.status = "completed" if not job.failed else "completed_with_errors"
+        except Exception as e:
+            print(f"Error in batch plan job {job.job_id}: {e}")
+            job.status = "failed"
+            job.errors["_job"] = str(e)
+        finally:
+            job.finished_at = datetime.utcnow().isoformat()
+            job._elapsed = time.perf_counter() - job._start
+        return job
+
+
+class BatchPlanJobManager:
+    """Runs BatchPlanner jobs as background tasks on the server's event loop and keeps their status for polling until evicted."""
+
+    def __init__(self, planner: BatchPlanner, jobs: Optional[JobRegistry] = None):
+        self.planner = planner
+        self.jobs = jobs if jobs is not None else JobRegistry()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(self, requests: List[PlanRequest], warm_cache: bool = True, concurrency: Optional[int] = None) -> BatchPlanJob:
+        job = BatchPlanJob(len(requests))
+        self.jobs.add(job)
+        planner = self.planner
+        if concurrency:
+            planner = BatchPlanner(planner.agent, concurrency, planner.search_concurrency, planner.encode_batch_size)
+        task = asyncio.get_running_loop().create_task(planner.run(job, requests, warm_cache=warm_cache))
+        self._tasks[job.job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.job_id, None))
+        return job
+
+    def get(self, job_id: str) -> Optional[BatchPlanJob]:
+        return self.jobs.get(job_id)
@@ -0,0 +1,353 @@
+import os
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from interface import ChatMessage, ChatSessionState, ChatTurnRequest, ChatTurnResponse
+from utils.geo import retrieval_filter
+from utils.metrics import stage_timer, PROMPT_CHARS
+from utils.transcript_chunker import estimate_tokens
+
+CHAT_SESSION_BACKEND = os.getenv("CHAT_SESSION_BACKEND", "memory")  # memory | sqlite (shared by all workers on the host)
+CHAT_SESSION_PATH = os.getenv("CHAT_SESSION_PATH", "chat_sessions.sqlite3")
+CHAT_SESSION_TTL_SECONDS = float(os.getenv("CHAT_SESSION_TTL_SECONDS", "86400"))
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "10000"))
+# Most recent messages sent verbatim; older ones are folded into the running summary
+CHAT_RECENT_MESSAGES = int(os.getenv("CHAT_RECENT_MESSAGES", "6"))
+# Summarize once this many messages have fallen out of the recent window (fewer prefix changes)
+CHAT_SUMMARIZE_BATCH = int(os.getenv("CHAT_SUMMARIZE_BATCH", "4"))
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "300"))
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "500"))
+CHAT_MAX_TOKENS = int(os.getenv("CHAT_MAX_TOKENS", "800"))
+
+# Identical for every session and turn, so it is always a cached prefix on the LLM server
+CHAT_SYSTEM_PROMPT = """You are a helpful travel assistant for Southeast Asia in an ongoing conversation.
+Answer the latest user message. Use the travel context given with it when it is relevant, and say so when it does not cover the question.
+Keep answers concise and practical."""
+
+SUMMARY_PROMPT = """Update the summary of a travel-planning conversation.
+Keep destinations, dates, budget, group, preferences, decisions made and open questions. Drop small talk.
+Write at most 150 words of plain text.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+
+Updated summary:"""
+
+
+def _new_state(destination: Optional[str], language: Optional[str]) -> ChatSessionState:
+    now = time.time()
+    return ChatSessionState(session_id=uuid.uuid4().hex, destination=destination, language=language, created_at=now, updated_at=now)
+
+
+def _append(state: ChatSessionState, messages: List[ChatMessage]) -> None:
+    state.messages += messages
+    state.updated_at = time.time()
+
+
+def _fold(state: ChatSessionState, summary: str, count: int) -> None:
+    # Only appends happen while a summary is written, so the first ``count`` messages are still the summarized ones
+    state.summary = summary
+    state.messages = state.messages[count:]
+    state.summarized_messages += count
+    state.updated_at = time.time()
+
+
+class InMemorySessionStore:
+    """Per-process LRU of chat sessions with TTL."""
+
+    def __init__(self, max_sessions: int = CHAT_MAX_SESSIONS, ttl_seconds: float = CHAT_SESSION_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, ChatSessionState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[ChatSessionState]:
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                return None
+            if state.updated_at + self.ttl_seconds < time.time():
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return state.model_copy(deep=True)
+
+    def create(self, destination: Optional[str] = None, language: Optional[str] = None) -> ChatSessionState:
+        state = _new_state(destination, language)
+        with self._lock:
+            self._sessions[state.session_id] = state
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return state.model_copy(deep=True)
+
+    def append(self, session_id: str, messages: List[ChatMessage]) -> None:
+        with self._lock:
+            if session_id in self._sessions:
+                _append(self._sessions[session_id], messages)
+
+    def apply_summary(self, session_id: str, summary: str, count: int) -> None:
+        with self._lock:
+            if session_id in self._sessions:
+                _fold(self._sessions[session_id], summary, count)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SQLiteSessionStore:
+    """Sessions in a local SQLite file, so any worker process on the host can continue a conversation."""
+
+    def __init__(self, path: str = CHAT_SESSION_PATH, max_sessions: int = CHAT_MAX_SESSIONS, ttl_seconds: float = CHAT_SESSION_TTL_SECONDS):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_sessions ("
+                "session_id TEXT PRIMARY KEY, state TEXT, updated_at REAL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _load(self, conn: sqlite3.Connection, session_id: str) -> Optional[ChatSessionState]:
+        row = conn.execute("SELECT state, updated_at FROM chat_sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None or row[1] + self.ttl_seconds < time.time():
+            return None
+        return ChatSessionState.model_validate_json(row[0])
+
+    def _save(self, conn: sqlite3.Connection, state: ChatSessionState) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO chat_sessions VALUES (?, ?, ?)",
+            (state.session_id, state.model_dump_json(), state.updated_at),
+        )
+
+    def _update(self, session_id: str, change) -> None:
+        conn = self._conn()
+        # BEGIN IMMEDIATE takes the write lock first, so concurrent read-modify-writes cannot interleave
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            state = self._load(conn, session_id)
+            if state is not None:
+                change(state)
+                self._save(conn, state)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, session_id: str) -> Optional[ChatSessionState]:
+        return self._load(self._conn(), session_id)
+
+    def create(self, destination: Optional[str] = None, language: Optional[str] = None) -> ChatSessionState:
+        state = _new_state(destination, language)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._save(conn, state)
+            conn.execute("DELETE FROM chat_sessions WHERE updated_at < ?", (time.time() - self.ttl_seconds,))
+            conn.execute(
+                "DELETE FROM chat_sessions WHERE session_id IN (SELECT session_id FROM chat_sessions "
+                "ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return state
+
+    def append(self, session_id: str, messages: List[ChatMessage]) -> None:
+        self._update(session_id, lambda state: _append(state, messages))
+
+    def apply_summary(self, session_id: str, summary: str, count: int) -> None:
+        self._update(session_id, lambda state: _fold(state, summary, count))
+
+    def delete(self, session_id: str) -> bool:
+        return self._conn().execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,)).rowcount > 0
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM chat_sessions").fetchone()[0]
+
+
+def create_session_store():
+    if CHAT_SESSION_BACKEND == "sqlite":
+        return SQLiteSessionStore()
+    return InMemorySessionStore()
+
+
+class ChatService:
+    """Multi-turn chat on top of LLMCaller: server-side history, a rolling summary and per-turn retrieval.
+
+    The prompt is laid out so consecutive turns share as long a prefix as possible:
+    the fixed system prompt and the running summary, then the recent messages verbatim,
+    then this turn's retrieved context together with the new question. The context is
+    never stored in the history, and old messages are folded into the summary in batches,
+    so the prompt stays roughly the same size however long the conversation gets.
+    """
+
+    def __init__(self, agent, store=None):
+        self.agent = agent
+        self.store = store if store is not None else create_session_store()
+        self.summaries_written = 0
+        self._summarizing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def session(self, request: ChatTurnRequest) -> Tuple[ChatSessionState, bool]:
+        """The request's session, or a new one when it has no (or an expired/unknown) session_id."""
+        state = self.store.get(request.session_id) if request.session_id else None
+        if state is not None:
+            return state, False
+        return self.store.create(request.destination, request.language), True
+
+    @staticmethod
+    def build_messages(state: ChatSessionState, context_text: str, message: str) -> List[Dict[str, str]]:
+        system = CHAT_SYSTEM_PROMPT
+        if state.destination:
+            system += f"\n\nThe conversation is about a trip to {state.destination}."
+        if state.summary:
+            system += f"\n\nSummary of the earlier conversation:\n{state.summary}"
+        user = f"Travel context:\n{context_text}\n\nMessage: {message}" if context_text else message
+        return (
+            [{"role": "system", "content": system}]
+            + [{"role": m.role, "content": m.content} for m in state.messages]
+            + [{"role": "user", "content": user}]
+        )
+
+    async def prepare(self, request: ChatTurnRequest):
+        """Resolve the session, retrieve context for this turn and build the prompt."""
+        state, created = self.session(request)
+        # Follow-ups like "what about food there?" are retrieved together with the previous question
+        previous = next((m.content for m in reversed(state.messages) if m.role == "user"), "")
+        query_text = " ".join(filter(None, [state.destination, previous, request.message]))
+        try:
+            retrieved_data, context_text, context_stats = await self.agent.retrieve(
+                query_text, request.top_k or self.agent.top_k,
+                retrieval_filter(state.destination, state.language),
+                budget_tokens=CHAT_CONTEXT_TOKEN_BUDGET,
+            )
+        except Exception as e:
+            print(f"Error retrieving chat context: {e}")
+            retrieved_data, context_text, context_stats = [], "", {"error": str(e)}
+        messages = self.build_messages(state, context_text, request.message)
+        PROMPT_CHARS.labels("chat").observe(sum(len(m["content"]) for m in messages))
+        return state, created, retrieved_data, context_stats, messages
+
+    def turn_meta(self, state: ChatSessionState, created: bool, context_stats: Dict[str, Any], messages: List[Dict[str, str]], model: Optional[str], reply: str, start: float) -> Dict[str, Any]:
+        return {
+            "status": "success",
+            "new_session": created,
+            "turn": (state.summarized_messages + len(state.messages)) // 2 + 1,
+            "model": model,
+            "history_messages": len(state.messages),
+            "summarized_messages": state.summarized_messages,
+            "prompt_tokens_estimate": sum(estimate_tokens(m["content"]) for m in messages),
+            "completion_tokens_estimate": estimate_tokens(reply),
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            "context": context_stats,
+        }
+
+    def record_turn(self, state: ChatSessionState, message: str, reply: str) -> None:
+        self.store.append(state.session_id, [ChatMessage(role="user", content=message), ChatMessage(role="assistant", content=reply)])
+        overflow = len(state.messages) + 2 - CHAT_RECENT_MESSAGES
+        if overflow >= CHAT_SUMMARIZE_BATCH and state.session_id not in self._summarizing:
+            # Claimed before the task starts, so a concurrent turn cannot schedule a second summary
+            self._summarizing.add(state.session_id)
+            # Off the request path: this turn's reply is already complete
+            task = asyncio.get_running_loop().create_task(self.summarize(state.session_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def summarize(self, session_id: str) -> None:
+        """Fold the messages beyond the recent window into the summary; record_turn claims the session first."""
+        try:
+            state = self.store.get(session_id)
+            if state is None:
+                return
+            # Whole user/assistant pairs only, so the verbatim history always starts with a user message
+            count = (len(state.messages) - CHAT_RECENT_MESSAGES) // 2 * 2
+            if count <= 0:
+                return
+            folded = "\n".join(f"{m.role}: {m.content}" for m in state.messages[:count])
+            prompt = SUMMARY_PROMPT.format(summary=state.summary or "(none)", messages=folded)
+            with stage_timer("chat_summary"):
+                summary, _ = await self.agent.routed_query(prompt, "chat", max_tokens=CHAT_SUMMARY_MAX_TOKENS)
+            self.store.apply_summary(session_id, summary.strip(), count)
+            self.summaries_written += 1
+        except Exception as e:
+            # The messages stay verbatim and the next turn tries again
+            print(f"Error summarizing chat session {session_id}: {e}")
+        finally:
+            self._summarizing.discard(session_id)
+
+    async def chat(self, request: ChatTurnRequest) -> ChatTurnResponse:
+        start = time.perf_counter()
+        state, created, retrieved_data, context_stats, messages = await self.prepare(request)
+        reply, model = await self.agent.routed_query(
+            request.message, "chat", messages=messages, max_tokens=CHAT_MAX_TOKENS
+        )
+        self.record_turn(state, request.message, reply)
+        return ChatTurnResponse(
+            session_id=state.session_id,
+            reply=reply,
+            retrieved_data=retrieved_data,
+            meta=self.turn_meta(state, created, context_stats, messages, model, reply, start),
+        )
+
+    async def chat_stream(self, request: ChatTurnRequest) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yields {"event": "session"} with the session id and retrieved passages, then
+        {"event": "delta"} text chunks as they arrive, then {"event": "complete"} with the
+        turn meta (or {"event": "error"}). The turn is stored only when the reply completes.
+        """
+        start = time.perf_counter()
+        state, created, retrieved_data, context_stats, messages = await self.prepare(request)
+        yield {"event": "session", "data": {
+            "session_id": state.session_id,
+            "retrieved_data": [item.model_dump() for item in retrieved_data],
+        }}
+        model = self.agent.router.choose("chat", sum(len(m["content"]) for m in messages)).model
+        parts: List[str] = []
+        first_token_ms = None
+        try:
+            async for delta in self.agent.basic_query_stream(
+                request.message, model=model, messages=messages, max_tokens=CHAT_MAX_TOKENS
+            ):
+                if first_token_ms is None:
+                    first_token_ms = round((time.perf_counter() - start) * 1000, 2)
+                parts.append(delta)
+                yield {"event": "delta", "data": {"text": delta}}
+        except Exception as e:
+            print(f"Error streaming chat reply: {e}")
+            yield {"event": "error", "data": {"message": str(e)}}
+            return
+        reply = "".join(parts)
+        self.record_turn(state, request.message, reply)
+        meta = self.turn_meta(state, created, context_stats, messages, model, reply, start)
+        meta["time_to_first_token_ms"] = first_token_ms
+        yield {"event": "complete", "data": {"session_id": state.session_id, "reply": reply, "meta": meta}}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": CHAT_SESSION_BACKEND,
+            "sessions": len(self.store),
+            "summaries_written": self.summaries_written,
+            "summaries_in_progress": len(self._summarizing),
+        }
@@ -0,0 +1,150 @@
+import os
+import re
+import hashlib
+import textwrap
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from utils.transcript_chunker import estimate_tokens
+
+PROMPT_CONTEXT_TOKEN_BUDGET = int(os.getenv("PROMPT_CONTEXT_TOKEN_BUDGET", "1500"))
+# lexical (word overlap with the query) | embedding (cosine to the query embedding) | off (whole passages only)
+# Embedding scoring encodes retrieved sentences on every request, so it is opt-in
+CONTEXT_SENTENCE_SCORING = os.getenv("CONTEXT_SENTENCE_SCORING", "lexical")
+# At most this many sentences per request are embedded for scoring (the lexically best ones)
+CONTEXT_MAX_EMBEDDED_SENTENCES = int(os.getenv("CONTEXT_MAX_EMBEDDED_SENTENCES", "64"))
+# Passages sharing at least this fraction of word shingles with a better-ranked one are dropped
+CONTEXT_DEDUP_JACCARD = float(os.getenv("CONTEXT_DEDUP_JACCARD", "0.8"))
+# Auto-generated captions have no punctuation, so long runs are split into fixed word windows
+SENTENCE_FALLBACK_WORDS = 30
+
+_SENTENCE_END = re.compile(r"(?<=[.!?。])\s+")
+
+
+def compact_prompt(prompt: str) -> str:
+    """Drop template indentation and blank lines, which the LLM pays for on every request."""
+    lines = (line.strip() for line in textwrap.dedent(prompt).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def split_sentences(text: str) -> List[str]:
+    sentences = []
+    for part in _SENTENCE_END.split(text.strip()):
+        words = part.split()
+        if len(words) <= SENTENCE_FALLBACK_WORDS * 2:
+            if part.strip():
+                sentences.append(part.strip())
+            continue
+        for i in range(0, len(words), SENTENCE_FALLBACK_WORDS):
+            sentences.append(" ".join(words[i:i + SENTENCE_FALLBACK_WORDS]))
+    return sentences
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = text.lower().split()
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def dedupe_passages(passages: List[str]) -> Tuple[List[int], int]:
+    """Indices of passages to keep (in input order) and how many near-duplicates were dropped."""
+    kept: List[int] = []
+    seen_hashes = set()
+    kept_shingles: List[set] = []
+    for i, text in enumerate(passages):
+        digest = hashlib.sha1(" ".join(text.lower().split()).encode()).hexdigest()
+        if not text.strip() or digest in seen_hashes:
+            continue
+        shingles = _shingles(text)
+        if any(shingles and len(shingles & other) / len(shingles | other) >= CONTEXT_DEDUP_JACCARD for other in kept_shingles):
+            continue
+        seen_hashes.add(digest)
+        kept_shingles.append(shingles)
+        kept.append(i)
+    return kept, len(passages) - len(kept)
+
+
+def _lexical_scores(query_text: str, sentences: List[str]) -> np.ndarray:
+    query_words = set(query_text.lower().split())
+    return np.array([
+        len(query_words & set(sentence.lower().split())) / (len(sentence.split()) ** 0.5 or 1)
+        for sentence in sentences
+    ], dtype=np.float32)
+
+
+async def assemble_context(
+    passages: List[str],
+    query_text: str,
+    query_embedding: Optional[List[float]] = None,
+    encoder=None,
+    budget_tokens: int = PROMPT_CONTEXT_TOKEN_BUDGET,
+    scoring: str = CONTEXT_SENTENCE_SCORING,
+    max_embedded: int = CONTEXT_MAX_EMBEDDED_SENTENCES,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build the RAG context from passages already ranked best-first.
+
+    Near-duplicate passages are dropped. Each remaining passage is split into sentences,
+    and the sentences most relevant to the query are kept until ``budget_tokens`` is used.
+    Selected sentences keep their original order inside each passage. Returns
+    (context_text, stats).
+
+    Sentences are scored by word overlap with the query unless ``scoring`` is "embedding".
+    With embedding scoring, ``encoder`` is the embedding micro-batcher (``encode_many``), so
+    sentence encodes share forward passes with query encodes instead of competing with them.
+    Only the ``max_embedded`` lexically best sentences are embedded and considered.
+    """
+    tokens_before = sum(estimate_tokens(p) for p in passages)
+    embedded = 0
+    keep, duplicates = dedupe_passages(passages)
+    passages = [passages[i] for i in keep]
+
+    if scoring == "off":
+        selected, used = [], 0
+        for passage in passages:
+            tokens = estimate_tokens(passage)
+            if used + tokens > budget_tokens and selected:
+                break
+            selected.append(passage)
+            used += tokens
+        context = "\n".join(selected)
+    else:
+        units = [(p, s, sentence) for p, passage in enumerate(passages) for s, sentence in enumerate(split_sentences(passage))]
+        relevance = _lexical_scores(query_text, [sentence for _, _, sentence in units])
+        if scoring == "embedding" and encoder is not None and query_embedding is not None and units:
+            if len(units) > max_embedded:
+                shortlist = sorted(range(len(units)), key=lambda i: relevance[i] - 0.01 * units[i][0], reverse=True)[:max_embedded]
+                units = [units[i] for i in sorted(shortlist)]
+            vectors = await encoder.encode_many([sentence for _, _, sentence in units])
+            relevance = vectors @ np.asarray(query_embedding, dtype=np.float32)
+            embedded = len(units)
+        # Slight preference for better-ranked passages when relevance is close
+        priority = [relevance[i] - 0.01 * p for i, (p, _, _) in enumerate(units)]
+
+        chosen = set()
+        seen_sentences = set()
+        used = 0
+        for i in sorted(range(len(units)), key=lambda i: priority[i], reverse=True):
+            normalized = " ".join(units[i][2].lower().split())
+            tokens = estimate_tokens(units[i][2])
+            if normalized in seen_sentences or used + tokens > budget_tokens:
+                continue
+            seen_sentences.add(normalized)
+            chosen.add(i)
+            used += tokens
+
+        by_passage: Dict[int, List[str]] = {}
+        for i in sorted(chosen, key=lambda i: (units[i][0], units[i][1])):
+            by_passage.setdefault(units[i][0], []).append(units[i][2])
+        context = "\n".join(" ".join(sentences) for _, sentences in sorted(by_passage.items()))
+
+    tokens_after = estimate_tokens(context) if context else 0
+    return context, {
+        "budget_tokens": budget_tokens,
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": max(tokens_before - tokens_after, 0),
+        "duplicates_removed": duplicates,
+        "scoring": scoring,
+        "sentences_embedded": embedded,
+    }
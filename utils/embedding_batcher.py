@@ -0,0 +1,137 @@
+import os
+import asyncio
+import time
+import numpy as np
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from utils.embedding_engine import EmbeddingEngine, get_embedding_engine, EMBEDDING_WORKERS
+
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32"))
+EMBEDDING_BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+METRICS_WINDOW = 2048
+
+
+class EmbeddingBatcher:
+    """Gathers concurrent single-text encode calls into one model.encode batch.
+
+    A request waits at most ``max_wait_ms`` for company (or until ``max_batch_size``
+    texts are queued), then the whole batch is encoded in one forward pass and each
+    caller gets its own vector back.
+    """
+
+    def __init__(
+        self,
+        engine: Optional[EmbeddingEngine] = None,
+        max_batch_size: int = EMBEDDING_BATCH_MAX_SIZE,
+        max_wait_ms: float = EMBEDDING_BATCH_MAX_WAIT_MS,
+        max_concurrent_batches: int = EMBEDDING_WORKERS,
+    ):
+        self.engine = engine or get_embedding_engine()
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_concurrent_batches = max_concurrent_batches
+        self.total_requests = 0
+        self.total_batches = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._queue_wait_ms: Deque[float] = deque(maxlen=METRICS_WINDOW)
+        self._encode_ms: Deque[float] = deque(maxlen=METRICS_WINDOW)
+        self._batch_sizes: Deque[int] = deque(maxlen=METRICS_WINDOW)
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def encode(self, text: str) -> List[float]:
+        """Queue one text and wait for its normalised embedding."""
+        dense, _ = await self.encode_hybrid(text)
+        return dense
+
+    async def encode_many(self, texts: List[str]) -> np.ndarray:
+        """Queue several texts at once; they share batches with concurrent callers. Returns (n, dim) float32."""
+        dense = await asyncio.gather(*(self.encode(text) for text in texts))
+        return np.asarray(dense, dtype=np.float32)
+
+    async def encode_hybrid(self, text: str) -> Tuple[List[float], Optional[Dict[int, float]]]:
+        """Dense embedding plus sparse lexical weights (None when the engine has no sparse head)."""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        self.total_requests += 1
+        await self._queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            loop.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future, float]]) -> None:
+        try:
+            start = time.perf_counter()
+            for _, _, enqueued_at in batch:
+                self._queue_wait_ms.append((start - enqueued_at) * 1000)
+            self._batch_sizes.append(len(batch))
+            self.total_batches += 1
+
+            texts = [text for text, _, _ in batch]
+            try:
+                if self.engine.supports_sparse:
+                    vectors, sparse = await self.engine.encode_hybrid_async(texts, batch_size=len(batch))
+                else:
+                    vectors = await self.engine.encode_async(texts, batch_size=len(batch))
+                    sparse = [None] * len(batch)
+            except Exception as e:
+                print(f"Error encoding batch of {len(batch)}: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            self._encode_ms.append((time.perf_counter() - start) * 1000)
+            for (_, future, _), vector, weights in zip(batch, vectors, sparse):
+                if not future.done():
+                    future.set_result((vector.tolist(), weights))
+        finally:
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        def percentile(values, q):
+            return round(float(np.percentile(values, q)), 3) if values else None
+
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "total_requests": self.total_requests,
+            "total_batches": self.total_batches,
+            "pending": self._queue.qsize() if self._queue else 0,
+            "avg_batch_size": round(float(np.mean(self._batch_sizes)), 2) if self._batch_sizes else None,
+            "queue_wait_ms_p50": percentile(self._queue_wait_ms, 50),
+            "queue_wait_ms_p99": percentile(self._queue_wait_ms, 99),
+            "encode_ms_p50": percentile(self._encode_ms, 50),
+            "encode_ms_p99": percentile(self._encode_ms, 99),
+        }
+
+
+_batcher: Optional[EmbeddingBatcher] = None
+
+
+def get_embedding_batcher() -> EmbeddingBatcher:
+    """Return the process-wide batcher sitting in front of the shared embedding engine."""
+    global _batcher
+    if _batcher is None:
+        _batcher = EmbeddingBatcher()
+    return _batcher
@@ -0,0 +1,166 @@
+import os
+import asyncio
+import threading
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+from utils.hybrid import hybrid_enabled
+from utils.vector_storage import EMBEDDING_DIM, truncate_dim
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL", "BAAI/bge-m3")
+# torch | torch-int8 | onnx | onnx-int8 | flagembedding (dense + sparse lexical weights, needed for hybrid retrieval)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "flagembedding" if hybrid_enabled() else "torch")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+ONNX_INT8_FILE = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model_qint8_avx512_vnni.onnx")
+# Bounded pool for running CPU-bound encodes off the event loop
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "2"))
+
+
+class EmbeddingEngine:
+    """Process-wide wrapper around the BGE-M3 SentenceTransformer.
+
+    The model is loaded lazily on first use so importing this module is cheap,
+    and every component in the process shares the same weights.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, backend: str = EMBEDDING_BACKEND, dim: int = EMBEDDING_DIM):
+        self.model_name = model_name
+        self.backend = backend
+        # 0 = full model output; otherwise vectors are truncated to their first ``dim`` dimensions
+        self.dim = dim
+        self.load_seconds: Optional[float] = None
+        self._model = None
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def supports_sparse(self) -> bool:
+        return self.backend == "flagembedding"
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifies the vectors this engine produces, for embedding caches."""
+        return f"{self.model_name}@{self.dim}" if self.dim else self.model_name
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load()
+        return self._model
+
+    def _load(self):
+        start = time.perf_counter()
+        if self.backend == "flagembedding":
+            from FlagEmbedding import BGEM3FlagModel
+
+            model = BGEM3FlagModel(self.model_name, use_fp16=False)
+            self.load_seconds = time.perf_counter() - start
+            print(f"Loaded embedding model '{self.model_name}' ({self.backend}) in {self.load_seconds:.1f}s")
+            return model
+
+        from sentence_transformers import SentenceTransformer
+
+        if self.backend == "onnx":
+            model = SentenceTransformer(self.model_name, backend="onnx")
+        elif self.backend == "onnx-int8":
+            model = SentenceTransformer(
+                self.model_name,
+                backend="onnx",
+                model_kwargs={"file_name": ONNX_INT8_FILE},
+            )
+        else:
+            model = SentenceTransformer(self.model_name, device="cpu" if self.backend == "torch-int8" else None)
+            if self.backend == "torch-int8":
+                import torch
+
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.load_seconds = time.perf_counter() - start
+        print(f"Loaded embedding model '{self.model_name}' ({self.backend}) in {self.load_seconds:.1f}s")
+        return model
+
+    def load(self) -> None:
+        """Load the weights without running them, e.g. in a server master process before forking."""
+        self.model
+
+    def warmup(self) -> None:
+        """Load the weights and run one forward pass so the first request is not slow."""
+        self.encode("warmup")
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = EMBEDDING_BATCH_SIZE) -> np.ndarray:
+        """Encode one or more texts into L2-normalised float32 vectors of shape (n, dim)."""
+        if isinstance(texts, str):
+            texts = [texts]
+        if self.supports_sparse:
+            return self.encode_hybrid(texts, batch_size)[0]
+        embeddings = self.model.encode(
+            texts,
+            batch_size=batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+        )
+        return truncate_dim(np.asarray(embeddings, dtype=np.float32), self.dim)
+
+    def encode_hybrid(self, texts: Union[str, List[str]], batch_size: int = EMBEDDING_BATCH_SIZE) -> Tuple[np.ndarray, List[Dict[int, float]]]:
+        """Dense vectors and BGE-M3 sparse lexical weights from a single forward pass."""
+        if not self.supports_sparse:
+            raise RuntimeError(f"Embedding backend '{self.backend}' does not produce sparse weights")
+        if isinstance(texts, str):
+            texts = [texts]
+        output = self.model.encode(texts, batch_size=batch_size, return_dense=True, return_sparse=True)
+        dense = truncate_dim(np.asarray(output["dense_vecs"], dtype=np.float32), self.dim)
+        sparse = [{int(token): float(weight) for token, weight in weights.items()} for weights in output["lexical_weights"]]
+        return dense, sparse
+
+    def encode_sparse(self, texts: Union[str, List[str]], batch_size: int = EMBEDDING_BATCH_SIZE) -> List[Dict[int, float]]:
+        """Only the BGE-M3 sparse lexical weights, for texts whose dense vectors are already stored."""
+        if not self.supports_sparse:
+            raise RuntimeError(f"Embedding backend '{self.backend}' does not produce sparse weights")
+        if isinstance(texts, str):
+            texts = [texts]
+        output = self.model.encode(texts, batch_size=batch_size, return_dense=False, return_sparse=True)
+        return [{int(token): float(weight) for token, weight in weights.items()} for weights in output["lexical_weights"]]
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=EMBEDDING_WORKERS, thread_name_prefix="embedding"
+                    )
+        return self._executor
+
+    async def encode_async(self, texts: Union[str, List[str]], batch_size: int = EMBEDDING_BATCH_SIZE) -> np.ndarray:
+        """Same as encode, but runs on the bounded embedding pool so the event loop stays free."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.encode, texts, batch_size)
+
+    async def encode_hybrid_async(self, texts: Union[str, List[str]], batch_size: int = EMBEDDING_BATCH_SIZE):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.encode_hybrid, texts, batch_size)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+_engine: Optional[EmbeddingEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_embedding_engine() -> EmbeddingEngine:
+    """Return the single EmbeddingEngine shared by the whole process."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = EmbeddingEngine()
+    return _engine
@@ -0,0 +1,246 @@
+import os
+import re
+import json
+import math
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+# Radius around the resolved destination that still counts as "at the destination"
+RETRIEVAL_GEO_RADIUS_KM = float(os.getenv("RETRIEVAL_GEO_RADIUS_KM", "50"))
+# Pre-filter retrieval by destination / language from the PlanRequest
+RETRIEVAL_FILTERS = os.getenv("RETRIEVAL_FILTERS", "true").lower() == "true"
+# With fewer filtered hits than this, the search is repeated without the filter
+RETRIEVAL_FILTER_MIN_RESULTS = int(os.getenv("RETRIEVAL_FILTER_MIN_RESULTS", "1"))
+# Optional JSON file with extra places: {"name": {"region": .., "country": .., "lat": .., "lon": .., "aliases": [..]}}
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", "")
+
+_THAI_CHARS = re.compile(r"[฀-๿]")
+
+
+class Place(NamedTuple):
+    name: str
+    region: str
+    country: str
+    lat: float
+    lon: float
+
+
+# name: (region, country, lat, lon, aliases)
+_PLACES = {
+    "bangkok": ("central", "TH", 13.7563, 100.5018, ["krung thep", "กรุงเทพ"]),
+    "ayutthaya": ("central", "TH", 14.3532, 100.5689, ["อยุธยา"]),
+    "lopburi": ("central", "TH", 14.7995, 100.6534, ["lop buri", "ลพบุรี"]),
+    "kanchanaburi": ("west", "TH", 14.0228, 99.5328, ["กาญจนบุรี"]),
+    "hua hin": ("west", "TH", 12.5684, 99.9577, ["หัวหิน"]),
+    "pattaya": ("east", "TH", 12.9236, 100.8825, ["พัทยา"]),
+    "koh chang": ("east", "TH", 12.0510, 102.3170, ["ko chang", "เกาะช้าง"]),
+    "chiang mai": ("north", "TH", 18.7883, 98.9853, ["chiangmai", "เชียงใหม่"]),
+    "chiang rai": ("north", "TH", 19.9105, 99.8406, ["chiangrai", "เชียงราย"]),
+    "pai": ("north", "TH", 19.3582, 98.4405, ["ปาย"]),
+    "chiang dao": ("north", "TH", 19.3641, 98.9640, ["chiangdao", "doi luang chiang dao", "เชียงดาว"]),
+    "mae hong son": ("north", "TH", 19.3020, 97.9654, ["แม่ฮ่องสอน"]),
+    "nan": ("north", "TH", 18.7756, 100.7730, ["น่าน"]),
+    "sukhothai": ("north", "TH", 17.0069, 99.8265, ["สุโขทัย"]),
+    "khao yai": ("northeast", "TH", 14.4392, 101.3722, ["เขาใหญ่"]),
+    "nakhon ratchasima": ("northeast", "TH", 14.9799, 102.0978, ["korat", "โคราช", "นครราชสีมา"]),
+    "khon kaen": ("northeast", "TH", 16.4419, 102.8360, ["ขอนแก่น"]),
+    "udon thani": ("northeast", "TH", 17.4138, 102.7872, ["อุดรธานี"]),
+    "phuket": ("south", "TH", 7.8804, 98.3923, ["ภูเก็ต"]),
+    "khao lak": ("south", "TH", 8.6367, 98.2487, ["เขาหลัก"]),
+    "krabi": ("south", "TH", 8.0863, 98.9063, ["ao nang", "กระบี่"]),
+    "koh phi phi": ("south", "TH", 7.7407, 98.7784, ["phi phi", "เกาะพีพี"]),
+    "koh lanta": ("south", "TH", 7.6245, 99.0790, ["ko lanta", "เกาะลันตา"]),
+    "trang": ("south", "TH", 7.5563, 99.6114, ["ตรัง"]),
+    "surat thani": ("south", "TH", 9.1382, 99.3215, ["สุราษฎร์ธานี"]),
+    "koh samui": ("south", "TH", 9.5120, 100.0136, ["ko samui", "samui", "เกาะสมุย"]),
+    "koh phangan": ("south", "TH", 9.7500, 100.0333, ["ko pha ngan", "koh pha ngan", "เกาะพะงัน"]),
+    "koh tao": ("south", "TH", 10.0956, 99.8404, ["ko tao", "เกาะเต่า"]),
+    "chumphon": ("south", "TH", 10.4930, 99.1800, ["ชุมพร"]),
+    "singapore": ("singapore", "SG", 1.3521, 103.8198, []),
+    "kuala lumpur": ("peninsular", "MY", 3.1390, 101.6869, []),
+    "penang": ("peninsular", "MY", 5.4164, 100.3327, ["george town"]),
+    "langkawi": ("peninsular", "MY", 6.3500, 99.8000, []),
+    "malacca": ("peninsular", "MY", 2.1896, 102.2501, ["melaka"]),
+    "bali": ("bali", "ID", -8.3405, 115.0920, ["ubud", "denpasar"]),
+    "jakarta": ("java", "ID", -6.2088, 106.8456, []),
+    "yogyakarta": ("java", "ID", -7.7956, 110.3695, ["jogja"]),
+    "hanoi": ("north", "VN", 21.0278, 105.8342, []),
+    "ha long bay": ("north", "VN", 20.9101, 107.1839, ["halong bay", "ha long"]),
+    "da nang": ("central", "VN", 16.0544, 108.2022, ["danang"]),
+    "hoi an": ("central", "VN", 15.8801, 108.3380, []),
+    "ho chi minh city": ("south", "VN", 10.8231, 106.6297, ["saigon", "hcmc"]),
+    "siem reap": ("northwest", "KH", 13.3671, 103.8448, ["angkor wat", "angkor"]),
+    "phnom penh": ("central", "KH", 11.5564, 104.9282, []),
+    "luang prabang": ("north", "LA", 19.8856, 102.1347, []),
+    "vientiane": ("central", "LA", 17.9757, 102.6331, []),
+    "manila": ("luzon", "PH", 14.5995, 120.9842, []),
+    "cebu": ("visayas", "PH", 10.3157, 123.8854, []),
+    "el nido": ("palawan", "PH", 11.1956, 119.4075, ["palawan"]),
+    "boracay": ("visayas", "PH", 11.9674, 121.9248, []),
+    "yangon": ("lower", "MM", 16.8409, 96.1735, ["rangoon"]),
+    "bagan": ("upper", "MM", 21.1717, 94.8585, []),
+}
+
+
+# Place names that are also everyday words ("pai" is Thai for "go", "nan" for grandma, "trang" ends
+# "Nha Trang") only count in free text next to a cue such as "in Pai" or "Nan province"
+_AMBIGUOUS_ALIASES = {"pai", "nan", "trang"}
+_CUE_BEFORE = re.compile(r"\b(?:in|to|at|from|near|around|via|towards|visit|visiting)\s+$")
+_CUE_AFTER = re.compile(r"^[\s,]*(?:province|town|city|district|canyon|valley|river|thailand)\b")
+
+
+def _load_gazetteer() -> Tuple[Dict[str, Place], Dict[str, str]]:
+    entries = dict(_PLACES)
+    if GAZETTEER_PATH:
+        with open(GAZETTEER_PATH) as f:
+            for name, info in json.load(f).items():
+                entries[name.lower()] = (info["region"], info["country"], info["lat"], info["lon"], info.get("aliases", []))
+    places, aliases = {}, {}
+    for name, (region, country, lat, lon, extra) in entries.items():
+        places[name] = Place(name, region, country, lat, lon)
+        for alias in [name] + list(extra):
+            aliases[alias.lower()] = name
+    return places, aliases
+
+
+PLACES, _ALIASES = _load_gazetteer()
+# Longest aliases first so "chiang mai" wins over shorter overlapping names
+_LATIN_ALIASES = sorted((a for a in _ALIASES if not _THAI_CHARS.search(a)), key=len, reverse=True)
+_THAI_ALIASES = sorted((a for a in _ALIASES if _THAI_CHARS.search(a)), key=len, reverse=True)
+_LATIN_PATTERN = re.compile(r"\b(" + "|".join(re.escape(a) for a in _LATIN_ALIASES) + r")\b")
+# Thai is written without spaces between words, so no word boundaries there
+_THAI_PATTERN = re.compile("|".join(re.escape(a) for a in _THAI_ALIASES))
+
+
+def _has_place_cue(lowered: str, start: int, end: int) -> bool:
+    return bool(_CUE_BEFORE.search(lowered[max(0, start - 16):start]) or _CUE_AFTER.match(lowered[end:end + 16]))
+
+
+def place_mentions(text: str) -> Counter:
+    """Gazetteer place names mentioned in the text, with counts."""
+    lowered = text.lower()
+    found = Counter(
+        _ALIASES[m.group(1)] for m in _LATIN_PATTERN.finditer(lowered)
+        if m.group(1) not in _AMBIGUOUS_ALIASES or _has_place_cue(lowered, m.start(), m.end())
+    )
+    found.update(_ALIASES[m] for m in _THAI_PATTERN.findall(text))
+    return found
+
+
+def resolve_place(name: Optional[str]) -> Optional[Place]:
+    """Place for a user-supplied destination like "Chiang Mai, Thailand", or None when unknown."""
+    if not name:
+        return None
+    alias = _ALIASES.get(name.strip().lower())
+    if alias:
+        return PLACES[alias]
+    mentions = place_mentions(name)
+    return PLACES[mentions.most_common(1)[0][0]] if mentions else None
+
+
+def detect_language(text: str) -> str:
+    """"th" when Thai script makes up a meaningful share of the letters, otherwise "en"."""
+    letters = sum(ch.isalpha() for ch in text)
+    return "th" if letters and len(_THAI_CHARS.findall(text)) / letters > 0.3 else "en"
+
+
+def place_fields(place: Optional[Place]) -> Dict[str, Any]:
+    if place is None:
+        return {}
+    return {
+        "destination": place.name,
+        "region": place.region,
+        "country": place.country,
+        "location": {"lat": place.lat, "lon": place.lon},
+    }
+
+
+def geo_payload(text: str, fallback: Optional[Place] = None, language: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Structured payload fields for one passage: the most-mentioned place (or ``fallback``,
+    usually the video's main place) plus the transcript language.
+    """
+    mentions = place_mentions(text)
+    place = PLACES[mentions.most_common(1)[0][0]] if mentions else fallback
+    return {**place_fields(place), "language": language or detect_language(text)}
+
+
+def enrich_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill geo/language fields that are not in the payload yet, without overwriting given ones."""
+    if "destination" in payload and "location" not in payload:
+        # Caller-supplied names like "Chiang Mai" are normalised to the gazetteer entry the filters match on
+        payload.update(place_fields(resolve_place(payload["destination"])))
+    for key, value in geo_payload(payload.get("text", "")).items():
+        payload.setdefault(key, value)
+    return payload
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+
+@dataclass
+class RetrievalFilter:
+    """Pre-filter derived from a PlanRequest: near the destination, optionally in one language."""
+    place: Optional[Place] = None
+    radius_km: float = RETRIEVAL_GEO_RADIUS_KM
+    language: Optional[str] = None
+
+    def __bool__(self) -> bool:
+        return self.place is not None or self.language is not None
+
+    def to_qdrant(self):
+        from qdrant_client.models import FieldCondition, Filter, GeoPoint, GeoRadius, MatchValue
+
+        must = []
+        if self.place is not None:
+            # Tagged with the destination, or anywhere within the radius of it
+            must.append(Filter(should=[
+                FieldCondition(key="destination", match=MatchValue(value=self.place.name)),
+                FieldCondition(key="location", geo_radius=GeoRadius(
+                    center=GeoPoint(lat=self.place.lat, lon=self.place.lon), radius=self.radius_km * 1000,
+                )),
+            ]))
+        if self.language is not None:
+            must.append(FieldCondition(key="language", match=MatchValue(value=self.language)))
+        return Filter(must=must)
+
+    def matches(self, payload: Dict[str, Any]) -> bool:
+        """Same condition as to_qdrant, evaluated in Python for the local index."""
+        if self.language is not None and payload.get("language") != self.language:
+            return False
+        if self.place is None or payload.get("destination") == self.place.name:
+            return True
+        location = payload.get("location")
+        return bool(location) and haversine_km(self.place.lat, self.place.lon, location["lat"], location["lon"]) <= self.radius_km
+
+
+def retrieval_filter(destination: Optional[str], language: Optional[str] = None, radius_km: Optional[float] = None) -> Optional[RetrievalFilter]:
+    if not RETRIEVAL_FILTERS:
+        return None
+    result = RetrievalFilter(resolve_place(destination), radius_km or RETRIEVAL_GEO_RADIUS_KM, language)
+    return result or None
+
+
+def ensure_payload_indexes(client, collection_name: str) -> None:
+    """Payload indexes backing the retrieval filters; safe to call on an existing collection."""
+    from qdrant_client.models import PayloadSchemaType
+
+    schema = {
+        "destination": PayloadSchemaType.KEYWORD,
+        "region": PayloadSchemaType.KEYWORD,
+        "country": PayloadSchemaType.KEYWORD,
+        "language": PayloadSchemaType.KEYWORD,
+        "source": PayloadSchemaType.KEYWORD,
+        "video_id": PayloadSchemaType.KEYWORD,
+        "location": PayloadSchemaType.GEO,
+        "ingested_at": PayloadSchemaType.FLOAT,
+    }
+    for field_name, field_schema in schema.items():
+        try:
+            client.create_payload_index(collection_name=collection_name, field_name=field_name, field_schema=field_schema)
+        except Exception as e:
+            print(f"Error creating payload index '{field_name}': {e}")
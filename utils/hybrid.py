@@ -0,0 +1,89 @@
+import os
+from typing import Dict, List, Optional
+from utils.vector_storage import dense_vector_params, search_params
+
+# dense (single unnamed vector, the original layout) | hybrid (named dense + sparse vectors fused with RRF)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense")
+DENSE_VECTOR_NAME = "dense"
+SPARSE_VECTOR_NAME = "sparse"
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Each leg fetches this many times the requested limit before fusion
+HYBRID_OVERFETCH = int(os.getenv("HYBRID_OVERFETCH", "3"))
+
+
+def hybrid_enabled() -> bool:
+    return RETRIEVAL_MODE == "hybrid"
+
+
+def to_sparse_vector(weights: Dict[int, float]):
+    from qdrant_client.models import SparseVector
+
+    indices = sorted(weights)
+    return SparseVector(indices=indices, values=[float(weights[i]) for i in indices])
+
+
+def point_vector(dense: List[float], sparse: Optional[Dict[int, float]] = None):
+    """Vector field for PointStruct in the current retrieval mode."""
+    if not hybrid_enabled():
+        return dense
+    return {DENSE_VECTOR_NAME: dense, SPARSE_VECTOR_NAME: to_sparse_vector(sparse or {})}
+
+
+def dense_part(vector):
+    """Dense component of a stored vector (named in hybrid collections, bare otherwise)."""
+    return vector[DENSE_VECTOR_NAME] if isinstance(vector, dict) else vector
+
+
+def sparse_part(vector) -> Optional[Dict[int, float]]:
+    """Sparse weights of a stored hybrid vector as {token_id: weight}, or None."""
+    if not isinstance(vector, dict) or SPARSE_VECTOR_NAME not in vector:
+        return None
+    sparse = vector[SPARSE_VECTOR_NAME]
+    return dict(zip(sparse.indices, sparse.values))
+
+
+def dense_query(dense: List[float]):
+    """query_vector argument for a dense-only search in the current retrieval mode."""
+    return (DENSE_VECTOR_NAME, dense) if hybrid_enabled() else dense
+
+
+def collection_vectors_config(size: int):
+    """(vectors_config, sparse_vectors_config) for creating the collection."""
+    from qdrant_client.models import SparseVectorParams
+
+    dense = dense_vector_params(size)
+    if not hybrid_enabled():
+        return dense, None
+    return {DENSE_VECTOR_NAME: dense}, {SPARSE_VECTOR_NAME: SparseVectorParams()}
+
+
+def hybrid_search_requests(dense: List[float], sparse: Dict[int, float], limit: int, query_filter=None):
+    """Dense and sparse legs for one search_batch round trip."""
+    from qdrant_client.models import NamedSparseVector, NamedVector, SearchRequest
+
+    fetch = limit * HYBRID_OVERFETCH
+    return [
+        SearchRequest(
+            vector=NamedVector(name=DENSE_VECTOR_NAME, vector=dense),
+            filter=query_filter, limit=fetch, with_payload=True, params=search_params(),
+        ),
+        SearchRequest(
+            vector=NamedSparseVector(name=SPARSE_VECTOR_NAME, vector=to_sparse_vector(sparse)),
+            filter=query_filter, limit=fetch, with_payload=True,
+        ),
+    ]
+
+
+def rrf_fuse(result_lists, limit: int, k: int = RRF_K):
+    """
+    Reciprocal Rank Fusion: score = sum(1 / (k + rank)) over the lists a point appears in.
+    Returns the original ScoredPoint objects with the fused score.
+    """
+    fused: Dict = {}
+    points: Dict = {}
+    for results in result_lists:
+        for rank, point in enumerate(results):
+            fused[point.id] = fused.get(point.id, 0.0) + 1.0 / (k + rank + 1)
+            points.setdefault(point.id, point)
+    ranked = sorted(fused, key=fused.get, reverse=True)[:limit]
+    return [points[point_id].model_copy(update={"score": fused[point_id]}) for point_id in ranked]
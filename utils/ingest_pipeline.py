@@ -0,0 +1,168 @@
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from interface import IngestJobStatus
+from utils.job_registry import JobRegistry
+
+INGEST_FETCH_WORKERS = int(os.getenv("INGEST_FETCH_WORKERS", "8"))
+INGEST_ENCODE_BATCH_SIZE = int(os.getenv("INGEST_ENCODE_BATCH_SIZE", "64"))
+INGEST_RETRY_BACKOFF_SECONDS = float(os.getenv("INGEST_RETRY_BACKOFF_SECONDS", "1.0"))
+
+
+class IngestJob:
+    """Progress of one batch ingestion; updated by the pipeline thread, read by the API."""
+
+    def __init__(self, video_ids: List[str], job_id: Optional[str] = None):
+        self.job_id = job_id or str(uuid.uuid4())
+        # Deduped up front so ``total`` matches the videos the pipeline actually processes
+        self.video_ids = list(dict.fromkeys(video_ids))
+        self.status = "queued"
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.skipped = 0
+        self.chunks_inserted = 0
+        self.errors: Dict[str, str] = {}
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.lock = threading.Lock()
+
+    def to_status(self) -> IngestJobStatus:
+        with self.lock:
+            return IngestJobStatus(
+                job_id=self.job_id,
+                status=self.status,
+                total=len(self.video_ids),
+                completed=self.completed,
+                failed=self.failed,
+                retried=self.retried,
+                skipped=self.skipped,
+                chunks_inserted=self.chunks_inserted,
+                errors=dict(self.errors),
+                started_at=self.started_at,
+                finished_at=self.finished_at,
+            )
+
+
+class BatchIngestor:
+    """
+    Concurrent YouTube ingestion built on DataImporter.
+
+    Transcripts are fetched on a bounded thread pool while the calling thread chunks
+    finished transcripts, encodes them in large batches and upserts without waiting
+    for Qdrant to acknowledge, so the embedding model stays busy.
+    """
+
+    def __init__(
+        self,
+        data_importer,
+        fetch_workers: int = INGEST_FETCH_WORKERS,
+        encode_batch_size: int = INGEST_ENCODE_BATCH_SIZE,
+        retry_backoff_seconds: float = INGEST_RETRY_BACKOFF_SECONDS,
+    ):
+        self.data_importer = data_importer
+        self.fetch_workers = fetch_workers
+        self.encode_batch_size = encode_batch_size
+        self.retry_backoff_seconds = retry_backoff_seconds
+
+    def _fetch_with_retry(self, video_id: str, job: IngestJob, max_retries: int, metadata: Optional[Dict] = None) -> List[Dict]:
+        attempt = 0
+        while True:
+            try:
+                return self.data_importer.fetch_youtube_segments(video_id, metadata)
+            except Exception:
+                if attempt >= max_retries:
+                    raise
+                attempt += 1
+                with job.lock:
+                    job.retried += 1
+                time.sleep(self.retry_backoff_seconds * (2 ** (attempt - 1)) * (1 + random.random()))
+
+    def _flush(self, texts: List[str], metadata_list: List[Dict], point_ids: List[str], job: IngestJob) -> None:
+        if not texts:
+            return
+        self.data_importer.insert_texts(texts, metadata_list, wait=False, point_ids=list(point_ids), replace_videos=True)
+        with job.lock:
+            job.chunks_inserted += len(texts)
+        texts.clear()
+        metadata_list.clear()
+        point_ids.clear()
+
+    def run(
+        self,
+        job: IngestJob,
+        metadata: Optional[Dict] = None,
+        max_retries: int = 2,
+        on_progress: Optional[Callable[[IngestJob], None]] = None,
+    ) -> IngestJob:
+        with job.lock:
+            job.status = "running"
+            job.started_at = datetime.utcnow().isoformat()
+
+        pending_texts: List[str] = []
+        pending_metadata: List[Dict] = []
+        pending_ids: List[str] = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix="ingest-fetch") as pool:
+                futures = {
+                    pool.submit(self._fetch_with_retry, video_id, job, max_retries, metadata): video_id
+                    for video_id in job.video_ids
+                }
+                for future in as_completed(futures):
+                    video_id = futures[future]
+                    try:
+                        segments = future.result()
+                    except Exception as e:
+                        with job.lock:
+                            job.failed += 1
+                            job.errors[video_id] = str(e)
+                    else:
+                        if segments:
+                            texts, metadata_list, point_ids = self.data_importer.build_youtube_chunks(video_id, segments, metadata)
+                            pending_texts.extend(texts)
+                            pending_metadata.extend(metadata_list)
+                            pending_ids.extend(point_ids)
+                            with job.lock:
+                                job.completed += 1
+                        else:
+                            with job.lock:
+                                job.skipped += 1
+                        if len(pending_texts) >= self.encode_batch_size:
+                            self._flush(pending_texts, pending_metadata, pending_ids, job)
+                    if on_progress:
+                        on_progress(job)
+            self._flush(pending_texts, pending_metadata, pending_ids, job)
+            with job.lock:
+                job.status = "completed" if not job.failed else "completed_with_errors"
+        except Exception as e:
+            print(f"Error in batch ingestion {job.job_id}: {e}")
+            with job.lock:
+                job.status = "failed"
+                job.errors["_job"] = str(e)
+        finally:
+            with job.lock:
+                job.finished_at = datetime.utcnow().isoformat()
+        return job
+
+
+class IngestJobManager:
+    """Runs BatchIngestor jobs in background threads and keeps their status for polling until evicted."""
+
+    def __init__(self, ingestor: BatchIngestor, max_concurrent_jobs: int = 1, jobs: Optional[JobRegistry] = None):
+        self.ingestor = ingestor
+        self.jobs = jobs if jobs is not None else JobRegistry()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_jobs, thread_name_prefix="ingest-job")
+
+    def submit(self, video_ids: List[str], metadata: Optional[Dict] = None, max_retries: int = 2) -> IngestJob:
+        job = IngestJob(video_ids)
+        self.jobs.add(job)
+        self._executor.submit(self.ingestor.run, job, metadata, max_retries)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        return self.jobs.get(job_id)
@@ -0,0 +1,88 @@
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+import time
+import uuid
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Tuple
+
+INGEST_STORE_PATH = os.getenv("INGEST_STORE_PATH", "ingest_store.sqlite3")
+# Fixed namespace so the same video chunk always maps to the same Qdrant point id
+POINT_ID_NAMESPACE = uuid.UUID("6f1c1f0e-7f53-4a5e-9a8e-2f6d3c1b9a47")
+
+
+def youtube_point_id(video_id: str, chunk_index: int) -> str:
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"youtube:{video_id}:{chunk_index}"))
+
+
+def embedding_key(model_name: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}\0{text}".encode()).hexdigest()
+
+
+class IngestStore:
+    """
+    Local content-addressed store for ingestion work that is expensive to redo:
+    raw transcripts by video_id and embeddings by hash(model name, text).
+    """
+
+    def __init__(self, path: str = INGEST_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS transcripts ("
+                "video_id TEXT PRIMARY KEY, segments TEXT, metadata TEXT, fetched_at REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, dim INTEGER, vector BLOB)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_transcript(self, video_id: str) -> Optional[List[Dict]]:
+        row = self._conn().execute("SELECT segments FROM transcripts WHERE video_id = ?", (video_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_transcript(self, video_id: str, segments: List[Dict], metadata: Optional[Dict] = None) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO transcripts VALUES (?, ?, ?, ?)",
+                (video_id, json.dumps(segments, ensure_ascii=False), json.dumps(metadata or {}), time.time()),
+            )
+
+    def iter_transcripts(self) -> Iterator[Tuple[str, List[Dict], Dict]]:
+        # Read ids up front so callers can write to the store while iterating
+        conn = self._conn()
+        video_ids = [row[0] for row in conn.execute("SELECT video_id FROM transcripts ORDER BY video_id")]
+        for video_id in video_ids:
+            segments, metadata = conn.execute(
+                "SELECT segments, metadata FROM transcripts WHERE video_id = ?", (video_id,)
+            ).fetchone()
+            yield video_id, json.loads(segments), json.loads(metadata or "{}")
+
+    def get_embeddings(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        conn = self._conn()
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            for key, blob in conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch):
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_embeddings(self, items: Dict[str, np.ndarray]) -> None:
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                [(key, len(vector), np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()],
+            )
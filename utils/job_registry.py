@@ -0,0 +1,49 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Optional
+
+# Finished background jobs stay pollable this long, and at most this many are kept
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+JOB_MAX_RETAINED = int(os.getenv("JOB_MAX_RETAINED", "200"))
+
+
+class JobRegistry:
+    """
+    Background jobs by id, for status polling. Finished jobs (``finished_at`` set) are
+    evicted once older than ``retention_seconds`` and, oldest first, while more than
+    ``max_retained`` jobs are held. Running jobs are never evicted.
+    """
+
+    def __init__(self, retention_seconds: float = JOB_RETENTION_SECONDS, max_retained: int = JOB_MAX_RETAINED):
+        self.retention_seconds = retention_seconds
+        self.max_retained = max_retained
+        self._jobs: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, job: Any) -> None:
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune()
+
+    def get(self, job_id: str) -> Optional[Any]:
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def _prune(self) -> None:
+        now = datetime.utcnow()
+        finished = [(job_id, job.finished_at) for job_id, job in self._jobs.items() if job.finished_at]
+        for job_id, finished_at in finished:
+            if (now - datetime.fromisoformat(finished_at)).total_seconds() > self.retention_seconds:
+                del self._jobs[job_id]
+        excess = len(self._jobs) - self.max_retained
+        for job_id, _ in sorted(finished, key=lambda item: item[1]):
+            if excess <= 0:
+                break
+            if self._jobs.pop(job_id, None) is not None:
+                excess -= 1
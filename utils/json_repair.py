@@ -0,0 +1,116 @@
+import json
+from typing import List, Optional, Tuple
+
+MAX_REPAIR_ATTEMPTS = 50
+
+
+def extract_json_text(text: str) -> str:
+    """Strip markdown fences and any prose before the first '{' or after the matching end."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else text[3:]
+    if text.rstrip().endswith("```"):
+        text = text.rstrip()[:-3]
+    start = min((i for i in (text.find("{"), text.find("[")) if i >= 0), default=-1)
+    return text[start:].strip() if start >= 0 else text.strip()
+
+
+def _scan(text: str) -> Tuple[str, List[Tuple[int, str]], bool, List[str]]:
+    """
+    One pass that tracks strings and brackets: drops trailing commas outside strings and
+    records the offsets (in the returned text) right after each complete value, paired with
+    the closers needed at that point. Also returns whether the text ends inside a string,
+    and the brackets still open at the end.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    cuts: List[Tuple[int, str]] = []
+    in_string = False
+    escape = False
+    string_is_key = False
+    expect_key = False
+    scalar = False
+
+    def closers() -> str:
+        return "".join("}" if c == "{" else "]" for c in reversed(stack))
+
+    for i, c in enumerate(text):
+        if in_string:
+            out.append(c)
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+                if not string_is_key:
+                    cuts.append((len(out), closers()))
+            continue
+        if scalar:
+            if c in ",]} \t\r\n":
+                scalar = False
+                cuts.append((len(out), closers()))
+            else:
+                out.append(c)
+                continue
+        if c == ",":
+            j = i + 1
+            while j < len(text) and text[j].isspace():
+                j += 1
+            if j < len(text) and text[j] in "}]":
+                continue
+            expect_key = bool(stack) and stack[-1] == "{"
+        out.append(c)
+        if c == '"':
+            in_string = True
+            string_is_key = bool(stack) and stack[-1] == "{" and expect_key
+        elif c in "{[":
+            stack.append(c)
+            expect_key = c == "{"
+        elif c in "}]":
+            if stack:
+                stack.pop()
+            cuts.append((len(out), closers()))
+        elif c == ":":
+            expect_key = False
+        elif c != "," and not c.isspace():
+            scalar = True
+    if scalar:
+        cuts.append((len(out), closers()))
+    return "".join(out), cuts, in_string, stack
+
+
+def _parses(text: str) -> bool:
+    try:
+        json.loads(text)
+        return True
+    except json.JSONDecodeError:
+        return False
+
+
+def repair_json(text: str) -> Optional[str]:
+    """
+    Best-effort fix for truncated or slightly malformed LLM JSON: drops trailing commas,
+    closes an unterminated string, and otherwise cuts back to the last complete value
+    and closes every open object/array. Text that already parses is returned unchanged.
+    Returns None when nothing parses.
+    """
+    text = extract_json_text(text)
+    if _parses(text):
+        return text
+
+    text, cuts, in_string, stack = _scan(text)
+    if _parses(text):
+        return text
+
+    # A long string cut off mid-way (e.g. max_tokens) is usually worth keeping
+    if in_string:
+        closed = text + '"' + "".join("}" if c == "{" else "]" for c in reversed(stack))
+        if _parses(closed):
+            return closed
+
+    for offset, closers in reversed(cuts[-MAX_REPAIR_ATTEMPTS:]):
+        candidate = text[:offset].rstrip().rstrip(",") + closers
+        if _parses(candidate):
+            return candidate
+    return None
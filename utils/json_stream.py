@@ -0,0 +1,139 @@
+import json
+from typing import Any, Iterable, List, Optional, Sequence, Tuple, Union
+
+PathPattern = Sequence[Union[str, int]]
+
+WHITESPACE = " \t\r\n"
+SCALAR_END = ",]}" + WHITESPACE
+
+
+class _Frame:
+    __slots__ = ("kind", "key", "index", "expect_key")
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.key: Optional[str] = None
+        self.index = 0
+        self.expect_key = kind == "obj"
+
+    @property
+    def path_part(self) -> Union[str, int, None]:
+        return self.key if self.kind == "obj" else self.index
+
+
+class IncrementalJSONParser:
+    """Streaming JSON scanner that emits selected values as soon as they close.
+
+    Feed it text chunks as they arrive; ``feed`` returns ``(path, value)`` for every
+    completed value whose path matches one of ``watch_paths``. A ``"*"`` in a
+    pattern matches any array index or object key, e.g. ``("trip_plan", "steps", "*")``
+    yields each step object the moment its closing brace arrives. Anything before
+    the first ``{`` or ``[`` (such as a ```json fence) is ignored.
+    """
+
+    def __init__(self, watch_paths: Iterable[PathPattern]):
+        self.watch_paths: List[Tuple] = [tuple(p) for p in watch_paths]
+        self.done = False
+        self._buffer = ""
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._string_is_key = False
+        self._string_start = 0
+        self._scalar_start: Optional[int] = None
+        # depth -> (path, start offset) of watched values still open
+        self._pending = {}
+
+    def _current_path(self) -> Tuple:
+        return tuple(frame.path_part for frame in self._stack)
+
+    def _matches(self, path: Tuple) -> bool:
+        for pattern in self.watch_paths:
+            if len(pattern) == len(path) and all(p == "*" or p == v for p, v in zip(pattern, path)):
+                return True
+        return False
+
+    def _value_begin(self, offset: int) -> None:
+        path = self._current_path()
+        if self._matches(path):
+            self._pending[len(self._stack)] = (path, offset)
+
+    def _value_end(self, offset: int, emitted: List[Tuple[Tuple, Any]]) -> None:
+        pending = self._pending.pop(len(self._stack), None)
+        if pending is not None:
+            path, start = pending
+            try:
+                emitted.append((path, json.loads(self._buffer[start:offset])))
+            except json.JSONDecodeError as e:
+                print(f"Skipping malformed streamed value at {path}: {e}")
+
+    def feed(self, chunk: str) -> List[Tuple[Tuple, Any]]:
+        emitted: List[Tuple[Tuple, Any]] = []
+        self._buffer += chunk
+        buffer = self._buffer
+
+        while self._pos < len(buffer) and not self.done:
+            i = self._pos
+            c = buffer[i]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._string_is_key:
+                        self._stack[-1].key = json.loads(buffer[self._string_start:i + 1])
+                    else:
+                        self._value_end(i + 1, emitted)
+                continue
+
+            if self._scalar_start is not None:
+                if c not in SCALAR_END:
+                    continue
+                self._scalar_start = None
+                self._value_end(i, emitted)
+
+            if not self._started:
+                if c not in "{[":
+                    continue
+                self._started = True
+
+            if c in WHITESPACE:
+                continue
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+                top = self._stack[-1] if self._stack else None
+                self._string_is_key = top is not None and top.kind == "obj" and top.expect_key
+                if not self._string_is_key:
+                    self._value_begin(i)
+            elif c in "{[":
+                self._value_begin(i)
+                self._stack.append(_Frame("obj" if c == "{" else "arr"))
+            elif c in "}]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                self._value_end(i + 1, emitted)
+                if not self._stack:
+                    self.done = True
+            elif c == ":":
+                if self._stack:
+                    self._stack[-1].expect_key = False
+            elif c == ",":
+                if self._stack:
+                    top = self._stack[-1]
+                    if top.kind == "obj":
+                        top.expect_key = True
+                    else:
+                        top.index += 1
+            else:
+                self._value_begin(i)
+                self._scalar_start = i
+
+        return emitted
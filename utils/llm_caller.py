@@ -1,16 +1,60 @@
 import os
+import time
 import asyncio
 import httpx
 from dotenv import load_dotenv
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator
 from dataclasses import dataclass
-from qdrant_client import QdrantClient
-from openai import OpenAI
-from sentence_transformers import SentenceTransformer
-from interface import PlanResponse, TripPlan, PlanStep, TransportInfo, RetrievedItem, PlanRequest
+from qdrant_client import AsyncQdrantClient
+from openai import AsyncOpenAI, BadRequestError
+from pydantic import ValidationError
+from utils.embedding_engine import get_embedding_engine
+from utils.embedding_batcher import get_embedding_batcher
+from utils.json_stream import IncrementalJSONParser
+from utils.response_cache import create_response_cache
+from utils.local_index import get_local_index, LOCAL_INDEX_MODE
+from utils.hybrid import hybrid_enabled, dense_query, hybrid_search_requests, rrf_fuse
+from utils.vector_storage import qdrant_client_kwargs, qdrant_url, search_params
+from utils.reranker import get_reranker, RERANK_ENABLED, RERANK_MAX_CANDIDATES
+from utils.geo import RetrievalFilter, retrieval_filter, resolve_place, RETRIEVAL_FILTER_MIN_RESULTS
+from utils.context_budget import assemble_context, compact_prompt
+from utils.transcript_chunker import estimate_tokens
+from utils.metrics import stage_timer, LLM_SECONDS, LLM_TTFT_SECONDS, LLM_TOKENS, PROMPT_CHARS
+from utils.json_repair import extract_json_text, repair_json
+from utils.llm_gateway import LLMGateway
+from utils.model_router import ModelRouter
+from interface import PlanResponse, TripPlan, PlanStep, TransportInfo, RetrievedItem, PlanRequest, TripPlanGeneration, PlanSkeleton, DaySkeleton
 import json 
 
 load_dotenv()
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "200"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "50"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+# json_schema (OpenAI response_format) | guided_json (vLLM extra_body) | off
+LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "json_schema")
+TRIP_PLAN_SCHEMA = TripPlanGeneration.model_json_schema()
+PLAN_SKELETON_SCHEMA = PlanSkeleton.model_json_schema()
+PLAN_STEP_SCHEMA = PlanStep.model_json_schema()
+# auto (per-day generation from PLAN_PARALLEL_MIN_DAYS days) | single (one completion) | parallel (always per-day)
+PLAN_MODE = os.getenv("PLAN_MODE", "auto")
+PLAN_PARALLEL_MIN_DAYS = int(os.getenv("PLAN_PARALLEL_MIN_DAYS", "4"))
+PLAN_DAY_CONTEXT_TOKEN_BUDGET = int(os.getenv("PLAN_DAY_CONTEXT_TOKEN_BUDGET", "600"))
+# Logged error messages are cut to this length; validation errors echo parts of the LLM output
+LOG_ERROR_MAX_CHARS = int(os.getenv("LOG_ERROR_MAX_CHARS", "300"))
+PLAN_STREAM_PATHS = [
+    ("tripOverview",),
+    ("trip_plan", "overview"),
+    ("trip_plan", "total_estimated_cost"),
+    ("trip_plan", "steps", "*"),
+]
+
+
+def brief_error(error: Exception, limit: int = LOG_ERROR_MAX_CHARS) -> str:
+    """``error`` as text, cut to ``limit`` characters for logging."""
+    text = str(error)
+    return text if len(text) <= limit else f"{text[:limit]}... ({len(text)} chars)"
+
+
 SYSTEM_PROMPT = """You are a helpful travel assistant. Use the provided context to answer the user's question about travel destinations and places.
 If the context doesn't contain relevant information, say so politely and provide general advice if possible."""
 '''
@@ -23,90 +67,313 @@ If the context doesn't contain relevant information, say so politely and provide
 #     score: float
 #     metadata: Dict[str, Any]
 
+
+# Words a 400 uses when the endpoint rejects the schema constraint itself (not e.g. the context length)
+STRUCTURED_OUTPUT_ERROR_TERMS = ("response_format", "json_schema", "guided", "structured output")
+
+
+def without_structured_output(request_options: Dict[str, Any]) -> Dict[str, Any]:
+    """``request_options`` minus the schema-constraint parameters added by plan_output_options."""
+    options = {key: value for key, value in request_options.items() if key != "response_format"}
+    extra_body = {key: value for key, value in options.pop("extra_body", {}).items() if not key.startswith("guided_")}
+    if extra_body:
+        options["extra_body"] = extra_body
+    return options
+
+
+def rejects_structured_output(error: Exception, request_options: Dict[str, Any]) -> bool:
+    """True when structured-output parameters were sent and the 400 is about them."""
+    if without_structured_output(request_options) == request_options:
+        return False
+    message = str(error).lower()
+    return any(term in message for term in STRUCTURED_OUTPUT_ERROR_TERMS)
+
+
+def prompt_chars(user_prompt: str, messages: Optional[List[Dict[str, str]]] = None) -> int:
+    """Prompt size the router sees: the whole conversation when ``messages`` is given."""
+    return sum(len(m["content"]) for m in messages) if messages else len(user_prompt)
+
+
 class LLMCaller:
     def __init__(self):
         # Environment variables
-        self.client = OpenAI(
+        # One pooled keep-alive HTTP client shared by every in-flight LLM call
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE,
+            ),
+            timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=10.0),
+        )
+        self.client = AsyncOpenAI(
                                 api_key=os.getenv("SEALION_API"),
                                 base_url=os.getenv("SEALION_BASE_URL"),
+                                http_client=self.http_client,
+                                # Retries, deadlines and backoff are owned by the gateway
+                                max_retries=0,
                             )
+        self.gateway = LLMGateway(self.client)
+        self.router = ModelRouter()
         self.top_k = 3
-        self.qdrant_host = os.getenv("QDRANT_HOST")
-        self.qdrant = QdrantClient(
-            url=f"http://{self.qdrant_host}:6333",
+        self.qdrant_url = qdrant_url()
+        self.qdrant = AsyncQdrantClient(
+            url=self.qdrant_url,
+            **qdrant_client_kwargs(self.qdrant_url),
         )
         self.system_prompt = SYSTEM_PROMPT
-        self.embedding_model = SentenceTransformer("BAAI/bge-m3")
+        self.embedding_model = get_embedding_engine()
+        self.embedding_batcher = get_embedding_batcher()
         self.collection_name = "demo_bge_m3"
+        self.response_cache = create_response_cache()
+        self.local_index = get_local_index(self.qdrant_url, self.collection_name)
+        self.reranker = get_reranker() if RERANK_ENABLED else None
+        # Flipped off the first time the endpoint rejects structured-output parameters
+        self.structured_output_supported = LLM_STRUCTURED_OUTPUT != "off"
     
-    async def basic_query(self, user_prompt: str, max_tokens: int = 1024, model: str = "aisingapore/Gemma-SEA-LION-v3-9B-IT") -> str:
-        
+    def plan_output_options(self, schema: Dict[str, Any] = TRIP_PLAN_SCHEMA, name: str = "trip_plan") -> Dict[str, Any]:
+        """
+        Extra chat.completions arguments that constrain the output to a JSON schema (TripPlanGeneration by default)
+        """
+        if not self.structured_output_supported:
+            return {}
+        if LLM_STRUCTURED_OUTPUT == "guided_json":
+            return {"extra_body": {"guided_json": schema}}
+        return {
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {"name": name, "schema": schema},
+            }
+        }
+
+    def _messages(self, user_prompt: str) -> List[Dict[str, str]]:
+        return [
+            {
+                "role": "system",
+                "content": self.system_prompt
+            },
+            {
+                "role": "user",
+                "content": user_prompt
+            }
+        ]
+
+    def _disable_structured_output(self, error: Exception) -> None:
+        # The endpoint does not understand structured output; fall back to prompt-only JSON
+        print(f"Structured output rejected by LLM endpoint, disabling it: {brief_error(error)}")
+        self.structured_output_supported = False
+
+    async def _create_completion(self, user_prompt: str, model: str, messages: Optional[List[Dict[str, str]]] = None, max_tokens: Optional[int] = None, **request_options):
+        messages = messages or self._messages(user_prompt)
         try:
-            completion = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": self.system_prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": user_prompt
-                    }
-                ]
+            return await self.gateway.complete(model, messages, max_tokens, **request_options)
+        except BadRequestError as e:
+            if not rejects_structured_output(e, request_options):
+                raise
+            self._disable_structured_output(e)
+            return await self.gateway.complete(model, messages, max_tokens, **without_structured_output(request_options))
+
+    async def _stream_chunks(self, user_prompt: str, model: str, messages: Optional[List[Dict[str, str]]] = None, max_tokens: Optional[int] = None, **request_options):
+        messages = messages or self._messages(user_prompt)
+        started = False
+        try:
+            async for chunk in self.gateway.stream(model, messages, max_tokens, **request_options):
+                started = True
+                yield chunk
+        except BadRequestError as e:
+            if started or not rejects_structured_output(e, request_options):
+                raise
+            self._disable_structured_output(e)
+            async for chunk in self.gateway.stream(model, messages, max_tokens, **without_structured_output(request_options)):
+                yield chunk
+
+    async def routed_query(self, user_prompt: str, endpoint: str = "chat", duration_days: Optional[int] = None, model: Optional[str] = None, messages: Optional[List[Dict[str, str]]] = None, max_tokens: Optional[int] = None, **request_options):
+        """
+        Complete the prompt on the model picked by the router (or ``model`` when given),
+        hedging onto a second model if configured. ``messages`` replaces the default
+        system + user pair (multi-turn chat); ``max_tokens`` caps the completion and is kept
+        apart from ``request_options`` (the structured-output parameters). Returns (content, model used).
+        """
+        decision = self.router.choose(endpoint, prompt_chars(user_prompt, messages), duration_days)
+        if model:
+            decision.model, decision.hedge_model = model, None
+        start = time.perf_counter()
+        try:
+            completion, used_model = await self.router.run(
+                decision, lambda m: self._create_completion(user_prompt, m, messages, max_tokens, **request_options)
             )
-            return completion.choices[0].message.content
-                
+        except Exception:
+            LLM_SECONDS.labels(decision.model, "error").observe(time.perf_counter() - start)
+            raise
+        LLM_SECONDS.labels(used_model, "success").observe(time.perf_counter() - start)
+        self._record_usage(used_model, completion.usage)
+        return completion.choices[0].message.content, used_model
+
+    async def basic_query(self, user_prompt: str, max_tokens: Optional[int] = None, model: Optional[str] = None, endpoint: str = "chat", duration_days: Optional[int] = None, messages: Optional[List[Dict[str, str]]] = None, **request_options) -> str:
+        try:
+            content, _ = await self.routed_query(user_prompt, endpoint, duration_days, model, messages, max_tokens, **request_options)
+            return content
+
         except Exception as e:
             print(f"Error calling LLM: {e}")
             return f"Error: Unable to get LLM response - {str(e)}"
     
-    async def query_with_rag(self, plan_request: PlanRequest, collection_name: Optional[str] = None) -> 'PlanResponse':
+    async def basic_query_stream(self, user_prompt: str, max_tokens: Optional[int] = None, model: Optional[str] = None, endpoint: str = "chat", duration_days: Optional[int] = None, messages: Optional[List[Dict[str, str]]] = None, **request_options) -> AsyncIterator[str]:
         """
-        Perform RAG query using PlanRequest, embed query, search Qdrant, and generate complete PlanResponse via LLM
+        Same request as basic_query, but yields content deltas as the completion streams in.
+        The model is routed the same way; streams are not hedged.
         """
-        print(plan_request)
+        model = model or self.router.choose(endpoint, prompt_chars(user_prompt, messages), duration_days).model
+        start = time.perf_counter()
+        first_token = True
         try:
-            # 1. Create query string from PlanRequest
-            query_text = f"Trip from {plan_request.start_place} to {plan_request.destination_place}"
-            if plan_request.trip_context:
-                query_text += f" for {plan_request.trip_context}"
-            if plan_request.trip_duration_days:
-                query_text += f" for {plan_request.trip_duration_days} days"
-            if plan_request.trip_price:
-                query_text += f" with budget {plan_request.trip_price}"
-            
-            # 2. Generate embedding for the query
-            query_embedding = self.embedding_model.encode(query_text, normalize_embeddings=True).tolist()
-            
-            # 3. Search Qdrant for similar content
-            collection = collection_name or self.collection_name
-            top_k = plan_request.top_k or self.top_k
-            
-            search_results = self.qdrant.search(
-                collection_name=collection,
-                query_vector=query_embedding,
-                limit=top_k,
-                with_payload=True
+            async for chunk in self._stream_chunks(user_prompt, model, messages, max_tokens, **request_options):
+                if getattr(chunk, "usage", None):
+                    self._record_usage(model, chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first_token:
+                        LLM_TTFT_SECONDS.labels(model).observe(time.perf_counter() - start)
+                        first_token = False
+                    yield chunk.choices[0].delta.content
+        except Exception:
+            self.router.record(model, time.perf_counter() - start, ok=False)
+            raise
+        self.router.record(model, time.perf_counter() - start)
+        LLM_SECONDS.labels(model, "success").observe(time.perf_counter() - start)
+
+    @staticmethod
+    def _record_usage(model: str, usage) -> None:
+        if usage is None:
+            return
+        LLM_TOKENS.labels(model, "prompt").inc(usage.prompt_tokens or 0)
+        LLM_TOKENS.labels(model, "completion").inc(usage.completion_tokens or 0)
+
+    def build_query_text(self, plan_request: PlanRequest) -> str:
+        query_text = f"Trip from {plan_request.start_place} to {plan_request.destination_place}"
+        if plan_request.trip_context:
+            query_text += f" for {plan_request.trip_context}"
+        if plan_request.trip_duration_days:
+            query_text += f" for {plan_request.trip_duration_days} days"
+        if plan_request.trip_price:
+            query_text += f" with budget {plan_request.trip_price}"
+        return query_text
+
+    async def retrieve_context(self, plan_request: PlanRequest, query_text: str, collection_name: Optional[str] = None, query_embedding: Optional[List[float]] = None, query_sparse: Optional[Dict[int, float]] = None, budget_tokens: Optional[int] = None, place: Optional[str] = None):
+        """
+        Retrieval for a trip plan: pre-filtered to the destination (or ``place``, e.g. one
+        day's stop) and the requested language. Returns (retrieved_data, context_text, context_stats)
+        """
+        query_filter = retrieval_filter(place or plan_request.destination_place, plan_request.language, plan_request.search_radius_km)
+        return await self.retrieve(
+            query_text, plan_request.top_k or self.top_k, query_filter, collection_name,
+            query_embedding, query_sparse, budget_tokens,
+        )
+
+    async def retrieve(self, query_text: str, top_k: int, query_filter: Optional[RetrievalFilter] = None, collection_name: Optional[str] = None, query_embedding: Optional[List[float]] = None, query_sparse: Optional[Dict[int, float]] = None, budget_tokens: Optional[int] = None):
+        """
+        Embed the query (unless already embedded), search Qdrant with the optional pre-filter,
+        rerank the candidates when RERANK_ENABLED, fit the hits into the prompt budget and
+        return (retrieved_data, context_text, context_stats)
+        """
+        if query_embedding is None:
+            with stage_timer("encode"):
+                query_embedding, query_sparse = await self.embedding_batcher.encode_hybrid(query_text)
+
+        collection = collection_name or self.collection_name
+        # The reranker picks top_k out of a deeper candidate list
+        fetch_k = max(top_k, RERANK_MAX_CANDIDATES) if self.reranker else top_k
+
+        with stage_timer("vector_search"):
+            search_results = await self.search_vectors(collection, query_embedding, fetch_k, query_sparse, query_filter)
+            filter_applied = query_filter is not None
+            if filter_applied and len(search_results) < RETRIEVAL_FILTER_MIN_RESULTS:
+                # Destination not covered by the corpus (or untagged points): fall back to plain similarity
+                search_results = await self.search_vectors(collection, query_embedding, fetch_k, query_sparse)
+                filter_applied = False
+
+        rerank_stats = None
+        ranked = [(result, None) for result in search_results[:top_k]]
+        if self.reranker and search_results:
+            with stage_timer("rerank"):
+                try:
+                    ranked, rerank_stats = await self.reranker.rerank(
+                        query_text, list(search_results), top_k,
+                        text_of=lambda result: result.payload.get("text", ""),
+                        score_of=lambda result: result.score,
+                    )
+                except Exception as e:
+                    print(f"Rerank failed, using first-stage order: {e}")
+                    rerank_stats = {"error": str(e)}
+
+        retrieved_data = []
+
+        for result, rerank_score in ranked:
+            retrieved_item = RetrievedItem(
+                place_id=str(result.id),
+                place_name=result.payload.get("place_name", "Unknown"),
+                description=result.payload.get("text", ""),
+                score=result.score if rerank_score is None else rerank_score,
+                metadata=result.payload
             )
-            
-            # 4. Convert search results to RetrievedItem format
-            retrieved_data = []
-            context_text = ""
-            
-            for result in search_results:
-                retrieved_item = RetrievedItem(
-                    place_id=str(result.id),
-                    place_name=result.payload.get("place_name", "Unknown"),
-                    description=result.payload.get("text", ""),
-                    score=result.score,
-                    metadata=result.payload
+            retrieved_data.append(retrieved_item)
+
+        with stage_timer("context_assembly"):
+            context_text, context_stats = await assemble_context(
+                [item.description or "" for item in retrieved_data],
+                query_text,
+                query_embedding,
+                self.embedding_batcher,
+                **({"budget_tokens": budget_tokens} if budget_tokens else {}),
+            )
+        context_stats["filter"] = {
+            "destination": query_filter.place.name if query_filter and query_filter.place else None,
+            "language": query_filter.language if query_filter else None,
+            "applied": filter_applied,
+        }
+        if rerank_stats is not None:
+            context_stats["rerank"] = rerank_stats
+
+        return retrieved_data, context_text, context_stats
+
+    async def search_vectors(self, collection: str, query_embedding: List[float], limit: int, query_sparse: Optional[Dict[int, float]] = None, query_filter: Optional[RetrievalFilter] = None):
+        """
+        Vector search against Qdrant (dense, or dense + sparse fused with RRF in hybrid mode),
+        or the in-process index when LOCAL_INDEX_MODE allows it. ``query_filter`` is applied
+        as a Qdrant payload pre-filter, so only matching points are scored.
+        """
+        where = query_filter.matches if query_filter else None
+        qdrant_filter = query_filter.to_qdrant() if query_filter else None
+        use_local = (
+            self.local_index is not None
+            and self.local_index.ready
+            and collection == self.local_index.collection_name
+        )
+        if use_local and LOCAL_INDEX_MODE == "primary":
+            return self.local_index.search(query_embedding, limit, where)
+        try:
+            if hybrid_enabled() and query_sparse is not None:
+                return rrf_fuse(
+                    await self.qdrant.search_batch(
+                        collection_name=collection,
+                        requests=hybrid_search_requests(query_embedding, query_sparse, limit, qdrant_filter)
+                    ),
+                    limit
                 )
-                retrieved_data.append(retrieved_item)
-                context_text += f"\n{result.payload.get('text', '')}"
-            
-            # 5. Create detailed prompt for LLM to generate structured response
-            llm_prompt = f"""
+            return await self.qdrant.search(
+                collection_name=collection,
+                query_vector=dense_query(query_embedding),
+                query_filter=qdrant_filter,
+                limit=limit,
+                with_payload=True,
+                search_params=search_params()
+            )
+        except Exception as e:
+            if not use_local:
+                raise
+            print(f"Qdrant search failed, answering from local index: {e}")
+            return self.local_index.search(query_embedding, limit, where)
+
+    def build_plan_prompt(self, plan_request: PlanRequest, context_text: str) -> str:
+        return compact_prompt(f"""
             You are a travel planning assistant. Based on the trip request and travel context provided, generate a comprehensive trip plan in the exact JSON format specified below.
 
             Trip Request:
@@ -151,94 +418,421 @@ class LLMCaller:
             Ensure the JSON is valid and well-structured.
 
             Create {plan_request.trip_duration_days or 1} days of detailed activities. Include realistic prices, coordinates, and practical tips. Make it specific to the destinations and context provided.
-            """
-            
-            # 6. Call LLM to generate structured trip plan
-            llm_response = await self.basic_query(user_prompt=llm_prompt, max_tokens=12048)
-            
-            # 7. Parse LLM response as JSON
+            """)
+
+    @staticmethod
+    def to_plan_step(step: Dict[str, Any]) -> PlanStep:
+        transport_data = step.get("transport") or {}
+        transport = TransportInfo(
+            mode=transport_data.get("mode"),
+            departure=transport_data.get("departure"),
+            arrival=transport_data.get("arrival"),
+            duration_minutes=transport_data.get("duration_minutes"),
+            price=transport_data.get("price"),
+            details=transport_data.get("details")
+        )
+
+        return PlanStep(
+            day=step.get("day"),
+            title=step.get("title"),
+            description=step.get("description"),
+            transport=transport,
+            map_coordinates=step.get("map_coordinates", {}),
+            images=step.get("images", []),
+            tips=step.get("tips", [])
+        )
+
+    @staticmethod
+    def validate_llm_json(model_cls, llm_response: str):
+        """
+        One validating pass on pydantic-core's JSON parser; repair truncated/broken output
+        before giving up. Returns (instance, repaired) or raises ValidationError.
+        """
+        json_str = extract_json_text(llm_response)
+        try:
+            return model_cls.model_validate_json(json_str), False
+        except ValidationError as first_error:
+            fixed = repair_json(json_str)
+            if fixed is None:
+                raise first_error
+            instance = model_cls.model_validate_json(fixed)
+            print("Recovered LLM JSON response with repair pass")
+            return instance, True
+
+    def parse_plan_response(self, llm_response: str, plan_request: PlanRequest, retrieved_data: List[RetrievedItem], query_text: str) -> PlanResponse:
+        try:
+            generation, repaired = self.validate_llm_json(TripPlanGeneration, llm_response)
+        except ValidationError as e:
+            print(f"Error parsing LLM JSON response ({len(llm_response)} chars): {brief_error(e)}")
+
+            # Fallback: create basic response with LLM text
+            return PlanResponse(
+                tripOverview=llm_response,
+                query_params=plan_request,
+                retrieved_data=retrieved_data,
+                trip_plan=TripPlan(
+                    overview="Generated plan (parsing error)",
+                    total_estimated_cost=plan_request.trip_price,
+                    steps=[]
+                ),
+                meta={"status": "json_parse_error", "error": str(e)}
+            )
+
+        return PlanResponse(
+            tripOverview=generation.tripOverview,
+            query_params=plan_request,
+            retrieved_data=retrieved_data,
+            trip_plan=generation.trip_plan,
+            meta={
+                "status": "success",
+                "query_text": query_text,
+                "results_count": len(retrieved_data),
+                "repaired": repaired
+            }
+        )
+
+    def error_response(self, plan_request: PlanRequest, error: Exception) -> PlanResponse:
+        return PlanResponse(
+            tripOverview=f"Error generating trip plan: {str(error)}",
+            query_params=plan_request,
+            retrieved_data=[],
+            trip_plan=TripPlan(overview="Error occurred", total_estimated_cost=0.0, steps=[]),
+            meta={"status": "error", "error": str(error)}
+        )
+
+    def _from_cache(self, cached: PlanResponse, plan_request: PlanRequest, tier: str, similarity: Optional[float] = None) -> PlanResponse:
+        cache_meta = {"hit": tier, **self.response_cache.stats()}
+        if similarity is not None:
+            cache_meta["similarity"] = round(similarity, 4)
+        return cached.model_copy(update={
+            "query_params": plan_request,
+            "meta": {**cached.meta, "cache": cache_meta},
+        })
+
+    def use_parallel_plan(self, plan_request: PlanRequest) -> bool:
+        days = plan_request.trip_duration_days or 1
+        if PLAN_MODE == "parallel":
+            return days > 1
+        if PLAN_MODE == "single":
+            return False
+        return days >= PLAN_PARALLEL_MIN_DAYS
+
+    def build_skeleton_prompt(self, plan_request: PlanRequest, context_text: str) -> str:
+        return compact_prompt(f"""
+            You are a travel planning assistant. Outline a {plan_request.trip_duration_days}-day trip; the details of each day are written separately later.
+
+            Trip Request:
+            - From: {plan_request.start_place}
+            - To: {plan_request.destination_place}
+            - Duration: {plan_request.trip_duration_days} days
+            - Budget: {plan_request.trip_price}
+            - Context: {plan_request.trip_context}
+            - Group Size: {plan_request.group_size}
+            - Preferences: {plan_request.preferences}
+
+            Relevant Travel Context:
+            {context_text}
+
+            Generate a response in this EXACT JSON format (no additional text before or after):
+            {{
+                "tripOverview": "A comprehensive 2-3 paragraph overview of the entire trip",
+                "overview": "Brief summary of the trip plan",
+                "total_estimated_cost": estimated_total_cost_as_number,
+                "days": [
+                    {{"day": 1, "title": "Day 1 title", "focus": "One sentence on what day 1 covers", "location": "main area or city of day 1"}}
+                ]
+            }}
+            Include exactly {plan_request.trip_duration_days} entries in "days". Keep every entry to one line.
+            """)
+
+    def build_day_prompt(self, plan_request: PlanRequest, skeleton: PlanSkeleton, day: DaySkeleton, context_text: str) -> str:
+        outline = "\n".join(f"- Day {d.day}: {d.title}" for d in skeleton.days)
+        return compact_prompt(f"""
+            You are a travel planning assistant writing one day of a {plan_request.trip_duration_days}-day trip from {plan_request.start_place} to {plan_request.destination_place}.
+            Budget for the whole trip: {plan_request.trip_price}. Group Size: {plan_request.group_size}. Preferences: {plan_request.preferences}
+
+            Trip outline:
+            {outline}
+
+            Write Day {day.day}: {day.title}
+            Focus: {day.focus}
+            Location: {day.location or plan_request.destination_place}
+
+            Relevant Travel Context:
+            {context_text}
+
+            Generate a response in this EXACT JSON format (no additional text before or after):
+            {{
+                "day": {day.day},
+                "title": "Day {day.day} title",
+                "description": "Detailed description of the day's activities",
+                "transport": {{
+                    "mode": "transportation method",
+                    "departure": "departure location",
+                    "arrival": "arrival location",
+                    "duration_minutes": estimated_duration_in_minutes,
+                    "price": estimated_price,
+                    "details": "additional transport details"
+                }},
+                "map_coordinates": {{"lat": latitude_number, "lon": longitude_number}},
+                "images": ["url1", "url2"],
+                "tips": ["tip1", "tip2", "tip3"]
+            }}
+            Include realistic prices, coordinates, and practical tips.
+            """)
+
+    async def generate_skeleton(self, plan_request: PlanRequest, context_text: str) -> Optional[PlanSkeleton]:
+        """
+        Short first call of per-day planning. Returns None when the outline can't be used,
+        so the caller can fall back to single-call generation
+        """
+        prompt = self.build_skeleton_prompt(plan_request, context_text)
+        PROMPT_CHARS.labels("planSkeleton").observe(len(prompt))
+        try:
+            response, _ = await self.routed_query(
+                prompt, "plan", 1, **self.plan_output_options(PLAN_SKELETON_SCHEMA, "plan_skeleton")
+            )
+            skeleton, _ = self.validate_llm_json(PlanSkeleton, response)
+        except Exception as e:
+            print(f"Error generating plan skeleton: {brief_error(e)}")
+            return None
+
+        days = plan_request.trip_duration_days or 1
+        by_day = {d.day: d for d in skeleton.days if 1 <= d.day <= days}
+        if not by_day:
+            return None
+        skeleton.days = [by_day.get(i) or DaySkeleton(day=i, title=f"Day {i}") for i in range(1, days + 1)]
+        return skeleton
+
+    async def generate_day(self, plan_request: PlanRequest, skeleton: PlanSkeleton, day: DaySkeleton, collection_name: Optional[str] = None):
+        """
+        Retrieve context for one day of the outline and write its PlanStep.
+        Returns (step, retrieved_data, ok)
+        """
+        query_text = f"{day.title} {day.focus} in {day.location or plan_request.destination_place}"
+        try:
+            retrieved_data, context_text, _ = await self.retrieve_context(
+                plan_request, query_text, collection_name, budget_tokens=PLAN_DAY_CONTEXT_TOKEN_BUDGET,
+                # Days that stop somewhere known are filtered to that stop instead of the trip destination
+                place=day.location if resolve_place(day.location) else None,
+            )
+        except Exception as e:
+            print(f"Error retrieving context for day {day.day}: {brief_error(e)}")
+            retrieved_data, context_text = [], ""
+
+        prompt = self.build_day_prompt(plan_request, skeleton, day, context_text)
+        PROMPT_CHARS.labels("planDay").observe(len(prompt))
+        try:
+            response, _ = await self.routed_query(
+                prompt, "plan", 1, **self.plan_output_options(PLAN_STEP_SCHEMA, "plan_step")
+            )
+            step, _ = self.validate_llm_json(PlanStep, response)
+            step.day = day.day
+            step.title = step.title or day.title
+            return step, retrieved_data, True
+        except Exception as e:
+            print(f"Error generating day {day.day}: {brief_error(e)}")
+            return PlanStep(day=day.day, title=day.title, description=day.focus), retrieved_data, False
+
+    async def generate_days(self, plan_request: PlanRequest, skeleton: PlanSkeleton, collection_name: Optional[str] = None):
+        """Run every day concurrently and yield (step, retrieved_data, ok) as each one finishes."""
+        tasks = [
+            asyncio.ensure_future(self.generate_day(plan_request, skeleton, day, collection_name))
+            for day in skeleton.days
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def merge_plan(self, plan_request: PlanRequest, skeleton: PlanSkeleton, steps: List[PlanStep], retrieved_data: List[RetrievedItem], query_text: str, failed_days: List[int]) -> PlanResponse:
+        seen = set()
+        merged_retrieved = []
+        for item in retrieved_data:
+            if item.place_id not in seen:
+                seen.add(item.place_id)
+                merged_retrieved.append(item)
+
+        return PlanResponse(
+            tripOverview=skeleton.tripOverview,
+            query_params=plan_request,
+            retrieved_data=merged_retrieved,
+            trip_plan=TripPlan(
+                overview=skeleton.overview,
+                total_estimated_cost=skeleton.total_estimated_cost,
+                steps=sorted(steps, key=lambda step: step.day or 0)
+            ),
+            meta={
+                "status": "success" if not failed_days else "partial",
+                "query_text": query_text,
+                "results_count": len(merged_retrieved),
+                "plan_mode": "parallel",
+                "failed_days": failed_days
+            }
+        )
+
+    async def generate_plan_parallel(self, plan_request: PlanRequest, query_text: str, retrieved_data: List[RetrievedItem], context_text: str, collection_name: Optional[str] = None) -> Optional[PlanResponse]:
+        """
+        Map-reduce planning: outline first, then one concurrent call per day.
+        Returns None if the outline failed and single-call generation should be used instead
+        """
+        with stage_timer("plan_skeleton"):
+            skeleton = await self.generate_skeleton(plan_request, context_text)
+        if skeleton is None:
+            return None
+
+        steps, day_retrieved, failed_days = [], [], []
+        with stage_timer("plan_days"):
+            async for step, day_items, ok in self.generate_days(plan_request, skeleton, collection_name):
+                steps.append(step)
+                day_retrieved.extend(day_items)
+                if not ok:
+                    failed_days.append(step.day)
+        return self.merge_plan(plan_request, skeleton, steps, retrieved_data + day_retrieved, query_text, sorted(failed_days))
+
+    def _cache_response(self, plan_request: PlanRequest, query_embedding: List[float], plan_response: PlanResponse) -> PlanResponse:
+        if self.response_cache:
+            if plan_response.meta.get("status") == "success":
+                self.response_cache.put(plan_request, query_embedding, plan_response)
+            plan_response.meta["cache"] = {"hit": None, **self.response_cache.stats()}
+        return plan_response
+
+    async def generate_from_context(self, plan_request: PlanRequest, query_text: str, query_embedding: List[float], retrieved_data: List[RetrievedItem], context_text: str, context_stats: Dict[str, Any], collection_name: Optional[str] = None, cache: bool = True) -> PlanResponse:
+        """
+        LLM half of query_with_rag: write the plan from already retrieved context (one call,
+        or outline + per-day calls for long trips) and, with ``cache``, store it in the response cache
+        """
+        # 5-7. Long trips: outline plus one concurrent call per day
+        plan_response = None
+        if self.use_parallel_plan(plan_request):
+            plan_response = await self.generate_plan_parallel(plan_request, query_text, retrieved_data, context_text, collection_name)
+        if plan_response is not None:
+            plan_response.meta["context"] = context_stats
+            return self._cache_response(plan_request, query_embedding, plan_response) if cache else plan_response
+
+        # 5. Create detailed prompt for LLM to generate structured response
+        with stage_timer("prompt_assembly"):
+            llm_prompt = self.build_plan_prompt(plan_request, context_text)
+        PROMPT_CHARS.labels("generateTripPlan").observe(len(llm_prompt))
+
+        # 6. Call LLM to generate structured trip plan on the routed model
+        with stage_timer("llm"):
             try:
-                # Clean the response and parse JSON
-                json_str = llm_response.strip()
-                if json_str.startswith("```json"):
-                    json_str = json_str[7:]
-                if json_str.endswith("```"):
-                    json_str = json_str[:-3]
-                
-                llm_data = json.loads(json_str)
-                
-                # Convert to PlanResponse structure
-                trip_plan_data = llm_data.get("trip_plan", {})
-                steps_data = trip_plan_data.get("steps", [])
-                
-                # Convert steps to PlanStep objects
-                plan_steps = []
-                for step in steps_data:
-                    transport_data = step.get("transport", {})
-                    transport = TransportInfo(
-                        mode=transport_data.get("mode"),
-                        departure=transport_data.get("departure"),
-                        arrival=transport_data.get("arrival"),
-                        duration_minutes=transport_data.get("duration_minutes"),
-                        price=transport_data.get("price"),
-                        details=transport_data.get("details")
-                    )
-                    
-                    plan_step = PlanStep(
-                        day=step.get("day"),
-                        title=step.get("title"),
-                        description=step.get("description"),
-                        transport=transport,
-                        map_coordinates=step.get("map_coordinates", {}),
-                        images=step.get("images", []),
-                        tips=step.get("tips", [])
-                    )
-                    plan_steps.append(plan_step)
-                
-                trip_plan = TripPlan(
-                    overview=trip_plan_data.get("overview", ""),
-                    total_estimated_cost=trip_plan_data.get("total_estimated_cost"),
-                    steps=plan_steps
-                )
-                
-                return PlanResponse(
-                    tripOverview=llm_data.get("tripOverview", ""),
-                    query_params=plan_request,
-                    retrieved_data=retrieved_data,
-                    trip_plan=trip_plan,
-                    meta={
-                        "status": "success",
-                        "query_text": query_text,
-                        "results_count": len(retrieved_data)
-                    }
-                )
-                
-            except json.JSONDecodeError as e:
-                print(f"Error parsing LLM JSON response: {e}")
-                print(f"LLM Response: {llm_response}")
-                
-                # Fallback: create basic response with LLM text
-                return PlanResponse(
-                    tripOverview=llm_response,
-                    query_params=plan_request,
-                    retrieved_data=retrieved_data,
-                    trip_plan=TripPlan(
-                        overview="Generated plan (parsing error)",
-                        total_estimated_cost=plan_request.trip_price,
-                        steps=[]
-                    ),
-                    meta={"status": "json_parse_error", "error": str(e)}
+                llm_response, model = await self.routed_query(
+                    llm_prompt, "plan", plan_request.trip_duration_days, **self.plan_output_options()
                 )
-            
+            except Exception as e:
+                print(f"Error calling LLM: {e}")
+                llm_response, model = f"Error: Unable to get LLM response - {str(e)}", None
+
+        # 7. Parse LLM response as JSON
+        with stage_timer("parse"):
+            plan_response = self.parse_plan_response(llm_response, plan_request, retrieved_data, query_text)
+        plan_response.meta["context"] = {**context_stats, "prompt_tokens_estimate": estimate_tokens(llm_prompt)}
+        plan_response.meta["model"] = model
+        return self._cache_response(plan_request, query_embedding, plan_response) if cache else plan_response
+
+    async def query_with_rag(self, plan_request: PlanRequest, collection_name: Optional[str] = None) -> 'PlanResponse':
+        """
+        Perform RAG query using PlanRequest, embed query, search Qdrant, and generate complete PlanResponse via LLM
+        """
+        try:
+            # 0. Exact-match cache on the normalized request
+            if self.response_cache:
+                cached = self.response_cache.get_exact(plan_request)
+                if cached:
+                    return self._from_cache(cached, plan_request, "exact")
+
+            # 1. Create query string from PlanRequest
+            with stage_timer("query_build"):
+                query_text = self.build_query_text(plan_request)
+
+            # 2. Generate embedding for the query, then try the semantic cache tier
+            with stage_timer("encode"):
+                query_embedding, query_sparse = await self.embedding_batcher.encode_hybrid(query_text)
+            if self.response_cache:
+                cached, similarity = self.response_cache.get_semantic(plan_request, query_embedding)
+                if cached:
+                    return self._from_cache(cached, plan_request, "semantic", similarity)
+
+            # 3-4. Search Qdrant and collect the context
+            retrieved_data, context_text, context_stats = await self.retrieve_context(plan_request, query_text, collection_name, query_embedding, query_sparse)
+
+            # 5-7. Generate the plan from the retrieved context
+            return await self.generate_from_context(plan_request, query_text, query_embedding, retrieved_data, context_text, context_stats, collection_name)
+
         except Exception as e:
             print(f"Error in RAG query: {e}")
-            return PlanResponse(
-                tripOverview=f"Error generating trip plan: {str(e)}",
-                query_params=plan_request,
-                retrieved_data=[],
-                trip_plan=TripPlan(overview="Error occurred", total_estimated_cost=0.0, steps=[]),
-                meta={"status": "error", "error": str(e)}
-            )
+            return self.error_response(plan_request, e)
+
+    async def stream_trip_plan(self, plan_request: PlanRequest, collection_name: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of query_with_rag. Yields events as soon as they are available:
+        retrieved -> tripOverview -> overview / total_estimated_cost -> step (one per day) -> complete
+        """
+        try:
+            query_text = self.build_query_text(plan_request)
+            retrieved_data, context_text, context_stats = await self.retrieve_context(plan_request, query_text, collection_name)
+            yield {"event": "retrieved", "data": [item.model_dump() for item in retrieved_data]}
+
+            skeleton = await self.generate_skeleton(plan_request, context_text) if self.use_parallel_plan(plan_request) else None
+            if skeleton is not None:
+                yield {"event": "tripOverview", "data": skeleton.tripOverview}
+                yield {"event": "overview", "data": skeleton.overview}
+                yield {"event": "total_estimated_cost", "data": skeleton.total_estimated_cost}
+                steps, day_retrieved, failed_days = [], [], []
+                async for step, day_items, ok in self.generate_days(plan_request, skeleton, collection_name):
+                    steps.append(step)
+                    day_retrieved.extend(day_items)
+                    if not ok:
+                        failed_days.append(step.day)
+                    yield {"event": "step", "data": step.model_dump()}
+                plan_response = self.merge_plan(plan_request, skeleton, steps, retrieved_data + day_retrieved, query_text, sorted(failed_days))
+                plan_response.meta["context"] = context_stats
+                yield {"event": "complete", "data": plan_response.model_dump()}
+                return
+
+            llm_prompt = self.build_plan_prompt(plan_request, context_text)
+            PROMPT_CHARS.labels("generateTripPlanStream").observe(len(llm_prompt))
+            parser = IncrementalJSONParser(PLAN_STREAM_PATHS)
+            chunks = []
+            skipped_steps = 0
+            model = self.router.choose("plan", len(llm_prompt), plan_request.trip_duration_days).model
+            async for delta in self.basic_query_stream(user_prompt=llm_prompt, model=model, **self.plan_output_options()):
+                chunks.append(delta)
+                for path, value in parser.feed(delta):
+                    if path[0] == "tripOverview":
+                        yield {"event": "tripOverview", "data": value}
+                    elif path[-1] in ("overview", "total_estimated_cost"):
+                        yield {"event": path[-1], "data": value}
+                    elif isinstance(value, dict):
+                        try:
+                            step = self.to_plan_step(value)
+                        except ValidationError as e:
+                            # One malformed step must not end the stream; later days still arrive
+                            print(f"Skipping malformed streamed plan step: {brief_error(e)}")
+                            skipped_steps += 1
+                            continue
+                        yield {"event": "step", "data": step.model_dump()}
+
+            plan_response = self.parse_plan_response("".join(chunks), plan_request, retrieved_data, query_text)
+            plan_response.meta["context"] = {**context_stats, "prompt_tokens_estimate": estimate_tokens(llm_prompt)}
+            plan_response.meta["model"] = model
+            if skipped_steps:
+                plan_response.meta["skipped_stream_steps"] = skipped_steps
+            yield {"event": "complete", "data": plan_response.model_dump()}
+
+        except Exception as e:
+            print(f"Error in streaming RAG query: {e}")
+            yield {"event": "error", "data": self.error_response(plan_request, e).model_dump()}
+
+    async def close(self):
+        await self.client.close()
+        await self.qdrant.close()
+        if self.reranker:
+            self.reranker.shutdown()
         
 #     async def query_qdrant(self, query_embedding: List[float], top_k: Optional[int] = None, collection_name: Optional[str] = None) -> List[RetrievedItem]:
 #         """
@@ -0,0 +1,210 @@
+import os
+import time
+import json
+import random
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, Dict, List, Optional
+import openai
+
+LLM_MAX_CONCURRENCY_PER_MODEL = int(os.getenv("LLM_MAX_CONCURRENCY_PER_MODEL", "32"))
+LLM_RATE_LIMIT_RPS = float(os.getenv("LLM_RATE_LIMIT_RPS", "0"))  # 0 disables the token bucket
+LLM_RATE_LIMIT_BURST = int(os.getenv("LLM_RATE_LIMIT_BURST", "10"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "8"))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "180"))
+LLM_COALESCE = os.getenv("LLM_COALESCE", "true").lower() in ("1", "true", "yes")
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,  # includes APITimeoutError
+    openai.InternalServerError,
+)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` requests per second with bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """Take one token, sleeping until one is available. Returns seconds waited."""
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class _CoalescedCall:
+    """One upstream completion and the number of callers currently awaiting it."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class LLMGateway:
+    """Admission control in front of the chat completions API.
+
+    Every call passes a per-model semaphore and an optional token bucket. Calls are retried
+    on 429/5xx/connection errors with full-jitter exponential backoff, and no attempt is
+    started after the call's deadline. Identical non-streaming requests that are in flight
+    together share one upstream generation.
+    """
+
+    def __init__(
+        self,
+        client: openai.AsyncOpenAI,
+        max_concurrency_per_model: int = LLM_MAX_CONCURRENCY_PER_MODEL,
+        rate_limit_rps: float = LLM_RATE_LIMIT_RPS,
+        rate_limit_burst: int = LLM_RATE_LIMIT_BURST,
+        max_retries: int = LLM_MAX_RETRIES,
+        retry_base_seconds: float = LLM_RETRY_BASE_SECONDS,
+        retry_max_seconds: float = LLM_RETRY_MAX_SECONDS,
+        deadline_seconds: float = LLM_DEADLINE_SECONDS,
+        coalesce: bool = LLM_COALESCE,
+    ):
+        self.client = client
+        self.max_concurrency_per_model = max_concurrency_per_model
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.deadline_seconds = deadline_seconds
+        self.coalesce = coalesce
+        self.bucket = TokenBucket(rate_limit_rps, rate_limit_burst) if rate_limit_rps > 0 else None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._active: Dict[str, int] = {}
+        self._inflight: Dict[str, _CoalescedCall] = {}
+        self.counters = {"requests": 0, "upstream_calls": 0, "coalesced": 0, "retries": 0, "failures": 0, "deadline_exceeded": 0}
+        self.rate_limited_seconds = 0.0
+
+    def _semaphore(self, model: str) -> asyncio.Semaphore:
+        if model not in self._semaphores:
+            self._semaphores[model] = asyncio.Semaphore(self.max_concurrency_per_model)
+            self._active[model] = 0
+        return self._semaphores[model]
+
+    @staticmethod
+    def _key(model: str, messages: List[Dict[str, Any]], options: Dict[str, Any]) -> str:
+        payload = json.dumps([model, messages, options], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.retry_max_seconds)
+        return random.uniform(0, min(self.retry_max_seconds, self.retry_base_seconds * 2 ** attempt))
+
+    async def _attempts(self, model: str, messages: List[Dict[str, Any]], stream: bool, options: Dict[str, Any]):
+        """Create the completion (or open the stream) under the model's semaphore, with retries."""
+        deadline = time.monotonic() + self.deadline_seconds
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.counters["deadline_exceeded"] += 1
+                raise DeadlineExceeded(f"LLM call to {model} exceeded {self.deadline_seconds}s deadline")
+            if self.bucket is not None:
+                self.rate_limited_seconds += await self.bucket.acquire()
+            try:
+                self.counters["upstream_calls"] += 1
+                return await self.client.chat.completions.create(
+                    model=model, messages=messages, stream=stream, timeout=remaining, **options
+                )
+            except RETRYABLE_ERRORS as e:
+                delay = self._backoff(attempt, e)
+                if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                    self.counters["failures"] += 1
+                    raise
+                attempt += 1
+                self.counters["retries"] += 1
+                print(f"LLM call to {model} failed ({type(e).__name__}), retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def _complete_uncoalesced(self, model: str, messages: List[Dict[str, Any]], options: Dict[str, Any]):
+        async with self._semaphore(model):
+            self._active[model] += 1
+            try:
+                return await self._attempts(model, messages, False, options)
+            finally:
+                self._active[model] -= 1
+
+    async def complete(self, model: str, messages: List[Dict[str, Any]], max_tokens: Optional[int] = None, **options):
+        """Non-streaming chat completion; concurrent identical requests share one upstream call."""
+        self.counters["requests"] += 1
+        if max_tokens is not None:
+            options["max_tokens"] = max_tokens
+        if not self.coalesce:
+            return await self._complete_uncoalesced(model, messages, options)
+
+        key = self._key(model, messages, options)
+        group = self._inflight.get(key)
+        if group is None:
+            task = asyncio.get_running_loop().create_task(self._complete_uncoalesced(model, messages, options))
+            group = self._inflight[key] = _CoalescedCall(task)
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.counters["coalesced"] += 1
+        group.waiters += 1
+        try:
+            # Shield so one caller disconnecting does not cancel the generation the others wait on
+            return await asyncio.shield(group.task)
+        finally:
+            group.waiters -= 1
+            # ...but once the last caller is gone (a cancelled hedge loser, a client that left)
+            # the upstream call is cancelled too, freeing its semaphore slot
+            if group.waiters == 0 and not group.task.done():
+                group.task.cancel()
+
+    async def stream(self, model: str, messages: List[Dict[str, Any]], max_tokens: Optional[int] = None, **options) -> AsyncIterator[Any]:
+        """Streaming chat completion. The semaphore is held until the stream is drained."""
+        self.counters["requests"] += 1
+        if max_tokens is not None:
+            options["max_tokens"] = max_tokens
+        async with self._semaphore(model):
+            self._active[model] += 1
+            try:
+                response = await self._attempts(model, messages, True, options)
+                async for chunk in response:
+                    yield chunk
+            finally:
+                self._active[model] -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "in_flight": dict(self._active),
+            "coalescing_groups": len(self._inflight),
+            "max_concurrency_per_model": self.max_concurrency_per_model,
+            "rate_limited_seconds": round(self.rate_limited_seconds, 3),
+        }
@@ -0,0 +1,215 @@
+import os
+import threading
+import time
+import numpy as np
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+from qdrant_client import QdrantClient
+from qdrant_client.models import FieldCondition, Filter, Range
+from utils.hybrid import dense_part
+from utils.vector_storage import qdrant_client_kwargs
+
+# off | fallback (use only when Qdrant fails) | primary (serve reads locally, Qdrant as fallback)
+LOCAL_INDEX_MODE = os.getenv("LOCAL_INDEX_MODE", "off")
+LOCAL_INDEX_ALGORITHM = os.getenv("LOCAL_INDEX_ALGORITHM", "exact")  # exact | hnsw
+LOCAL_INDEX_DTYPE = os.getenv("LOCAL_INDEX_DTYPE", "float32")  # float32 | float16
+LOCAL_INDEX_REFRESH_SECONDS = float(os.getenv("LOCAL_INDEX_REFRESH_SECONDS", "60"))
+# Every Nth refresh reloads the whole collection to pick up deletes and points without ingested_at
+LOCAL_INDEX_FULL_SYNC_EVERY = int(os.getenv("LOCAL_INDEX_FULL_SYNC_EVERY", "10"))
+SCROLL_PAGE_SIZE = 1024
+
+
+class LocalHit(NamedTuple):
+    """Same attributes the callers read from a Qdrant ScoredPoint."""
+    id: Any
+    score: float
+    payload: Dict[str, Any]
+
+
+class LocalVectorIndex:
+    """
+    In-RAM copy of a Qdrant collection for microsecond retrieval.
+
+    Vectors live in one contiguous matrix (float32 or float16) searched with a single
+    matrix-vector product, or in an hnswlib graph for larger sets. A snapshot is loaded
+    with scroll, and later refreshes pull only points whose ``ingested_at`` is newer
+    than the last one seen.
+    """
+
+    def __init__(
+        self,
+        qdrant_url: str,
+        collection_name: str,
+        algorithm: str = LOCAL_INDEX_ALGORITHM,
+        dtype: str = LOCAL_INDEX_DTYPE,
+    ):
+        self.client = QdrantClient(url=qdrant_url, **qdrant_client_kwargs(qdrant_url))
+        self.collection_name = collection_name
+        self.algorithm = algorithm
+        self.dtype = np.float16 if dtype == "float16" else np.float32
+        self.ids: List[Any] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self.matrix = np.zeros((0, 0), dtype=self.dtype)
+        self.last_ingested_at = 0.0
+        self.loaded_at: Optional[float] = None
+        self._positions: Dict[Any, int] = {}
+        self._hnsw = None
+        self._lock = threading.RLock()
+        self._refresh_count = 0
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.loaded_at is not None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _scroll(self, scroll_filter: Optional[Filter] = None):
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=scroll_filter,
+                limit=SCROLL_PAGE_SIZE,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            yield from points
+            if offset is None:
+                break
+
+    def _rebuild_hnsw(self) -> None:
+        if self.algorithm != "hnsw" or not len(self.ids):
+            self._hnsw = None
+            return
+        try:
+            import hnswlib
+        except ImportError:
+            raise ImportError("LOCAL_INDEX_ALGORITHM=hnsw requires the 'hnswlib' package (install the 'ann' extra)")
+        index = hnswlib.Index(space="ip", dim=self.matrix.shape[1])
+        index.init_index(max_elements=len(self.ids), ef_construction=200, M=16)
+        index.add_items(self.matrix.astype(np.float32), np.arange(len(self.ids)))
+        index.set_ef(64)
+        self._hnsw = index
+
+    def load_snapshot(self) -> int:
+        """Replace the index with a full scroll of the collection."""
+        ids, payloads, vectors = [], [], []
+        last_ingested_at = 0.0
+        for point in self._scroll():
+            ids.append(point.id)
+            payloads.append(point.payload or {})
+            # Hybrid collections return named vectors; the local index only keeps the dense one
+            vectors.append(dense_part(point.vector))
+            last_ingested_at = max(last_ingested_at, float((point.payload or {}).get("ingested_at", 0) or 0))
+
+        with self._lock:
+            self.ids = ids
+            self.payloads = payloads
+            self.matrix = np.asarray(vectors, dtype=self.dtype) if vectors else np.zeros((0, 0), dtype=self.dtype)
+            self._positions = {point_id: i for i, point_id in enumerate(ids)}
+            self.last_ingested_at = last_ingested_at
+            self._rebuild_hnsw()
+            self.loaded_at = time.time()
+        print(f"Local index loaded {len(ids)} points from '{self.collection_name}'")
+        return len(ids)
+
+    def add(self, ids: List[Any], vectors, payloads: List[Dict[str, Any]]) -> None:
+        """Insert or overwrite points in place."""
+        if not len(ids):
+            return
+        vectors = np.asarray(vectors, dtype=self.dtype)
+        with self._lock:
+            new_rows = []
+            for point_id, vector, payload in zip(ids, vectors, payloads):
+                position = self._positions.get(point_id)
+                if position is not None:
+                    self.matrix[position] = vector
+                    self.payloads[position] = payload
+                else:
+                    self._positions[point_id] = len(self.ids)
+                    self.ids.append(point_id)
+                    self.payloads.append(payload)
+                    new_rows.append(vector)
+                self.last_ingested_at = max(self.last_ingested_at, float(payload.get("ingested_at", 0) or 0))
+            if new_rows:
+                rows = np.stack(new_rows)
+                self.matrix = rows if self.matrix.size == 0 else np.vstack([self.matrix, rows])
+            if self._hnsw is not None:
+                positions = np.array([self._positions[point_id] for point_id in ids])
+                self._hnsw.resize_index(len(self.ids))
+                self._hnsw.add_items(self.matrix[positions].astype(np.float32), positions)
+            else:
+                self._rebuild_hnsw()
+
+    def _holds(self, point_id: Any, ingested_at: Any) -> bool:
+        with self._lock:
+            position = self._positions.get(point_id)
+            return position is not None and self.payloads[position].get("ingested_at") == ingested_at
+
+    def refresh(self) -> int:
+        """Pull points ingested since the last refresh; periodically do a full resync instead."""
+        self._refresh_count += 1
+        if not self.ready or self._refresh_count % LOCAL_INDEX_FULL_SYNC_EVERY == 0:
+            return self.load_snapshot()
+        # gte: points written with the same timestamp as the last sync may land after it;
+        # those already held with that timestamp are skipped
+        newer = Filter(must=[FieldCondition(key="ingested_at", range=Range(gte=self.last_ingested_at))])
+        points = [p for p in self._scroll(newer) if not self._holds(p.id, (p.payload or {}).get("ingested_at"))]
+        self.add([p.id for p in points], [dense_part(p.vector) for p in points], [p.payload or {} for p in points])
+        return len(points)
+
+    def start_background_refresh(self, interval_seconds: float = LOCAL_INDEX_REFRESH_SECONDS) -> None:
+        if self._refresh_thread is not None:
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Error refreshing local index: {e}")
+                time.sleep(interval_seconds)
+
+        self._refresh_thread = threading.Thread(target=loop, name="local-index-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def search(self, query_vector, limit: int = 5, where: Optional[Callable[[Dict[str, Any]], bool]] = None) -> List[LocalHit]:
+        """Top ``limit`` hits; ``where`` keeps only payloads it accepts (exact scan, like a Qdrant filter)."""
+        with self._lock:
+            if not len(self.ids):
+                return []
+            query = np.asarray(query_vector, dtype=np.float32)
+            if where is not None:
+                allowed = np.fromiter((where(p) for p in self.payloads), dtype=bool, count=len(self.payloads))
+                candidates = np.flatnonzero(allowed)
+                if not len(candidates):
+                    return []
+                scores = self.matrix[candidates] @ query.astype(self.dtype)
+                top = np.argsort(-scores)[:limit]
+                return [LocalHit(self.ids[candidates[i]], float(scores[i]), self.payloads[candidates[i]]) for i in top]
+            limit = min(limit, len(self.ids))
+            if self._hnsw is not None:
+                labels, distances = self._hnsw.knn_query(query, k=limit)
+                # hnswlib "ip" distance is 1 - dot product
+                return [LocalHit(self.ids[i], float(1 - d), self.payloads[i]) for i, d in zip(labels[0], distances[0])]
+            scores = self.matrix @ query.astype(self.dtype)
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            top = top[np.argsort(-scores[top])]
+            return [LocalHit(self.ids[i], float(scores[i]), self.payloads[i]) for i in top]
+
+
+_indexes: Dict[tuple, LocalVectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_local_index(qdrant_url: str, collection_name: str) -> Optional[LocalVectorIndex]:
+    """Process-wide index per (url, collection), or None when LOCAL_INDEX_MODE=off."""
+    if LOCAL_INDEX_MODE == "off":
+        return None
+    key = (qdrant_url, collection_name)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = LocalVectorIndex(qdrant_url, collection_name)
+        return _indexes[key]
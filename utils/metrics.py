@@ -0,0 +1,58 @@
+import time
+from contextlib import contextmanager
+from typing import Callable
+from prometheus_client import Counter, Gauge, Histogram
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+PROMPT_CHAR_BUCKETS = (500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+
+STAGE_SECONDS = Histogram(
+    "sealion_stage_seconds",
+    "Latency of each RAG pipeline stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_SECONDS = Histogram(
+    "sealion_llm_request_seconds",
+    "Total latency of SEA-LION completions",
+    ["model", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TTFT_SECONDS = Histogram(
+    "sealion_llm_time_to_first_token_seconds",
+    "Time until the first streamed token arrives",
+    ["model"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "sealion_llm_tokens_total",
+    "Tokens reported by the LLM API",
+    ["model", "kind"],
+)
+PROMPT_CHARS = Histogram(
+    "sealion_prompt_chars",
+    "Size of prompts sent to the LLM, in characters",
+    ["endpoint"],
+    buckets=PROMPT_CHAR_BUCKETS,
+)
+REQUESTS = Counter(
+    "sealion_requests_total",
+    "API requests by endpoint and outcome",
+    ["endpoint", "status"],
+)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+
+def register_gauge(name: str, documentation: str, value: Callable[[], float]) -> Gauge:
+    """Gauge read lazily at scrape time, so components don't have to push updates."""
+    gauge = Gauge(name, documentation)
+    gauge.set_function(lambda: float(value() or 0))
+    return gauge
@@ -0,0 +1,192 @@
+import os
+import time
+import asyncio
+import numpy as np
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+DEFAULT_MODEL = "aisingapore/Gemma-SEA-LION-v3-9B-IT"
+# Both default to the model the service always used, so routing is a no-op until configured
+LLM_FAST_MODEL = os.getenv("LLM_FAST_MODEL", DEFAULT_MODEL)
+LLM_LARGE_MODEL = os.getenv("LLM_LARGE_MODEL", DEFAULT_MODEL)
+# Second model (or a replica behind another name) raced against slow calls; empty disables hedging
+LLM_HEDGE_MODEL = os.getenv("LLM_HEDGE_MODEL", "")
+LLM_FAST_MAX_PROMPT_CHARS = int(os.getenv("LLM_FAST_MAX_PROMPT_CHARS", "4000"))
+LLM_FAST_MAX_DAYS = int(os.getenv("LLM_FAST_MAX_DAYS", "2"))
+LLM_CHAT_SLO_SECONDS = float(os.getenv("LLM_CHAT_SLO_SECONDS", "5"))
+LLM_PLAN_SLO_SECONDS = float(os.getenv("LLM_PLAN_SLO_SECONDS", "60"))
+# Hedge after this long until the primary model has enough samples for a real p95
+LLM_HEDGE_AFTER_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "20"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LATENCY_WINDOW = 512
+
+SLO_SECONDS = {"chat": LLM_CHAT_SLO_SECONDS, "plan": LLM_PLAN_SLO_SECONDS}
+
+
+@dataclass
+class RouteDecision:
+    model: str
+    reason: str
+    hedge_model: Optional[str] = None
+    hedge_after_seconds: Optional[float] = None
+
+
+class ModelLatency:
+    """Rolling latency window and outcome counters for one model."""
+
+    def __init__(self):
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.errors = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+
+    def percentile(self, q: float) -> Optional[float]:
+        return float(np.percentile(self.latencies, q)) if self.latencies else None
+
+    def stats(self) -> Dict[str, Any]:
+        def rounded(value):
+            return round(value, 3) if value is not None else None
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "samples": len(self.latencies),
+            "p50_seconds": rounded(self.percentile(50)),
+            "p95_seconds": rounded(self.percentile(95)),
+            "p99_seconds": rounded(self.percentile(99)),
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+        }
+
+
+def _failure(task: asyncio.Task) -> Optional[BaseException]:
+    """Exception of a finished task; a cancelled one counts as failed instead of raising here."""
+    return asyncio.CancelledError() if task.cancelled() else task.exception()
+
+
+class ModelRouter:
+    """Picks a model per request and optionally hedges slow calls onto a second model.
+
+    Short chats and short trips go to the fast model, everything else to the large one.
+    If the chosen model's observed p95 is over the endpoint's SLO while the other model
+    meets it, the request is moved over. Hedged calls start a second request once the
+    primary passes its p95 (or ``hedge_after_seconds`` before there is enough data) and
+    keep whichever finishes first.
+    """
+
+    def __init__(
+        self,
+        fast_model: str = LLM_FAST_MODEL,
+        large_model: str = LLM_LARGE_MODEL,
+        hedge_model: str = LLM_HEDGE_MODEL,
+        fast_max_prompt_chars: int = LLM_FAST_MAX_PROMPT_CHARS,
+        fast_max_days: int = LLM_FAST_MAX_DAYS,
+        hedge_after_seconds: float = LLM_HEDGE_AFTER_SECONDS,
+        hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+    ):
+        self.fast_model = fast_model
+        self.large_model = large_model
+        self.hedge_model = hedge_model or None
+        self.fast_max_prompt_chars = fast_max_prompt_chars
+        self.fast_max_days = fast_max_days
+        self.hedge_after_seconds = hedge_after_seconds
+        self.hedge_min_samples = hedge_min_samples
+        self._models: Dict[str, ModelLatency] = {}
+
+    def latency(self, model: str) -> ModelLatency:
+        if model not in self._models:
+            self._models[model] = ModelLatency()
+        return self._models[model]
+
+    def record(self, model: str, seconds: float, ok: bool = True) -> None:
+        stats = self.latency(model)
+        stats.requests += 1
+        if ok:
+            stats.latencies.append(seconds)
+        else:
+            stats.errors += 1
+
+    def _p95(self, model: str) -> Optional[float]:
+        stats = self.latency(model)
+        if len(stats.latencies) < self.hedge_min_samples:
+            return None
+        return stats.percentile(95)
+
+    def choose(self, endpoint: str, prompt_chars: int, duration_days: Optional[int] = None) -> RouteDecision:
+        small = prompt_chars <= self.fast_max_prompt_chars
+        if endpoint == "plan":
+            small = small and (duration_days or 1) <= self.fast_max_days
+        model, other = (self.fast_model, self.large_model) if small else (self.large_model, self.fast_model)
+        reason = "small_request" if small else "large_request"
+
+        slo = SLO_SECONDS.get(endpoint)
+        p95, other_p95 = self._p95(model), self._p95(other)
+        if slo and other != model and p95 is not None and p95 > slo and other_p95 is not None and other_p95 <= slo:
+            model, reason = other, "slo_breach"
+
+        decision = RouteDecision(model=model, reason=reason)
+        if self.hedge_model and self.hedge_model != model:
+            decision.hedge_model = self.hedge_model
+            decision.hedge_after_seconds = self._p95(model) or self.hedge_after_seconds
+        return decision
+
+    async def _timed(self, model: str, call: Callable[[str], Awaitable[Any]]) -> Any:
+        start = time.perf_counter()
+        try:
+            result = await call(model)
+        except asyncio.CancelledError:
+            # Hedge loser: neither a success sample nor an error
+            raise
+        except Exception:
+            self.record(model, time.perf_counter() - start, ok=False)
+            raise
+        self.record(model, time.perf_counter() - start)
+        return result
+
+    async def run(self, decision: RouteDecision, call: Callable[[str], Awaitable[Any]]) -> Tuple[Any, str]:
+        """
+        Run ``call(model)`` for the decision, hedging when configured.
+        Returns (result, model that produced it).
+        """
+        if not decision.hedge_model:
+            return await self._timed(decision.model, call), decision.model
+
+        loop = asyncio.get_running_loop()
+        primary = loop.create_task(self._timed(decision.model, call))
+        tasks = {primary: decision.model}
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=decision.hedge_after_seconds)
+            if done and _failure(primary) is None:
+                return primary.result(), decision.model
+
+            # Primary is slow (or already failed): race the hedge model against it
+            self.latency(decision.model).hedges_fired += 1
+            hedge = loop.create_task(self._timed(decision.hedge_model, call))
+            tasks[hedge] = decision.hedge_model
+            pending = {task for task in tasks if not task.done()}
+            error: Optional[BaseException] = _failure(primary) if primary.done() else None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    failure = _failure(task)
+                    if failure is None:
+                        if task is hedge:
+                            self.latency(decision.hedge_model).hedges_won += 1
+                        return task.result(), tasks[task]
+                    error = failure
+            raise error
+        finally:
+            # Also reached when the caller is cancelled while waiting, so no call outlives it
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "fast_model": self.fast_model,
+            "large_model": self.large_model,
+            "hedge_model": self.hedge_model,
+            "models": {model: stats.stats() for model, stats in self._models.items()},
+        }
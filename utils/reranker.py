@@ -0,0 +1,199 @@
+import os
+import asyncio
+import threading
+import time
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+# Multilingual MiniLM cross-encoder (covers Thai); small enough for CPU
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+# torch | torch-int8 | onnx | onnx-int8
+RERANK_BACKEND = os.getenv("RERANK_BACKEND", "torch")
+RERANK_ONNX_FILE = os.getenv("RERANK_ONNX_FILE", "onnx/model_qint8_avx512_vnni.onnx")
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+# First-stage search fetches this many candidates when reranking is on
+RERANK_MAX_CANDIDATES = int(os.getenv("RERANK_MAX_CANDIDATES", "24"))
+RERANK_MIN_CANDIDATES = int(os.getenv("RERANK_MIN_CANDIDATES", "6"))
+# Candidates scoring within this fraction of the best first-stage score are reranked
+RERANK_DEPTH_WINDOW = float(os.getenv("RERANK_DEPTH_WINDOW", "0.15"))
+# Stop scoring new batches after this long; unscored candidates keep their first-stage order
+RERANK_TIME_BUDGET_MS = float(os.getenv("RERANK_TIME_BUDGET_MS", "150"))
+# Passages the cross-encoder rates below this (0..1) are not sent to the LLM, except the best one
+RERANK_MIN_SCORE = float(os.getenv("RERANK_MIN_SCORE", "0.05"))
+RERANK_MAX_PASSAGE_CHARS = int(os.getenv("RERANK_MAX_PASSAGE_CHARS", "1200"))
+RERANK_WORKERS = int(os.getenv("RERANK_WORKERS", "1"))
+METRICS_WINDOW = 2048
+
+
+def candidate_depth(first_stage_scores: Sequence[float], top_k: int,
+                    window: float = RERANK_DEPTH_WINDOW,
+                    min_candidates: int = RERANK_MIN_CANDIDATES,
+                    max_candidates: int = RERANK_MAX_CANDIDATES) -> int:
+    """
+    How many of the (best-first) candidates are worth reranking.
+
+    When the first-stage scores are close together the order among them is unreliable, so
+    more of them are reranked; when a few candidates clearly lead, only those are.
+    """
+    if not first_stage_scores:
+        return 0
+    best = first_stage_scores[0]
+    threshold = best - abs(best) * window
+    close = sum(1 for score in first_stage_scores if score >= threshold)
+    depth = max(close, top_k, min_candidates)
+    return min(depth, max_candidates, len(first_stage_scores))
+
+
+class Reranker:
+    """Process-wide cross-encoder that reorders retrieved passages by (query, passage) relevance.
+
+    Like the embedding engine, the model loads lazily and scoring runs on a small
+    dedicated pool so it never blocks the event loop.
+    """
+
+    def __init__(self, model_name: str = RERANK_MODEL, backend: str = RERANK_BACKEND,
+                 batch_size: int = RERANK_BATCH_SIZE, time_budget_ms: float = RERANK_TIME_BUDGET_MS,
+                 min_score: float = RERANK_MIN_SCORE):
+        self.model_name = model_name
+        self.backend = backend
+        self.batch_size = batch_size
+        self.time_budget_ms = time_budget_ms
+        self.min_score = min_score
+        self.load_seconds: Optional[float] = None
+        self.total_requests = 0
+        self.budget_exceeded = 0
+        self._model = None
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._latency_ms: Deque[float] = deque(maxlen=METRICS_WINDOW)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load()
+        return self._model
+
+    def _load(self):
+        from sentence_transformers import CrossEncoder
+
+        start = time.perf_counter()
+        if self.backend == "onnx":
+            model = CrossEncoder(self.model_name, backend="onnx")
+        elif self.backend == "onnx-int8":
+            model = CrossEncoder(self.model_name, backend="onnx", model_kwargs={"file_name": RERANK_ONNX_FILE})
+        else:
+            model = CrossEncoder(self.model_name, device="cpu")
+            if self.backend == "torch-int8":
+                import torch
+
+                model.model = torch.quantization.quantize_dynamic(model.model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.load_seconds = time.perf_counter() - start
+        print(f"Loaded reranker '{self.model_name}' ({self.backend}) in {self.load_seconds:.1f}s")
+        return model
+
+    def load(self) -> None:
+        self.model
+
+    def warmup(self) -> None:
+        self.score("warmup", ["warmup"])
+
+    def score(self, query: str, passages: List[str]) -> np.ndarray:
+        """Relevance in [0, 1] for each (query, passage) pair, in one batch."""
+        pairs = [(query, passage[:RERANK_MAX_PASSAGE_CHARS]) for passage in passages]
+        scores = self.model.predict(pairs, batch_size=self.batch_size, convert_to_numpy=True, show_progress_bar=False)
+        return np.asarray(scores, dtype=np.float32).reshape(len(passages))
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=RERANK_WORKERS, thread_name_prefix="rerank")
+        return self._executor
+
+    async def rerank(self, query: str, candidates: List[Any], top_k: int,
+                     text_of: Callable[[Any], str], score_of: Callable[[Any], float]) -> Tuple[List[Tuple[Any, Optional[float]]], Dict[str, Any]]:
+        """
+        Rerank best-first search hits and keep at most ``top_k`` of them.
+
+        Returns ([(candidate, rerank_score or None), ...], stats). Candidates are scored in
+        batches in first-stage order until the time budget runs out; any that were not
+        scored follow the scored ones in their original order.
+        """
+        start = time.perf_counter()
+        depth = candidate_depth([score_of(c) for c in candidates], top_k)
+        pool = candidates[:depth]
+        loop = asyncio.get_running_loop()
+
+        scores: List[float] = []
+        over_budget = False
+        for offset in range(0, len(pool), self.batch_size):
+            if scores and (time.perf_counter() - start) * 1000 > self.time_budget_ms:
+                over_budget = True
+                break
+            batch = [text_of(c) for c in pool[offset:offset + self.batch_size]]
+            scores += (await loop.run_in_executor(self.executor, self.score, query, batch)).tolist()
+
+        scored = sorted(zip(pool[:len(scores)], scores), key=lambda pair: pair[1], reverse=True)
+        kept: List[Tuple[Any, Optional[float]]] = [
+            (candidate, score) for i, (candidate, score) in enumerate(scored) if i == 0 or score >= self.min_score
+        ]
+        kept += [(candidate, None) for candidate in pool[len(scores):]]
+        kept = kept[:top_k]
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.total_requests += 1
+        self.budget_exceeded += over_budget
+        self._latency_ms.append(elapsed_ms)
+        return kept, {
+            "model": self.model_name,
+            "candidates": len(candidates),
+            "depth": depth,
+            "scored": len(scores),
+            "kept": len(kept),
+            "over_budget": over_budget,
+            "latency_ms": round(elapsed_ms, 2),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        def percentile(values, q):
+            return round(float(np.percentile(values, q)), 3) if values else None
+
+        return {
+            "enabled": RERANK_ENABLED,
+            "model": self.model_name,
+            "backend": self.backend,
+            "loaded": self.is_loaded,
+            "requests": self.total_requests,
+            "budget_exceeded": self.budget_exceeded,
+            "latency_ms_p50": percentile(self._latency_ms, 50),
+            "latency_ms_p99": percentile(self._latency_ms, 99),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+_reranker: Optional[Reranker] = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> Reranker:
+    """Return the single Reranker shared by the whole process."""
+    global _reranker
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                _reranker = Reranker()
+    return _reranker
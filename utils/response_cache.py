@@ -0,0 +1,205 @@
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from interface import PlanRequest, PlanResponse
+
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")  # memory | sqlite | off
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "response_cache.sqlite3")
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "86400"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.95"))
+
+
+def _normalize(value: Optional[str]) -> str:
+    return " ".join((value or "").lower().split())
+
+
+def exact_key(plan_request: PlanRequest) -> str:
+    """Hash of the normalized PlanRequest fields, so casing/whitespace/preference order don't matter."""
+    normalized = {
+        "start_place": _normalize(plan_request.start_place),
+        "destination_place": _normalize(plan_request.destination_place),
+        "trip_price": plan_request.trip_price,
+        "trip_context": _normalize(plan_request.trip_context),
+        "trip_duration_days": plan_request.trip_duration_days,
+        "group_size": plan_request.group_size,
+        "preferences": sorted(_normalize(p) for p in plan_request.preferences or []),
+        "top_k": plan_request.top_k,
+        "language": plan_request.language,
+        "search_radius_km": plan_request.search_radius_km,
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+
+def semantic_bucket(plan_request: PlanRequest) -> str:
+    """
+    Semantic hits are only allowed between requests with the same budget, duration, group size,
+    language, preferences and retrieval settings; none of those are in the embedded query text.
+    """
+    preferences = ",".join(sorted(_normalize(p) for p in plan_request.preferences or []))
+    return (
+        f"{plan_request.trip_price}|{plan_request.trip_duration_days}|{plan_request.group_size}|{plan_request.language or ''}"
+        f"|{preferences}|{plan_request.top_k}|{plan_request.search_radius_km or ''}"
+    )
+
+
+class InMemoryCacheBackend:
+    """Per-process LRU with TTL."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at, bucket, embedding, response_json)
+        self._entries: "OrderedDict[str, Tuple[float, str, Optional[np.ndarray], str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[3]
+
+    def set(self, key: str, bucket: str, embedding: Optional[np.ndarray], response_json: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, bucket, embedding, response_json)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def candidates(self, bucket: str) -> List[Tuple[str, np.ndarray]]:
+        now = time.time()
+        with self._lock:
+            return [
+                (key, embedding)
+                for key, (expires_at, entry_bucket, embedding, _) in self._entries.items()
+                if entry_bucket == bucket and embedding is not None and expires_at >= now
+            ]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """On-disk cache shared by every worker on the host; LRU order is tracked by last access time."""
+
+    def __init__(self, path: str = RESPONSE_CACHE_PATH, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS plan_cache ("
+                "key TEXT PRIMARY KEY, bucket TEXT, embedding BLOB, response TEXT, "
+                "expires_at REAL, accessed_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS plan_cache_bucket ON plan_cache (bucket)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        conn = self._conn()
+        row = conn.execute("SELECT response, expires_at FROM plan_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with conn:
+            if row[1] < time.time():
+                conn.execute("DELETE FROM plan_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE plan_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def set(self, key: str, bucket: str, embedding: Optional[np.ndarray], response_json: str) -> None:
+        now = time.time()
+        blob = embedding.astype(np.float32).tobytes() if embedding is not None else None
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO plan_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, bucket, blob, response_json, now + self.ttl_seconds, now),
+            )
+            conn.execute("DELETE FROM plan_cache WHERE expires_at < ?", (now,))
+            conn.execute(
+                "DELETE FROM plan_cache WHERE key IN (SELECT key FROM plan_cache "
+                "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def candidates(self, bucket: str) -> List[Tuple[str, np.ndarray]]:
+        rows = self._conn().execute(
+            "SELECT key, embedding FROM plan_cache WHERE bucket = ? AND embedding IS NOT NULL AND expires_at >= ?",
+            (bucket, time.time()),
+        ).fetchall()
+        return [(key, np.frombuffer(blob, dtype=np.float32)) for key, blob in rows]
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM plan_cache").fetchone()[0]
+
+
+class ResponseCache:
+    """Two-tier PlanResponse cache: exact match on the normalized request, then cosine match on the query embedding."""
+
+    def __init__(self, backend, similarity_threshold: float = RESPONSE_CACHE_SIMILARITY):
+        self.backend = backend
+        self.similarity_threshold = similarity_threshold
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def get_exact(self, plan_request: PlanRequest) -> Optional[PlanResponse]:
+        cached = self.backend.get(exact_key(plan_request))
+        if cached is None:
+            return None
+        self.exact_hits += 1
+        return PlanResponse.model_validate_json(cached)
+
+    def get_semantic(self, plan_request: PlanRequest, query_embedding: List[float]) -> Tuple[Optional[PlanResponse], float]:
+        candidates = self.backend.candidates(semantic_bucket(plan_request))
+        if candidates:
+            keys = [key for key, _ in candidates]
+            matrix = np.stack([embedding for _, embedding in candidates])
+            scores = matrix @ np.asarray(query_embedding, dtype=np.float32)
+            best = int(np.argmax(scores))
+            if scores[best] >= self.similarity_threshold:
+                cached = self.backend.get(keys[best])
+                if cached is not None:
+                    self.semantic_hits += 1
+                    return PlanResponse.model_validate_json(cached), float(scores[best])
+        self.misses += 1
+        return None, 0.0
+
+    def put(self, plan_request: PlanRequest, query_embedding: Optional[List[float]], response: PlanResponse) -> None:
+        embedding = np.asarray(query_embedding, dtype=np.float32) if query_embedding is not None else None
+        self.backend.set(exact_key(plan_request), semantic_bucket(plan_request), embedding, response.model_dump_json())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "size": len(self.backend),
+        }
+
+
+def create_response_cache() -> Optional[ResponseCache]:
+    if RESPONSE_CACHE_BACKEND == "off":
+        return None
+    if RESPONSE_CACHE_BACKEND == "sqlite":
+        return ResponseCache(SQLiteCacheBackend())
+    return ResponseCache(InMemoryCacheBackend())
@@ -0,0 +1,144 @@
+import os
+import time
+import asyncio
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# First wait after a failed startup phase that is retried (Qdrant unreachable); doubles up to the max
+STARTUP_RETRY_SECONDS = float(os.getenv("STARTUP_RETRY_SECONDS", "1"))
+STARTUP_RETRY_MAX_SECONDS = float(os.getenv("STARTUP_RETRY_MAX_SECONDS", "30"))
+
+
+class StartupProfile:
+    """
+    Timeline of the startup phases (module import, client construction, warm-ups) with
+    offsets from ``origin``. Only touched from the event loop, so it needs no lock.
+    """
+
+    def __init__(self, origin: Optional[float] = None):
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.phases: Dict[str, Dict[str, Any]] = {}
+        self.ready_ms: Optional[float] = None
+
+    def _offset_ms(self, moment: float) -> float:
+        return round((moment - self.origin) * 1000, 1)
+
+    def expect(self, *names: str) -> None:
+        """Declare phases up front so readiness lists them before they start."""
+        for name in names:
+            self.phases.setdefault(name, {"name": name, "status": "pending", "attempts": 0})
+
+    def record(self, name: str, start: float, end: float) -> None:
+        self.phases[name] = {
+            "name": name,
+            "status": "ok",
+            "attempts": 1,
+            "started_ms": self._offset_ms(start),
+            "duration_ms": round((end - start) * 1000, 1),
+        }
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        record = self.phases.setdefault(name, {"name": name, "attempts": 0})
+        record.update(status="running", started_ms=self._offset_ms(start), attempts=record["attempts"] + 1)
+        record.pop("error", None)
+        try:
+            yield
+        except BaseException as e:
+            record.update(status="error", error=str(e) or type(e).__name__)
+            raise
+        else:
+            record["status"] = "ok"
+        finally:
+            record["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    def status(self, name: str) -> Optional[str]:
+        record = self.phases.get(name)
+        return record["status"] if record else None
+
+    def pending(self) -> List[str]:
+        return [name for name, record in self.phases.items() if record["status"] != "ok"]
+
+    def mark_ready(self) -> None:
+        if self.ready_ms is None:
+            self.ready_ms = self._offset_ms(time.perf_counter())
+
+    def report(self) -> Dict[str, Any]:
+        phases = sorted(self.phases.values(), key=lambda record: record.get("started_ms", float("inf")))
+        finished = [record for record in phases if "duration_ms" in record]
+        return {
+            "pid": os.getpid(),
+            "ready": self.ready_ms is not None,
+            "ready_ms": self.ready_ms,
+            "pending": self.pending(),
+            "slowest_phase": max(finished, key=lambda record: record["duration_ms"])["name"] if finished else None,
+            "phases": phases,
+        }
+
+    def summary(self) -> str:
+        parts = [f"{record['name']} {record['duration_ms']:.0f}ms" for record in self.report()["phases"] if "duration_ms" in record]
+        return ", ".join(parts)
+
+
+class ServiceContainer:
+    """
+    Builds the service's heavyweight components on first use instead of at import time.
+
+    Providers run in a worker thread, since their imports (openai, qdrant_client) and client
+    construction take a while, so the event loop keeps answering health checks. Concurrent
+    callers share one build, and a build that failed is attempted again by the next caller.
+    """
+
+    def __init__(self, profile: Optional[StartupProfile] = None):
+        self.profile = profile or StartupProfile()
+        self._providers: Dict[str, Tuple[Callable[..., Any], Tuple[str, ...]]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._builds: Dict[str, asyncio.Future] = {}
+
+    def provider(self, name: str, needs: Tuple[str, ...] = ()):
+        """Register ``factory(*needs)`` as the builder of ``name``."""
+        def register(factory: Callable[..., Any]) -> Callable[..., Any]:
+            self._providers[name] = (factory, tuple(needs))
+            return factory
+        return register
+
+    def peek(self, name: str) -> Optional[Any]:
+        """The instance if it has been built, without triggering a build."""
+        return self._instances.get(name)
+
+    async def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        build = self._builds.get(name)
+        if build is None:
+            build = self._builds[name] = asyncio.ensure_future(self._build(name))
+            build.add_done_callback(lambda _: self._builds.pop(name, None))
+        # One caller giving up (client disconnect) must not cancel the build for the others
+        return await asyncio.shield(build)
+
+    async def _build(self, name: str) -> Any:
+        factory, needs = self._providers[name]
+        dependencies = [await self.get(dependency) for dependency in needs]
+        with self.profile.phase(f"build:{name}"):
+            instance = await asyncio.get_running_loop().run_in_executor(None, factory, *dependencies)
+        self._instances[name] = instance
+        return instance
+
+    async def run_phase(self, name: str, fn: Callable[..., Any], *args, retry: bool = False) -> Any:
+        """
+        Run blocking ``fn`` in a worker thread as the profiled phase ``name``. With retry,
+        failures are logged and retried with capped exponential backoff until it succeeds.
+        """
+        delay = STARTUP_RETRY_SECONDS
+        while True:
+            try:
+                with self.profile.phase(name):
+                    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+            except Exception as e:
+                if not retry:
+                    raise
+                print(f"Startup phase '{name}' failed ({e}); retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, STARTUP_RETRY_MAX_SECONDS)
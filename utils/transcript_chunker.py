@@ -0,0 +1,68 @@
+import os
+import math
+from typing import Dict, List, Optional
+
+TRANSCRIPT_CHUNK_TOKENS = int(os.getenv("TRANSCRIPT_CHUNK_TOKENS", "256"))
+TRANSCRIPT_CHUNK_OVERLAP_TOKENS = int(os.getenv("TRANSCRIPT_CHUNK_OVERLAP_TOKENS", "32"))
+# 0 disables the time limit and windows are sized by tokens only
+TRANSCRIPT_CHUNK_MAX_SECONDS = float(os.getenv("TRANSCRIPT_CHUNK_MAX_SECONDS", "0"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate that also works for Thai, which has no spaces between words."""
+    return max(len(text.split()), math.ceil(len(text) / 4))
+
+
+def chunk_transcript(
+    segments: List[Dict],
+    max_tokens: int = TRANSCRIPT_CHUNK_TOKENS,
+    overlap_tokens: int = TRANSCRIPT_CHUNK_OVERLAP_TOKENS,
+    max_seconds: Optional[float] = TRANSCRIPT_CHUNK_MAX_SECONDS,
+) -> List[Dict]:
+    """
+    Group timed transcript segments ({"text", "start", "duration"}) into overlapping windows.
+
+    A window closes when adding the next segment would exceed ``max_tokens`` (or span more
+    than ``max_seconds`` when set). The next window starts with the trailing segments of the
+    previous one, up to ``overlap_tokens``. Each chunk keeps the ``start``/``duration`` of
+    the video span it covers.
+    """
+    segments = [s for s in segments if s.get("text", "").strip()]
+    token_counts = [estimate_tokens(s["text"]) for s in segments]
+    chunks: List[Dict] = []
+
+    first = 0
+    while first < len(segments):
+        last = first
+        tokens = token_counts[first]
+        while last + 1 < len(segments):
+            next_tokens = tokens + token_counts[last + 1]
+            span = segments[last + 1]["start"] + segments[last + 1]["duration"] - segments[first]["start"]
+            if next_tokens > max_tokens or (max_seconds and span > max_seconds):
+                break
+            last += 1
+            tokens = next_tokens
+
+        window = segments[first:last + 1]
+        start = window[0]["start"]
+        end = window[-1]["start"] + window[-1]["duration"]
+        chunks.append({
+            "chunk_index": len(chunks),
+            "text": " ".join(s["text"].strip() for s in window),
+            "start": start,
+            "duration": round(end - start, 3),
+            "token_estimate": tokens,
+        })
+
+        if last + 1 >= len(segments):
+            break
+
+        # Step back over trailing segments to build the overlap, but always make progress
+        next_first = last + 1
+        overlap = 0
+        while next_first - 1 > first and overlap + token_counts[next_first - 1] <= overlap_tokens:
+            next_first -= 1
+            overlap += token_counts[next_first]
+        first = next_first
+
+    return chunks
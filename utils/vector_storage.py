@@ -0,0 +1,86 @@
+import os
+import numpy as np
+from typing import Any, Dict, Optional
+
+# Output size of the embedding model; collections are created with this unless EMBEDDING_DIM truncates it
+MODEL_DIM = int(os.getenv("EMBEDDING_MODEL_DIM", "1024"))
+# 0 keeps the full vector; N keeps the first N dimensions (Matryoshka-style) and re-normalises
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "0"))
+# none | scalar (int8, 4x smaller) | binary (1 bit per dimension, 32x smaller)
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")
+VECTOR_QUANTIZATION_ALWAYS_RAM = os.getenv("VECTOR_QUANTIZATION_ALWAYS_RAM", "true").lower() == "true"
+# Keep full-precision originals on disk when quantized; only the quantized copy stays in RAM
+VECTOR_ON_DISK = os.getenv("VECTOR_ON_DISK", "false").lower() == "true"
+VECTOR_RESCORE = os.getenv("VECTOR_RESCORE", "true").lower() == "true"
+VECTOR_OVERSAMPLING = float(os.getenv("VECTOR_OVERSAMPLING", "2.0"))
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+
+
+def vector_size() -> int:
+    return EMBEDDING_DIM if 0 < EMBEDDING_DIM < MODEL_DIM else MODEL_DIM
+
+
+def truncate_dim(vectors: np.ndarray, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Keep the first ``dim`` dimensions of (n, d) vectors and L2-normalise them again."""
+    if not dim or dim >= vectors.shape[-1]:
+        return vectors
+    truncated = np.ascontiguousarray(vectors[..., :dim])
+    norms = np.linalg.norm(truncated, axis=-1, keepdims=True)
+    return truncated / np.where(norms == 0, 1, norms)
+
+
+def quantization_config(kind: str = VECTOR_QUANTIZATION):
+    from qdrant_client.models import (
+        BinaryQuantization, BinaryQuantizationConfig, ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+    )
+
+    if kind == "scalar":
+        return ScalarQuantization(scalar=ScalarQuantizationConfig(
+            type=ScalarType.INT8, quantile=0.99, always_ram=VECTOR_QUANTIZATION_ALWAYS_RAM,
+        ))
+    if kind == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=VECTOR_QUANTIZATION_ALWAYS_RAM))
+    return None
+
+
+def dense_vector_params(size: Optional[int] = None):
+    """VectorParams for the dense vector, with quantization and on-disk originals when configured."""
+    from qdrant_client.models import Distance, VectorParams
+
+    quantization = quantization_config()
+    return VectorParams(
+        size=size or vector_size(),
+        distance=Distance.COSINE,
+        quantization_config=quantization,
+        on_disk=VECTOR_ON_DISK if quantization is not None else None,
+    )
+
+
+def search_params():
+    """Search-time params: rescore oversampled quantized candidates with the original vectors."""
+    if VECTOR_QUANTIZATION == "none":
+        return None
+    from qdrant_client.models import QuantizationSearchParams, SearchParams
+
+    return SearchParams(quantization=QuantizationSearchParams(
+        rescore=VECTOR_RESCORE, oversampling=VECTOR_OVERSAMPLING,
+    ))
+
+
+def qdrant_url() -> str:
+    """Qdrant address shared by the API, the importer and the CLIs: QDRANT_URL, else QDRANT_HOST on the default port."""
+    return os.getenv("QDRANT_URL") or f"http://{os.getenv('QDRANT_HOST', 'localhost')}:6333"
+
+
+def qdrant_client_kwargs(location: str) -> Dict[str, Any]:
+    """Extra QdrantClient/AsyncQdrantClient arguments; gRPC sends vectors as packed floats instead of JSON lists."""
+    if not QDRANT_PREFER_GRPC or location == ":memory:":
+        return {}
+    return {"prefer_grpc": True, "grpc_port": QDRANT_GRPC_PORT}
+
+
+def bytes_per_vector(dim: int, kind: str = VECTOR_QUANTIZATION) -> Dict[str, float]:
+    """RAM per point for the searched representation, and for the float32 originals."""
+    quantized = {"scalar": dim, "binary": dim / 8}.get(kind, dim * 4)
+    return {"search_bytes": quantized, "original_bytes": dim * 4}
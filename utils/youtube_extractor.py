@@ -12,6 +12,29 @@ class YoutubeExtractor:
         except Exception as e:
             print(f"An error occurred: {e}")
             return None
+    def fetch_segments(self, video_id: str) -> List[Dict]:
+        """Like get_segments, but raises on failure so callers can retry."""
+        transcript = self.ytt_api.fetch(video_id, languages=['en', 'th'])
+        # 'en' or 'th', whichever transcript YouTube returned; stored on each segment for payload filtering
+        language = getattr(transcript, "language_code", None)
+        segments = [
+            {"text": entry.text, "start": entry.start, "duration": entry.duration}
+            if hasattr(entry, "text") else
+            {"text": entry["text"], "start": entry["start"], "duration": entry["duration"]}
+            for entry in transcript
+        ]
+        if language:
+            for segment in segments:
+                segment["language"] = language
+        return segments
+
+    def get_segments(self, video_id: str) -> Optional[List[Dict]]:
+        try:
+            return self.fetch_segments(video_id)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return None
+
     def get_text_only(self, video_id: str) -> Optional[List[str]]:
         transcript = self.extract_transcript(video_id)
         if transcript: